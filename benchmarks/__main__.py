@@ -0,0 +1,205 @@
+"""
+Benchmark runner.
+
+    python -m benchmarks run [--output results.json] [--requests 2000] [--only PATTERN]
+    python -m benchmarks compare baseline.json current.json [--threshold 0.10]
+    python -m benchmarks imports [--budget-ms 80]
+
+``run`` starts the local servers, benchmarks ehr_library against urllib3,
+requests and aiohttp and writes the results as JSON. ``compare`` diffs two
+result files and exits with status 1 when a scenario regressed by more than
+the threshold (lower req/s, higher p99 latency, memory or import time).
+``imports`` exits with status 1 when importing the package or its sync client
+loads a heavy optional subsystem, or takes longer than the budget.
+"""
+import sys
+import json
+import time
+import fnmatch
+import argparse
+import platform
+from .harness import import_time, imported_modules
+from .servers import HTTPServer, WebSocketServer
+from .scenarios import MODES, http_scenarios, websocket_scenarios
+
+
+IMPORTS = (
+    "ehr_library", "ehr_library.core", "ehr_library.session", "ehr_library.misc.call",
+    "urllib3", "requests", "aiohttp", "websockets",
+)
+# Modules that must stay fast to import -> packages they must not load eagerly.
+HEAVY = frozenset({"asyncio", "aiohttp", "websockets", "OpenSSL", "cryptography", "h2", "brotli", "zstandard"})
+LIGHT_IMPORTS = ("ehr_library", "ehr_library.core", "ehr_library.session")
+
+# Metric name -> True when higher is better.
+METRICS = {"rps": True, "p50_ms": False, "p99_ms": False, "bytes_per_request": False}
+
+
+def _ssl_context(cert_path):
+    import ssl
+
+    return ssl.create_default_context(cafile=cert_path)
+
+
+def _scenarios(args):
+    modes = set(args.modes.split(",")) if args.modes else None
+    with HTTPServer() as http:
+        yield from http_scenarios(http, args.requests, args.concurrency, modes=modes)
+
+    if not args.no_tls:
+        try:
+            https = HTTPServer(tls=True).start()
+        except RuntimeError as e:
+            print(f"skipping TLS scenarios: {e}", file=sys.stderr)
+        else:
+            try:
+                yield from http_scenarios(
+                    https, args.requests // 2, args.concurrency,
+                    ssl_context=_ssl_context(https.cert_path), modes=modes,
+                )
+            finally:
+                https.stop()
+
+    with WebSocketServer() as ws:
+        yield from websocket_scenarios(ws, args.requests)
+
+
+def run(args):
+    results = {}
+    skipped = {}
+    for name, thunk in _scenarios(args):
+        if args.only and not fnmatch.fnmatch(name, args.only):
+            continue
+        try:
+            result = thunk()
+        except ImportError as e:
+            skipped[name] = f"not installed: {e.name}"
+            continue
+        results[name] = result
+        print(f"{name:45} {result['rps']:10.1f} req/s  p50 {result['p50_ms']:8.2f} ms"
+              f"  p99 {result['p99_ms']:8.2f} ms  {result.get('bytes_per_request', 0):10.0f} B/req")
+
+    imports = {module: import_time(module) for module in IMPORTS}
+    for module, elapsed in imports.items():
+        if elapsed is not None:
+            print(f"import {module:38} {elapsed:10.1f} ms")
+
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+        "import_ms": {module: elapsed for module, elapsed in imports.items() if elapsed is not None},
+        "skipped": skipped,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+    print(f"results written to {args.output}")
+    return 0
+
+
+def _change(before, after, higher_is_better):
+    """
+    Relative change where a positive value always means "worse".
+    """
+    if not before or after is None:
+        return None
+    change = (after - before) / before
+    return -change if higher_is_better else change
+
+
+def compare(args):
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+
+    regressions = []
+    for name, before in sorted(baseline.get("results", {}).items()):
+        after = current.get("results", {}).get(name)
+        if after is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            change = _change(before.get(metric), after.get(metric), higher_is_better)
+            if change is None:
+                continue
+            flag = "REGRESSION" if change > args.threshold else ""
+            print(f"{name:45} {metric:18} {before[metric]:12.2f} -> {after[metric]:12.2f}"
+                  f"  {-change if higher_is_better else change:+7.1%} {flag}")
+            if flag:
+                regressions.append((name, metric, change))
+
+    for module, before in sorted(baseline.get("import_ms", {}).items()):
+        after = current.get("import_ms", {}).get(module)
+        change = _change(before, after, False)
+        if change is None:
+            continue
+        flag = "REGRESSION" if change > args.threshold else ""
+        print(f"import {module:38} {'ms':18} {before:12.2f} -> {after:12.2f}  {change:+7.1%} {flag}")
+        if flag:
+            regressions.append((f"import {module}", "ms", change))
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    print("\nno regressions")
+    return 0
+
+
+def imports(args):
+    failures = []
+    for module in LIGHT_IMPORTS:
+        loaded = imported_modules(module)
+        if loaded is None:
+            failures.append(f"{module}: import failed")
+            continue
+        elapsed = import_time(module)
+        heavy = sorted(loaded & HEAVY)
+        print(f"import {module:38} {elapsed or 0:10.1f} ms  {len(loaded):4} packages"
+              f"  {'heavy: ' + ', '.join(heavy) if heavy else ''}")
+        if heavy:
+            failures.append(f"{module} loads {', '.join(heavy)}")
+        if args.budget_ms is not None and elapsed is not None and elapsed > args.budget_ms:
+            failures.append(f"{module} takes {elapsed:.1f} ms (budget {args.budget_ms:.1f} ms)")
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        return 1
+    print("\nimports are lazy")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--output", default="benchmark-results.json")
+    run_parser.add_argument("--requests", type=int, default=2000, help="requests per keep-alive scenario")
+    run_parser.add_argument("--concurrency", type=int, default=50, help="in-flight requests for async clients")
+    run_parser.add_argument("--modes", help=f"comma separated subset of: {', '.join(MODES)}")
+    run_parser.add_argument("--only", help="fnmatch pattern on scenario names, e.g. 'ehr.*'")
+    run_parser.add_argument("--no-tls", action="store_true", help="skip the HTTPS scenarios")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="relative change flagged as a regression (default 0.10)")
+    compare_parser.set_defaults(handler=compare)
+
+    imports_parser = commands.add_parser("imports", help="check that heavy subsystems load lazily")
+    imports_parser.add_argument("--budget-ms", type=float, help="maximum cumulative import time per module")
+    imports_parser.set_defaults(handler=imports)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Measurement helpers: latency percentiles, throughput, memory and import time.
+"""
+import re
+import sys
+import time
+import asyncio
+import tracemalloc
+import statistics
+import subprocess
+
+
+def percentile(sorted_values, q):
+    """
+    Nearest-rank percentile of an already sorted list (q in 0..1).
+    """
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed, requests):
+    latencies = sorted(latencies)
+    return {
+        "requests": requests,
+        "rps": requests / elapsed if elapsed else None,
+        "p50_ms": percentile(latencies, 0.50) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else None,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else None,
+    }
+
+
+def _memory_per_request(run, requests):
+    """
+    Average bytes allocated per request, measured in a separate traced pass
+    because tracemalloc slows the interpreter down too much for timings.
+    """
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        run(requests)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return max(0, peak - before) / requests
+
+
+def measure_sync(call, requests, warmup=20, memory_requests=100):
+    """
+    Benchmark a blocking callable issuing one request per call.
+
+    :param call: Callable making one request
+    :param requests: Number of timed requests
+    :param warmup: Untimed requests run first (warms pools and caches)
+    :param memory_requests: Requests in the traced memory pass (0 disables it)
+    :return: Dictionary of results
+    """
+    for _ in range(warmup):
+        call()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        sent = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - sent)
+    result = summarize(latencies, time.perf_counter() - started, requests)
+
+    if memory_requests:
+        def run(count):
+            for _ in range(count):
+                call()
+
+        result["bytes_per_request"] = _memory_per_request(run, min(memory_requests, requests))
+    return result
+
+
+def measure_async(make_call, requests, concurrency=50, warmup=20, memory_requests=100,
+                  setup=None, teardown=None):
+    """
+    Benchmark a coroutine function issuing one request per call, ``concurrency`` at a time.
+
+    :param make_call: Coroutine function (receiving the setup state) making one request
+    :param requests: Number of timed requests
+    :param concurrency: Requests kept in flight
+    :param setup: Optional coroutine function returning a state shared by every call
+    :param teardown: Optional coroutine function receiving that state
+    :return: Dictionary of results
+    """
+
+    async def batch(state, count, latencies):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                sent = time.perf_counter()
+                await make_call(state)
+                if latencies is not None:
+                    latencies.append(time.perf_counter() - sent)
+
+        await asyncio.gather(*(one() for _ in range(count)))
+
+    async def main():
+        state = await setup() if setup else None
+        try:
+            await batch(state, warmup, None)
+            latencies = []
+            started = time.perf_counter()
+            await batch(state, requests, latencies)
+            result = summarize(latencies, time.perf_counter() - started, requests)
+
+            if memory_requests:
+                count = min(memory_requests, requests)
+                tracemalloc.start()
+                try:
+                    before, _ = tracemalloc.get_traced_memory()
+                    await batch(state, count, None)
+                    _, peak = tracemalloc.get_traced_memory()
+                finally:
+                    tracemalloc.stop()
+                result["bytes_per_request"] = max(0, peak - before) / count
+            result["concurrency"] = concurrency
+            return result
+        finally:
+            if teardown:
+                await teardown(state)
+
+    return asyncio.run(main())
+
+
+_IMPORT_LINE = re.compile(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s?(\S.*)$")
+
+
+def import_time(module, repeat=5):
+    """
+    Cumulative import time of ``module`` in a fresh interpreter (median, ms).
+
+    :return: Milliseconds, or None when the module cannot be imported
+    """
+    samples = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            return None
+        for line in completed.stderr.splitlines():
+            match = _IMPORT_LINE.match(line)
+            if match and match.group(2) == module:
+                samples.append(int(match.group(1)) / 1000)
+                break
+    return statistics.median(samples) if samples else None
+
+
+def imported_modules(module):
+    """
+    Top-level packages loaded by ``import module`` in a fresh interpreter.
+
+    :return: Set of package names, or None when the module cannot be imported
+    """
+    completed = subprocess.run(
+        [sys.executable, "-c",
+         f"import sys\nbefore = set(sys.modules)\nimport {module}\n"
+         "print('\\n'.join(sorted({name.split('.')[0] for name in set(sys.modules) - before})))"],
+        capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        return None
+    return set(completed.stdout.split())
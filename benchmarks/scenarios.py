@@ -0,0 +1,182 @@
+"""
+Benchmark scenarios: every client (ehr and baselines) against every server mode.
+"""
+from .harness import measure_sync, measure_async
+
+
+# Server path and share of the configured request count, per mode.
+MODES = {
+    "keepalive": ("/small", 1.0),
+    "gzip": ("/gzip", 1.0),
+    "chunked": ("/chunked", 1.0),
+    "slow": ("/slow?ms=20", 0.05),
+    "large": ("/large?size=4194304", 0.01),
+}
+
+
+def _count(requests, share):
+    return max(5, int(requests * share))
+
+
+def _sync_clients(ca_certs):
+    """
+    Yield (name, factory) pairs; a factory returns (call(url), close()).
+    """
+    def ehr_session():
+        from ehr_library.session import HTTPSessionManager
+
+        session = HTTPSessionManager(ca_certs=ca_certs)
+        return (lambda url: session.request("GET", url)), session.registry.clear
+
+    def ehr_request():
+        from ehr_library.core import Request
+        from ehr_library.session import HTTPSessionManager
+
+        client = Request("GET", session_manager=HTTPSessionManager(ca_certs=ca_certs))
+        return (lambda url: client.request(url)), client.session_manager.registry.clear
+
+    def urllib3_baseline():
+        import urllib3
+
+        manager = urllib3.PoolManager(ca_certs=ca_certs) if ca_certs else urllib3.PoolManager()
+        return (lambda url: manager.request("GET", url)), manager.clear
+
+    def requests_baseline():
+        import requests
+
+        session = requests.Session()
+        if ca_certs:
+            session.verify = ca_certs
+        return (lambda url: session.get(url).content), session.close
+
+    yield "ehr.Request", ehr_request
+    yield "ehr.HTTPSessionManager", ehr_session
+    yield "urllib3", urllib3_baseline
+    yield "requests", requests_baseline
+
+
+def _async_clients(ssl_context):
+    """
+    Yield (name, factory) pairs; a factory returns (setup, call, teardown) for measure_async.
+    """
+    import aiohttp
+
+    async def aiohttp_setup():
+        return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=100, ssl=ssl_context))
+
+    async def aiohttp_teardown(session):
+        await session.close()
+
+    def handler_call(url):
+        from ehr_library.misc.call import AsyncRequestHandler
+
+        handler = AsyncRequestHandler()
+
+        async def call(session):
+            result = await handler.fetch(session, url)
+            if result["status"] == "error":
+                raise RuntimeError(result["error"])
+
+        return call
+
+    def aiohttp_call(url):
+        async def call(session):
+            async with session.get(url) as response:
+                await response.read()
+
+        return call
+
+    def async_request(url):
+        async def setup():
+            from ehr_library.misc.call import AsyncRequest
+
+            client = AsyncRequest("GET", limit=100, limit_per_host=100, concurrency=100)
+            return client
+
+        async def call(client):
+            await client.request(url)
+
+        async def teardown(client):
+            await client.close()
+
+        return setup, call, teardown
+
+    yield "ehr.AsyncRequestHandler", lambda url: (aiohttp_setup, handler_call(url), aiohttp_teardown)
+    if ssl_context is None:
+        # AsyncRequest always verifies against the system CAs, it cannot trust the local certificate.
+        yield "ehr.AsyncRequest", async_request
+    yield "aiohttp", lambda url: (aiohttp_setup, aiohttp_call(url), aiohttp_teardown)
+
+
+def http_scenarios(server, requests, concurrency, ssl_context=None, modes=None):
+    """
+    Yield (name, thunk) pairs benchmarking every HTTP client on ``server``.
+    """
+    prefix = "https" if server.tls else "http"
+    for mode, (path, share) in MODES.items():
+        if modes is not None and mode not in modes:
+            continue
+        url = server.url + path
+        count = _count(requests, share)
+
+        for client, factory in _sync_clients(server.cert_path):
+            def run(factory=factory, url=url, count=count):
+                call, close = factory()
+                try:
+                    return measure_sync(lambda: call(url), count, warmup=min(20, count))
+                finally:
+                    close()
+
+            yield f"{client}/{prefix}-{mode}", run
+
+        for client, factory in _async_clients(ssl_context):
+            def run(factory=factory, url=url, count=count):
+                setup, call, teardown = factory(url)
+                return measure_async(
+                    call, count, concurrency=concurrency, warmup=min(20, count),
+                    setup=setup, teardown=teardown,
+                )
+
+            yield f"{client}/{prefix}-{mode}", run
+
+
+def websocket_scenarios(server, requests):
+    """
+    Yield (name, thunk) pairs measuring WebSocket echo round trips.
+    """
+    message = "x" * 256
+
+    def ehr_manager():
+        from ehr_library.sockets import WebSocketManager
+
+        async def setup():
+            manager = WebSocketManager(server.url)
+            await manager.connect()
+            return manager
+
+        async def call(manager):
+            await manager.send_message(message)
+            await manager.receive_message()
+
+        async def teardown(manager):
+            await manager.close()
+
+        return measure_async(call, requests, concurrency=1, setup=setup, teardown=teardown)
+
+    def websockets_baseline():
+        import websockets
+
+        async def setup():
+            return await websockets.connect(server.url, compression=None)
+
+        async def call(connection):
+            await connection.send(message)
+            await connection.recv()
+
+        async def teardown(connection):
+            await connection.close()
+
+        return measure_async(call, requests, concurrency=1, setup=setup, teardown=teardown)
+
+    yield "ehr.WebSocketManager/ws-echo", ehr_manager
+    yield "websockets/ws-echo", websockets_baseline
@@ -0,0 +1,458 @@
+"""
+In-process stand-in servers used by the benchmarks.
+
+Every server binds 127.0.0.1 on a random port and runs in a daemon thread,
+so benchmarks never touch the network.
+
+HTTP paths:
+    /small            small JSON body, keep-alive
+    /gzip             gzip encoded JSON body (~64 KiB decoded)
+    /chunked          body sent with chunked transfer encoding
+    /slow?ms=50       answers after a delay
+    /large?size=N     N bytes of payload (default 8 MiB)
+
+HTTP2Server answers the same GET paths over h2c (or h2 over TLS), and
+POST requests with {"length", "sha256"} of the body it received.
+"""
+import os
+import ssl
+import gzip
+import json
+import socket
+import hashlib
+import time
+import shutil
+import asyncio
+import datetime
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+
+SMALL_BODY = json.dumps({"id": 1, "name": "ehr", "tags": ["a", "b", "c"]}).encode()
+GZIP_SOURCE = json.dumps([{"id": i, "value": "x" * 48} for i in range(1000)]).encode()
+GZIP_BODY = gzip.compress(GZIP_SOURCE)
+CHUNK = b"c" * 4096
+CHUNKS = 16
+_large_bodies = {}
+
+
+def _large_body(size):
+    body = _large_bodies.get(size)
+    if body is None:
+        # Text-safe payload: AsyncRequestHandler decodes bodies as text.
+        body = _large_bodies[size] = (b"0123456789abcdef" * (size // 16 + 1))[:size]
+    return body
+
+
+class BenchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes: without TCP_NODELAY, Nagle plus
+    # delayed ACKs add ~40 ms to every keep-alive request.
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, content_type="application/json", extra=None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (extra or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _drain(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        if parts.path == "/gzip":
+            self._send(GZIP_BODY, extra={"Content-Encoding": "gzip"})
+        elif parts.path == "/chunked":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for _ in range(CHUNKS):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(CHUNK), CHUNK))
+            self.wfile.write(b"0\r\n\r\n")
+        elif parts.path == "/slow":
+            time.sleep(int(query.get("ms", ["50"])[0]) / 1000)
+            self._send(SMALL_BODY)
+        elif parts.path == "/large":
+            size = int(query.get("size", [str(8 * 1024 * 1024)])[0])
+            self._send(_large_body(size), "application/octet-stream", {"Accept-Ranges": "bytes"})
+        else:
+            self._send(SMALL_BODY)
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        self._drain()
+        self._send(SMALL_BODY)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients closing keep-alive connections between scenarios are expected.
+        pass
+
+
+def make_self_signed_cert(directory):
+    """
+    Create a self-signed certificate for 127.0.0.1/localhost.
+
+    Uses ``cryptography`` when installed, the ``openssl`` CLI otherwise.
+
+    :return: Tuple (cert path, key path), or None when neither is available
+    """
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    try:
+        from cryptography import x509
+        from cryptography.x509.oid import NameOID
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import ec
+        import ipaddress
+    except ImportError:
+        openssl = shutil.which("openssl")
+        if openssl is None:
+            return None
+        subprocess.run(
+            [openssl, "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1",
+             "-nodes", "-keyout", key_path, "-out", cert_path, "-days", "1",
+             "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+            check=True, capture_output=True,
+        )
+        return cert_path, key_path
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([
+            x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1")),
+        ]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    with open(cert_path, "wb") as file:
+        file.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as file:
+        file.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ))
+    return cert_path, key_path
+
+
+class HTTPServer:
+    """
+    Benchmark HTTP server, optionally over TLS.
+
+    Usable as a context manager; ``url`` is the base URL to request.
+    """
+
+    def __init__(self, tls=False):
+        self.tls = tls
+        self.cert_path = None
+        self._server = None
+        self._directory = None
+
+    def start(self):
+        self._server = _Server(("127.0.0.1", 0), BenchHandler)
+        if self.tls:
+            self._directory = tempfile.mkdtemp(prefix="ehr-bench-")
+            paths = make_self_signed_cert(self._directory)
+            if paths is None:
+                self._server.server_close()
+                raise RuntimeError("TLS benchmarks need 'cryptography' or the openssl CLI")
+            self.cert_path, key_path = paths
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain(self.cert_path, key_path)
+            self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def url(self):
+        scheme = "https" if self.tls else "http"
+        return f"{scheme}://127.0.0.1:{self._server.server_port}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class WebSocketServer:
+    """
+    Echo WebSocket server running its own event loop in a daemon thread.
+    """
+
+    def __init__(self):
+        self.port = None
+        self._loop = None
+        self._ready = threading.Event()
+        self._stop = None
+
+    async def _echo(self, connection):
+        async for message in connection:
+            await connection.send(message)
+
+    async def _serve(self):
+        import websockets
+
+        self._stop = asyncio.Event()
+        async with websockets.serve(self._echo, "127.0.0.1", 0, compression=None) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await self._stop.wait()
+
+    def start(self):
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._serve())
+            self._loop.close()
+
+        threading.Thread(target=run, daemon=True).start()
+        if not self._ready.wait(10):
+            raise RuntimeError("WebSocket server did not start")
+        return self
+
+    @property
+    def url(self):
+        return f"ws://127.0.0.1:{self.port}"
+
+    def stop(self):
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class _HTTP2ServerConnection:
+    """
+    One client connection of HTTP2Server: a reader thread plus one thread
+    per stream, so slow responses are answered concurrently.
+    """
+
+    def __init__(self, sock):
+        import h2.config
+        import h2.connection
+
+        self.sock = sock
+        self.h2 = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        self.closed = False
+        self.streams = 0
+        self.active_streams = 0
+        self.max_concurrent_streams = 0
+        self._requests = {}
+        self._lock = threading.Lock()
+        self._window = threading.Condition(self._lock)
+
+    def _flush(self):
+        data = self.h2.data_to_send()
+        if data:
+            self.sock.sendall(data)
+
+    def serve(self):
+        import h2.events
+        import h2.exceptions
+
+        try:
+            with self._lock:
+                self.h2.initiate_connection()
+                self._flush()
+            while True:
+                data = self.sock.recv(65536)
+                if not data:
+                    break
+                with self._lock:
+                    for event in self.h2.receive_data(data):
+                        if isinstance(event, h2.events.RequestReceived):
+                            self._requests[event.stream_id] = (dict(event.headers), bytearray())
+                        elif isinstance(event, h2.events.DataReceived):
+                            self._requests[event.stream_id][1].extend(event.data)
+                            self.h2.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                        elif isinstance(event, h2.events.StreamEnded):
+                            headers, body = self._requests.pop(event.stream_id)
+                            self.streams += 1
+                            threading.Thread(
+                                target=self._respond, args=(event.stream_id, headers, bytes(body)), daemon=True
+                            ).start()
+                    self._flush()
+                    self._window.notify_all()
+        except (OSError, h2.exceptions.ProtocolError):
+            pass
+        finally:
+            with self._lock:
+                self.closed = True
+                self._window.notify_all()
+            self.sock.close()
+
+    def _answer(self, headers, body):
+        parts = urlsplit(headers[":path"])
+        query = parse_qs(parts.query)
+        if headers[":method"] == "POST":
+            digest = hashlib.sha256(body).hexdigest()
+            return json.dumps({"length": len(body), "sha256": digest}).encode(), "application/json", 200
+        if parts.path == "/slow":
+            time.sleep(int(query.get("ms", ["50"])[0]) / 1000)
+        elif parts.path == "/large":
+            size = int(query.get("size", [str(8 * 1024 * 1024)])[0])
+            return _large_body(size), "application/octet-stream", 200
+        elif parts.path == "/status":
+            return SMALL_BODY, "application/json", int(query.get("code", ["200"])[0])
+        return SMALL_BODY, "application/json", 200
+
+    def _respond(self, stream_id, headers, body):
+        import h2.exceptions
+
+        with self._lock:
+            self.active_streams += 1
+            self.max_concurrent_streams = max(self.max_concurrent_streams, self.active_streams)
+        data, content_type, status = self._answer(headers, body)
+        view = memoryview(data)
+        try:
+            with self._lock:
+                self.h2.send_headers(stream_id, [
+                    (":status", str(status)),
+                    ("content-type", content_type),
+                    ("content-length", str(len(data))),
+                ])
+                self._flush()
+                while view:
+                    # Wait for WINDOW_UPDATE frames: bodies larger than the
+                    # client's window exercise its flow control.
+                    while not self.closed and self.h2.local_flow_control_window(stream_id) <= 0:
+                        self._window.wait()
+                    if self.closed:
+                        return
+                    size = min(len(view), self.h2.local_flow_control_window(stream_id),
+                               self.h2.max_outbound_frame_size)
+                    self.h2.send_data(stream_id, view[:size].tobytes())
+                    self._flush()
+                    view = view[size:]
+                self.h2.end_stream(stream_id)
+                self._flush()
+        except (OSError, h2.exceptions.ProtocolError):
+            pass
+        finally:
+            with self._lock:
+                self.active_streams -= 1
+
+
+class HTTP2Server:
+    """
+    HTTP/2 server built on h2 and plain sockets: h2c with prior knowledge,
+    or h2 over TLS when ``tls`` is set. Requires the ``h2`` package.
+
+    Usable as a context manager; ``connections`` lists the accepted client
+    connections (with their stream counters).
+    """
+
+    def __init__(self, tls=False):
+        self.tls = tls
+        self.cert_path = None
+        self.connections = []
+        self._socket = None
+        self._context = None
+        self._directory = None
+
+    def start(self):
+        import h2  # noqa: F401 - fail early when h2 is missing
+
+        self._socket = socket.create_server(("127.0.0.1", 0))
+        if self.tls:
+            self._directory = tempfile.mkdtemp(prefix="ehr-bench-")
+            paths = make_self_signed_cert(self._directory)
+            if paths is None:
+                self._socket.close()
+                raise RuntimeError("TLS benchmarks need 'cryptography' or the openssl CLI")
+            self.cert_path, key_path = paths
+            self._context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            self._context.load_cert_chain(self.cert_path, key_path)
+            self._context.set_alpn_protocols(["h2"])
+        threading.Thread(target=self._accept_forever, daemon=True).start()
+        return self
+
+    def _accept_forever(self):
+        while True:
+            try:
+                sock, _ = self._socket.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self._context is not None:
+            try:
+                sock = self._context.wrap_socket(sock, server_side=True)
+            except (OSError, ssl.SSLError):
+                sock.close()
+                return
+        connection = _HTTP2ServerConnection(sock)
+        self.connections.append(connection)
+        connection.serve()
+
+    @property
+    def url(self):
+        scheme = "https" if self.tls else "http"
+        return f"{scheme}://127.0.0.1:{self._socket.getsockname()[1]}"
+
+    def stop(self):
+        if self._socket is not None:
+            try:
+                # Wakes the accept() call up.
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._socket.close()
+        for connection in self.connections:
+            try:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
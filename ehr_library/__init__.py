@@ -1,3 +1,26 @@
-from .session import HTTPSessionManager
-from .exceptions import HTTPRequestException
-from .sockets import WebSocketManager
+import importlib
+
+
+# Public names and the submodule defining them. Submodules are only
+# imported on first access, so ``import ehr_library`` stays cheap and
+# websockets/aiohttp are never loaded by programs that do not use them.
+_LAZY = {
+    "HTTPSessionManager": ".session",
+    "HTTPRequestException": ".exceptions",
+    "WebSocketManager": ".sockets",
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,341 @@
+import os
+import json
+import time
+import weakref
+import threading
+
+
+class _Flight:
+    """
+    A token fetch in progress that concurrent callers can wait on.
+    """
+    __slots__ = ("event", "token", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.token = None
+        self.error = None
+
+
+class OAuth2TokenCache:
+    """
+    Shared OAuth 2.0 token cache keyed by (token_url, client_id, scope).
+
+    Concurrent callers asking for the same expired token coalesce onto a
+    single fetch (single-flight), on both the threaded and the asyncio
+    paths. Tokens read since their last refresh are refreshed in the
+    background ``refresh_ahead`` seconds before they stop being used, so
+    busy callers normally never wait on the token endpoint; tokens nobody
+    reads are left to expire. Tokens can optionally be persisted to a JSON
+    file to survive worker restarts.
+
+    The ``fetch`` callables are kept by the background refresh, so they
+    should not hold on to a client instance.
+    """
+
+    def __init__(self, skew=30.0, refresh_ahead=30.0, persist_path=None,
+                 background_refresh=True):
+        """
+        :param skew: Seconds before ``expires_at`` at which a token is treated as expired
+        :param refresh_ahead: Seconds before that point at which it is refreshed in background
+        :param persist_path: Optional JSON file where tokens are persisted
+        :param background_refresh: Refresh tokens proactively instead of on demand only
+        """
+        self.skew = skew
+        self.refresh_ahead = refresh_ahead
+        self.persist_path = persist_path
+        self.background_refresh = background_refresh
+        self._tokens = {}
+        self._flights = {}
+        self._async_flights = {}
+        self._timers = {}
+        # Asyncio refreshes live on their loop: {(id(loop), key): (weakref(loop), handle)}.
+        self._async_timers = {}
+        # Keys read since their last refresh: only those are refreshed ahead.
+        self._used = set()
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def key_for(oauth_config):
+        """
+        Cache key of an OAuth 2.0 configuration.
+        """
+        return (oauth_config["token_url"], oauth_config["client_id"], oauth_config.get("scope", ""))
+
+    def _is_valid(self, token, now=None):
+        now = time.time() if now is None else now
+        return token is not None and now < token["expires_at"] - self.skew
+
+    def get_token(self, oauth_config, fetch):
+        """
+        Return a valid token, fetching it at most once across threads.
+
+        :param oauth_config: Dictionary with OAuth 2.0 configuration
+        :param fetch: Callable(oauth_config) -> {"access_token", "expires_at"}
+        :return: Token information
+        """
+        key = self.key_for(oauth_config)
+        with self._lock:
+            token = self._tokens.get(key)
+            if self._is_valid(token):
+                self._used.add(key)
+                self._ensure_refresh_scheduled(key, oauth_config, fetch, token)
+                return token
+        return self._refresh(key, oauth_config, fetch)
+
+    def _refresh(self, key, oauth_config, fetch, force=False):
+        with self._lock:
+            token = self._tokens.get(key)
+            if not force and self._is_valid(token):
+                return token
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.token
+
+        try:
+            token = fetch(oauth_config)
+            self._store(key, token)
+            flight.token = token
+            self._schedule_refresh(key, oauth_config, fetch, token)
+            return token
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    async def get_token_async(self, oauth_config, fetch):
+        """
+        Asyncio counterpart of ``get_token``.
+
+        :param oauth_config: Dictionary with OAuth 2.0 configuration
+        :param fetch: Coroutine function(oauth_config) -> {"access_token", "expires_at"}
+        :return: Token information
+        """
+        key = self.key_for(oauth_config)
+        with self._lock:
+            token = self._tokens.get(key)
+            if self._is_valid(token):
+                self._used.add(key)
+        if self._is_valid(token):
+            self._ensure_async_refresh_scheduled(key, oauth_config, fetch, token)
+            return token
+        return await self._refresh_async(key, oauth_config, fetch)
+
+    async def _refresh_async(self, key, oauth_config, fetch, force=False):
+        with self._lock:
+            token = self._tokens.get(key)
+        if not force and self._is_valid(token):
+            return token
+
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        future = self._async_flights.get(flight_key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = self._async_flights[flight_key] = loop.create_future()
+        try:
+            token = await fetch(oauth_config)
+            self._store(key, token)
+            future.set_result(token)
+            self._schedule_async_refresh(key, oauth_config, fetch, token)
+            return token
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; mark the exception as retrieved.
+            future.exception()
+            raise
+        finally:
+            self._async_flights.pop(flight_key, None)
+
+    def _refresh_delay(self, token):
+        return token["expires_at"] - self.skew - self.refresh_ahead - time.time()
+
+    def _claim_refresh(self, key, timers, slot, timer):
+        """
+        True when the token was read since its last refresh; otherwise
+        forget ``timer`` so the next read schedules a new refresh.
+        """
+        with self._lock:
+            if key in self._used:
+                return True
+        self._forget_timer(timers, slot, timer)
+        return False
+
+    def _forget_timer(self, timers, slot, timer):
+        with self._lock:
+            if timers.get(slot) is timer:
+                del timers[slot]
+
+    def _ensure_refresh_scheduled(self, key, oauth_config, fetch, token):
+        if self.background_refresh and key not in self._timers:
+            self._schedule_refresh(key, oauth_config, fetch, token, locked=True)
+
+    def _schedule_refresh(self, key, oauth_config, fetch, token, locked=False):
+        if not self.background_refresh:
+            return
+
+        def refresh():
+            if not self._claim_refresh(key, self._timers, key, timer):
+                return
+            try:
+                self._refresh(key, oauth_config, fetch, force=True)
+            except Exception:
+                # The next caller retries on demand.
+                self._forget_timer(self._timers, key, timer)
+
+        timer = threading.Timer(max(0.0, self._refresh_delay(token)), refresh)
+        timer.daemon = True
+        if locked:
+            self._replace_timer(key, timer)
+        else:
+            with self._lock:
+                self._replace_timer(key, timer)
+        timer.start()
+
+    def _replace_timer(self, key, timer):
+        previous = self._timers.get(key)
+        if previous is not None:
+            previous.cancel()
+        self._timers[key] = timer
+
+    def _ensure_async_refresh_scheduled(self, key, oauth_config, fetch, token):
+        if not self.background_refresh:
+            return
+        import asyncio
+
+        entry = self._async_timers.get((id(asyncio.get_running_loop()), key))
+        # A closed loop never ran its refresh; a dead one may share the running loop's id.
+        if entry is None or _loop_gone(entry[0]):
+            self._schedule_async_refresh(key, oauth_config, fetch, token)
+
+    def _schedule_async_refresh(self, key, oauth_config, fetch, token):
+        if not self.background_refresh:
+            return
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+
+        def refresh():
+            if not self._claim_refresh(key, self._async_timers, slot, entry):
+                return
+            task = loop.create_task(self._refresh_async(key, oauth_config, fetch, force=True))
+            task.add_done_callback(refreshed)
+
+        def refreshed(task):
+            if task.cancelled() or task.exception() is not None:
+                # The next caller retries on demand.
+                self._forget_timer(self._async_timers, slot, entry)
+
+        entry = (weakref.ref(loop), loop.call_later(max(0.0, self._refresh_delay(token)), refresh))
+        with self._lock:
+            stale = [other for other, (loop_ref, _) in self._async_timers.items() if _loop_gone(loop_ref)]
+            for stale_slot in stale:
+                del self._async_timers[stale_slot]
+            previous = self._async_timers.get(slot)
+            self._async_timers[slot] = entry
+        if previous is not None:
+            previous[1].cancel()
+
+    def _store(self, key, token):
+        with self._lock:
+            self._tokens[key] = token
+            self._used.discard(key)
+            snapshot = dict(self._tokens)
+        self._save(snapshot)
+
+    def _save(self, tokens):
+        if not self.persist_path:
+            return
+        data = {"|".join(key): token for key, token in tokens.items()}
+        temporary = f"{self.persist_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descriptor, "w") as file:
+                json.dump(data, file)
+            os.replace(temporary, self.persist_path)
+        except OSError:
+            pass
+
+    def _load(self):
+        if not self.persist_path:
+            return
+        try:
+            with open(self.persist_path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for joined_key, token in data.items():
+            key = tuple(joined_key.split("|", 2))
+            if len(key) == 3 and now < token.get("expires_at", 0):
+                self._tokens[key] = token
+
+    def invalidate(self, oauth_config):
+        """
+        Forget the cached token of a configuration (e.g. after a 401).
+        """
+        key = self.key_for(oauth_config)
+        with self._lock:
+            self._tokens.pop(key, None)
+            self._used.discard(key)
+            timer = self._timers.pop(key, None)
+            handles = [self._async_timers.pop(slot) for slot in list(self._async_timers) if slot[1] == key]
+            snapshot = dict(self._tokens)
+        if timer is not None:
+            timer.cancel()
+        _cancel_async_timers(handles)
+        self._save(snapshot)
+
+    def clear(self):
+        """
+        Forget every token and cancel the pending background refreshes.
+        """
+        with self._lock:
+            timers = list(self._timers.values())
+            handles = list(self._async_timers.values())
+            self._tokens.clear()
+            self._used.clear()
+            self._timers.clear()
+            self._async_timers.clear()
+        for timer in timers:
+            timer.cancel()
+        _cancel_async_timers(handles)
+        self._save({})
+
+
+def _loop_gone(loop_ref):
+    loop = loop_ref()
+    return loop is None or loop.is_closed()
+
+
+def _cancel_async_timers(entries):
+    # Handles are cancelled on their own loop: this may run on another thread.
+    for loop_ref, handle in entries:
+        loop = loop_ref()
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(handle.cancel)
+
+
+_default_token_cache = OAuth2TokenCache()
+
+
+def get_default_token_cache():
+    """
+    Return the process-wide token cache shared by every client.
+    """
+    return _default_token_cache
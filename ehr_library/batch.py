@@ -0,0 +1,120 @@
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import CancelledError, ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class BatchResult(namedtuple("BatchResult", ["index", "spec", "response", "error"])):
+    """
+    Outcome of one request of a batch.
+
+    ``error`` holds the exception raised by that request (the batch itself
+    never raises for a single failed request).
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class RequestBatch:
+    """
+    Run request specs on a thread pool and iterate over their results.
+
+    Specs are submitted lazily, at most ``2 * max_workers`` at a time, so
+    large (or infinite) inputs never sit in memory as a whole. Iterating
+    yields BatchResult objects in input order (``ordered=True``) or as soon
+    as each request finishes (``ordered=False``).
+    """
+
+    def __init__(self, send, specs, max_workers=8, ordered=True):
+        """
+        :param send: Callable executing a single spec and returning its response
+        :param specs: Iterable of request specs
+        :param max_workers: Number of worker threads
+        :param ordered: Yield results in input order instead of completion order
+        """
+        self._send = send
+        self._specs = enumerate(specs)
+        self._window = 2 * max_workers
+        self.ordered = ordered
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="ehr-batch"
+        )
+        self._cancelled = threading.Event()
+        self._pending = deque() if ordered else set()
+
+    def _run(self, index, spec):
+        if self._cancelled.is_set():
+            return None
+        try:
+            return BatchResult(index, spec, self._send(spec), None)
+        except Exception as e:
+            return BatchResult(index, spec, None, e)
+
+    def _fill(self):
+        while not self._cancelled.is_set() and len(self._pending) < self._window:
+            item = next(self._specs, None)
+            if item is None:
+                return
+            future = self._executor.submit(self._run, *item)
+            if self.ordered:
+                self._pending.append(future)
+            else:
+                self._pending.add(future)
+
+    def __iter__(self):
+        try:
+            self._fill()
+            while self._pending and not self._cancelled.is_set():
+                if self.ordered:
+                    done = [self._pending.popleft()]
+                else:
+                    done, _ = wait(self._pending, return_when=FIRST_COMPLETED)
+                    self._pending.difference_update(done)
+
+                for future in done:
+                    try:
+                        result = future.result()
+                    except CancelledError:
+                        # cancel() was called, possibly from another thread.
+                        return
+                    if self._cancelled.is_set():
+                        # Finished after cancel(): its result is discarded.
+                        return
+                    if result is not None:
+                        yield result
+                self._fill()
+        finally:
+            for future in self._pending:
+                future.cancel()
+            self.close()
+
+    def results(self):
+        """
+        Wait for every request and return the results as a list.
+        """
+        return list(self)
+
+    def cancel(self):
+        """
+        Stop submitting new requests and drop the ones not started yet.
+
+        Requests already on the wire finish, but their results are discarded.
+        Safe to call from any thread: only the iterating thread touches the
+        pending futures, queued ones see the flag and return without sending.
+        """
+        self._cancelled.set()
+
+    def close(self):
+        """
+        Shut the worker pool down.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cancel()
+        self.close()
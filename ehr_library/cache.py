@@ -0,0 +1,379 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+
+CACHEABLE_STATUSES = {200, 203, 300, 301, 308, 404, 410}
+
+
+def parse_cache_control(value):
+    """
+    Parse a Cache-Control header into a dictionary.
+
+    :param value: Header value, e.g. "public, max-age=60"
+    :return: Dictionary {directive: value or True}
+    """
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else True
+    return directives
+
+
+def _parse_seconds(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _decoded_headers(headers, body):
+    """
+    Headers describing ``body`` as stored: already decoded, with its real length.
+    """
+    headers = {name: value for name, value in headers.items() if name != "content-encoding"}
+    headers["content-length"] = str(len(body or b""))
+    return headers
+
+
+def _parse_http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class CacheEntry:
+    """
+    A stored response plus the metadata needed to serve or revalidate it.
+    """
+    __slots__ = ("status", "headers", "body", "stored_at", "max_age", "vary", "size")
+
+    def __init__(self, status, headers, body, stored_at, max_age, vary=()):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.stored_at = stored_at
+        self.max_age = max_age
+        self.vary = vary
+        self.size = len(body or b"") + sum(len(k) + len(v) for k, v in headers.items())
+
+    @property
+    def etag(self):
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self):
+        return self.headers.get("last-modified")
+
+    def is_fresh(self, now=None):
+        """
+        Whether the entry can be served without contacting the origin.
+        """
+        now = time.time() if now is None else now
+        return now - self.stored_at < self.max_age
+
+
+class ResponseCache:
+    """
+    HTTP response cache honouring Cache-Control, Vary and validators.
+
+    Entries live in an in-memory LRU bounded by ``max_bytes``. When
+    ``disk_path`` is given every stored entry is also written there, and
+    memory misses fall back to the disk tier. Stale entries carrying an
+    ETag or Last-Modified are revalidated with a conditional request.
+
+    Requests carrying an Authorization header are keyed on a digest of
+    it, so a response is only served back to the same credentials.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_path=None):
+        """
+        :param max_bytes: Size bound of the in-memory tier
+        :param disk_path: Optional directory used as on-disk tier
+        """
+        self.max_bytes = max_bytes
+        self.disk_path = disk_path
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0
+        self._entries = OrderedDict()
+        self._vary_index = {}
+        # Entries per URL: the Vary index of a URL goes with its last entry.
+        self._url_entries = {}
+        self._lock = threading.Lock()
+        if disk_path:
+            os.makedirs(disk_path, exist_ok=True)
+
+    @staticmethod
+    def _normalize(headers):
+        return {key.lower(): value for key, value in (headers or {}).items()}
+
+    def _key(self, url, vary, request_headers):
+        authorization = request_headers.get("authorization")
+        credentials = hashlib.sha256(authorization.encode()).hexdigest() if authorization else ""
+        return (url, credentials, tuple(request_headers.get(name, "") for name in vary))
+
+    def _freshness(self, response_headers, directives):
+        if "max-age" in directives:
+            max_age = _parse_seconds(directives["max-age"])
+        elif "expires" in response_headers:
+            expires = _parse_http_date(response_headers["expires"])
+            date = _parse_http_date(response_headers.get("date")) or time.time()
+            max_age = max(0, expires - date) if expires else 0
+        else:
+            max_age = None
+
+        if "no-cache" in directives:
+            max_age = 0
+        if max_age is not None:
+            max_age -= _parse_seconds(response_headers.get("age")) or 0
+        return max_age
+
+    def lookup(self, url, request_headers=None):
+        """
+        Find the stored entry matching a GET request.
+
+        :param url: Final request URL
+        :param request_headers: Request headers (used for Vary matching)
+        :return: CacheEntry (fresh or stale) or None
+        """
+        request_headers = self._normalize(request_headers)
+        if "no-store" in parse_cache_control(request_headers.get("cache-control")):
+            return None
+
+        with self._lock:
+            vary = self._vary_index.get(url)
+        if vary is None:
+            # Disk reads never run under the cache-wide lock.
+            vary = self._load_vary_from_disk(url)
+        key = self._key(url, vary, request_headers)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._usable(entry):
+                    self._remove(key)
+                    return None
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._load_from_disk(key)
+        if entry is None or not self._usable(entry):
+            return None
+        with self._lock:
+            self._insert(key, entry)
+        return entry
+
+    @staticmethod
+    def _usable(entry):
+        # Stale entries are only worth keeping when they can be revalidated.
+        return entry.is_fresh() or entry.etag is not None or entry.last_modified is not None
+
+    def store(self, url, request_headers, status, response_headers, body):
+        """
+        Store a response if its headers allow it.
+
+        :param body: Decoded body; Content-Encoding is dropped and Content-Length
+            rewritten to match it
+        :return: The stored CacheEntry or None
+        """
+        request_headers = self._normalize(request_headers)
+        response_headers = self._normalize(response_headers)
+        directives = parse_cache_control(response_headers.get("cache-control"))
+        if status not in CACHEABLE_STATUSES or "no-store" in directives:
+            return None
+        if "no-store" in parse_cache_control(request_headers.get("cache-control")):
+            return None
+
+        vary = tuple(sorted(
+            name.strip().lower()
+            for name in response_headers.get("vary", "").split(",") if name.strip()
+        ))
+        if "*" in vary:
+            return None
+
+        max_age = self._freshness(response_headers, directives)
+        if max_age is None:
+            if "etag" not in response_headers and "last-modified" not in response_headers:
+                return None
+            # Validators only: keep it, but revalidate on every use.
+            max_age = 0
+
+        entry = CacheEntry(status, _decoded_headers(response_headers, body), body, time.time(), max_age, vary)
+        if entry.size > self.max_bytes:
+            return None
+
+        key = self._key(url, vary, request_headers)
+        with self._lock:
+            self._vary_index[url] = vary
+            self._insert(key, entry)
+        self._save_to_disk(key, entry)
+        self._write_disk_file(("vary", url), {"vary": vary})
+        return entry
+
+    def conditional_headers(self, entry):
+        """
+        Validators to send when revalidating a stale entry.
+        """
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def revalidated(self, url, request_headers, entry, response_headers):
+        """
+        Refresh a stale entry after the origin answered 304 Not Modified.
+
+        :return: The refreshed CacheEntry
+        """
+        headers = _decoded_headers({**entry.headers, **self._normalize(response_headers)}, entry.body)
+        directives = parse_cache_control(headers.get("cache-control"))
+        max_age = self._freshness(headers, directives) or 0
+        refreshed = CacheEntry(entry.status, headers, entry.body, time.time(), max_age, entry.vary)
+
+        key = self._key(url, entry.vary, self._normalize(request_headers))
+        with self._lock:
+            self.revalidations += 1
+            self._insert(key, refreshed)
+        self._save_to_disk(key, refreshed)
+        return refreshed
+
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def _insert(self, key, entry):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.current_bytes -= previous.size
+        else:
+            self._url_entries[key[0]] = self._url_entries.get(key[0], 0) + 1
+        self._entries[key] = entry
+        self.current_bytes += entry.size
+        while self.current_bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry.size
+        url = key[0]
+        self._url_entries[url] -= 1
+        if not self._url_entries[url]:
+            del self._url_entries[url]
+            self._vary_index.pop(url, None)
+
+    def _disk_file(self, key):
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.disk_path, digest)
+
+    def _write_disk_file(self, key, metadata, body=b""):
+        """
+        Write one JSON line of metadata followed by the raw body.
+
+        Plain data only: a file planted in the cache directory can at
+        worst be served as a response, never run code.
+        """
+        if not self.disk_path:
+            return
+        path = self._disk_file(key)
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporary, "wb") as file:
+                file.write(json.dumps({**metadata, "key": repr(key)}).encode("utf-8") + b"\n")
+                file.write(body or b"")
+            os.replace(temporary, path)
+        except (OSError, TypeError, ValueError):
+            pass
+
+    def _read_disk_file(self, key):
+        """
+        :return: Tuple (metadata, body), or None when missing, corrupt or for another key
+        """
+        if not self.disk_path:
+            return None
+        try:
+            with open(self._disk_file(key), "rb") as file:
+                metadata = json.loads(file.readline())
+                body = file.read()
+        except (OSError, ValueError):
+            return None
+        if not isinstance(metadata, dict) or metadata.get("key") != repr(key):
+            return None
+        return metadata, body
+
+    def _save_to_disk(self, key, entry):
+        self._write_disk_file(key, {
+            "status": entry.status,
+            "headers": entry.headers,
+            "stored_at": entry.stored_at,
+            "max_age": entry.max_age,
+            "vary": entry.vary,
+        }, entry.body)
+
+    def _load_from_disk(self, key):
+        record = self._read_disk_file(key)
+        if record is None:
+            return None
+        metadata, body = record
+        try:
+            return CacheEntry(
+                metadata["status"], metadata["headers"], body,
+                metadata["stored_at"], metadata["max_age"], tuple(metadata["vary"]),
+            )
+        except (KeyError, TypeError, AttributeError):
+            return None
+
+    def _load_vary_from_disk(self, url):
+        record = self._read_disk_file(("vary", url))
+        if record is None:
+            return ()
+        try:
+            return tuple(record[0]["vary"])
+        except (KeyError, TypeError):
+            return ()
+
+    def stats(self):
+        """
+        Counters showing whether the cache pays for itself.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "revalidations": self.revalidations,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        """
+        Drop every entry from memory and disk.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._vary_index.clear()
+            self._url_entries.clear()
+            self.current_bytes = 0
+        if self.disk_path:
+            for name in os.listdir(self.disk_path):
+                try:
+                    os.remove(os.path.join(self.disk_path, name))
+                except OSError:
+                    pass
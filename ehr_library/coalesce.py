@@ -0,0 +1,113 @@
+import threading
+
+
+COALESCED_METHODS = frozenset({"GET", "HEAD"})
+# Headers that change the answer: requests differing in one of them are never merged.
+DEFAULT_VARY = ("Accept", "Accept-Encoding", "Accept-Language", "Authorization", "Cookie")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCoalescer:
+    """
+    Single-flight for identical in-flight GET/HEAD requests.
+
+    While a request is on the wire, identical requests (same method, final
+    URL and ``vary`` header values) from other threads or coroutines wait
+    for it and receive the same Response instead of calling the upstream
+    again. Nothing is cached: once the request completes the next caller
+    starts a new one. Errors are shared the same way.
+    """
+
+    def __init__(self, vary=DEFAULT_VARY):
+        """
+        :param vary: Header names that are part of the coalescing key
+        """
+        self.vary = tuple(name.lower() for name in vary)
+        self.upstream = 0
+        self.coalesced = 0
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def key(self, method, url, headers=None):
+        """
+        Coalescing key of a request, or None when it must not be coalesced.
+        """
+        method = method.upper()
+        if method not in COALESCED_METHODS:
+            return None
+        lowered = {name.lower(): value for name, value in (headers or {}).items()}
+        return method, url, tuple(lowered.get(name) for name in self.vary)
+
+    def call(self, key, send):
+        """
+        Run ``send()`` unless an identical request is already running, in
+        which case wait for its result (threads).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.upstream += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = send()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def call_async(self, key, send):
+        """
+        Await ``send()`` unless an identical request is already running, in
+        which case await its result (asyncio).
+
+        The upstream request runs in its own task, so cancelling one waiter
+        never cancels the request the others are waiting for.
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        task_key = (loop, key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = self._tasks[task_key] = loop.create_task(send())
+                task.add_done_callback(lambda _, task_key=task_key: self._forget(task_key))
+                self.upstream += 1
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key):
+        with self._lock:
+            self._tasks.pop(task_key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "upstream": self.upstream,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
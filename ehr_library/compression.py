@@ -0,0 +1,319 @@
+import zlib
+import importlib
+
+
+def _import_first(*names):
+    """
+    Import the first installed module among ``names`` (None if none is).
+    """
+    for name in names:
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            continue
+    return None
+
+
+class Codec:
+    """
+    A content coding (gzip, br, ...) able to compress whole bodies and to
+    hand out incremental decompressors.
+    """
+    name = None
+
+    def available(self):
+        return True
+
+    def compress(self, data, level=None):
+        raise NotImplementedError
+
+    def decompressor(self):
+        """
+        Return an object with ``decompress(chunk)`` and ``flush()``.
+        """
+        raise NotImplementedError
+
+
+class _GzipDecompressor:
+    def __init__(self):
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def decompress(self, data):
+        output = self._decompressor.decompress(data)
+        # Concatenated gzip members start a fresh decompressor.
+        while self._decompressor.eof and self._decompressor.unused_data:
+            remainder = self._decompressor.unused_data
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            output += self._decompressor.decompress(remainder)
+        return output
+
+    def flush(self):
+        return self._decompressor.flush()
+
+
+class _DeflateDecompressor:
+    def __init__(self):
+        self._decompressor = zlib.decompressobj()
+        self._first_chunk = True
+
+    def decompress(self, data):
+        if self._first_chunk and data:
+            self._first_chunk = False
+            try:
+                return self._decompressor.decompress(data)
+            except zlib.error:
+                # Some servers send raw deflate without the zlib header.
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._decompressor.decompress(data)
+
+    def flush(self):
+        return self._decompressor.flush()
+
+
+class GzipCodec(Codec):
+    name = "gzip"
+
+    def compress(self, data, level=None):
+        compressor = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompressor(self):
+        return _GzipDecompressor()
+
+
+class DeflateCodec(Codec):
+    name = "deflate"
+
+    def compress(self, data, level=None):
+        return zlib.compress(data, 6 if level is None else level)
+
+    def decompressor(self):
+        return _DeflateDecompressor()
+
+
+class _BrotliDecompressor:
+    def __init__(self, module):
+        self._decompressor = module.Decompressor()
+        # brotli exposes ``process``, brotlicffi ``decompress``.
+        self._process = getattr(self._decompressor, "process", None) or self._decompressor.decompress
+
+    def decompress(self, data):
+        return self._process(data)
+
+    def flush(self):
+        return b""
+
+
+class BrotliCodec(Codec):
+    """
+    Brotli through the optional ``brotli`` (or ``brotlicffi``) package.
+    """
+    name = "br"
+    _unset = object()
+
+    def __init__(self):
+        self._module = self._unset
+
+    @property
+    def module(self):
+        if self._module is self._unset:
+            self._module = _import_first("brotli", "brotlicffi")
+        return self._module
+
+    def available(self):
+        return self.module is not None
+
+    def compress(self, data, level=None):
+        if level is None:
+            # Quality 11 is far too slow for request bodies.
+            level = 5
+        return self.module.compress(data, quality=level)
+
+    def decompressor(self):
+        return _BrotliDecompressor(self.module)
+
+
+class _ZstdDecompressor:
+    def __init__(self, new):
+        self._new = new
+        self._decompressor = new()
+
+    def decompress(self, data):
+        output = self._decompressor.decompress(data)
+        # Concatenated frames start a fresh decompressor.
+        while getattr(self._decompressor, "eof", False) and self._decompressor.unused_data:
+            remainder = self._decompressor.unused_data
+            self._decompressor = self._new()
+            output += self._decompressor.decompress(remainder)
+        return output
+
+    def flush(self):
+        flush = getattr(self._decompressor, "flush", None)
+        return flush() if flush else b""
+
+
+class ZstdCodec(Codec):
+    """
+    Zstandard through the optional ``zstandard`` package (or the stdlib
+    ``compression.zstd`` module on Python 3.14+).
+    """
+    name = "zstd"
+    _unset = object()
+
+    def __init__(self):
+        self._module = self._unset
+
+    @property
+    def module(self):
+        if self._module is self._unset:
+            self._module = _import_first("zstandard", "compression.zstd")
+        return self._module
+
+    def available(self):
+        return self.module is not None
+
+    def _is_zstandard(self):
+        return hasattr(self.module.ZstdDecompressor, "decompressobj")
+
+    def compress(self, data, level=None):
+        level = 3 if level is None else level
+        if self._is_zstandard():
+            return self.module.ZstdCompressor(level=level).compress(data)
+        return self.module.compress(data, level=level)
+
+    def decompressor(self):
+        module = self.module
+        if self._is_zstandard():
+            # zstandard: decompressobj() is the incremental API.
+            return _ZstdDecompressor(lambda: module.ZstdDecompressor().decompressobj())
+        return _ZstdDecompressor(module.ZstdDecompressor)
+
+
+class CodecRegistry:
+    """
+    Content codings known to the library, in order of preference.
+
+    Optional codecs (br, zstd) are only advertised and used when their
+    package is installed; their import happens on first use.
+    """
+
+    def __init__(self, codecs=()):
+        self._codecs = {}
+        for codec in codecs:
+            self.register(codec)
+
+    def register(self, codec):
+        """
+        Add (or replace) a codec; new codecs are least preferred.
+        """
+        self._codecs[codec.name] = codec
+        self._accept_encoding = None
+
+    def get(self, name):
+        """
+        Return the available codec called ``name`` (None if unknown or not installed).
+        """
+        codec = self._codecs.get((name or "").strip().lower())
+        if codec is None or not codec.available():
+            return None
+        return codec
+
+    def available(self):
+        return [name for name, codec in self._codecs.items() if codec.available()]
+
+    def accept_encoding(self):
+        """
+        Value of the Accept-Encoding header advertising every available codec.
+        """
+        if self._accept_encoding is None:
+            self._accept_encoding = ", ".join(self.available())
+        return self._accept_encoding
+
+    def decoder(self, content_encoding):
+        return IncrementalDecoder(content_encoding, registry=self)
+
+
+_default_registry = CodecRegistry([ZstdCodec(), BrotliCodec(), GzipCodec(), DeflateCodec()])
+
+
+def get_codec_registry():
+    """
+    Return the process-wide codec registry.
+    """
+    return _default_registry
+
+
+class IncrementalDecoder:
+    """
+    Incrementally decode a body chunk by chunk, whatever its Content-Encoding.
+
+    Stacked codings ("gzip, br") are undone in reverse order. Unknown or
+    empty encodings are passed through untouched.
+    """
+
+    def __init__(self, encoding, registry=None):
+        """
+        :param encoding: Value of the Content-Encoding header
+        :param registry: Optional CodecRegistry (defaults to the process-wide one)
+        """
+        registry = registry or _default_registry
+        self.encoding = (encoding or "").strip().lower()
+        self._decompressors = []
+        for name in reversed(self.encoding.split(",")):
+            codec = registry.get(name)
+            if codec is not None:
+                self._decompressors.append(codec.decompressor())
+
+    def decompress(self, data):
+        """
+        Decode the next chunk of the body.
+
+        :param data: Raw bytes as received from the wire
+        :return: Decoded bytes (possibly empty)
+        """
+        for decompressor in self._decompressors:
+            if not data:
+                break
+            data = decompressor.decompress(data)
+        return data
+
+    def flush(self):
+        """
+        Return whatever is left in the decompressor buffers.
+        """
+        data = b""
+        for decompressor in self._decompressors:
+            if data:
+                data = decompressor.decompress(data)
+            data += decompressor.flush()
+        return data
+
+
+def compress_body(body, headers, encoding="gzip", min_size=1024, registry=None):
+    """
+    Compress a request body when it is worth it.
+
+    Bodies smaller than ``min_size``, streamed bodies and bodies that already
+    carry a Content-Encoding are left alone, as are unavailable codecs.
+
+    :param body: Request body (bytes or str)
+    :param headers: Request headers, updated with Content-Encoding when compressing
+    :param encoding: Codec name ("gzip", "deflate", "br", "zstd")
+    :param min_size: Minimum body size, in bytes, worth compressing
+    :return: Tuple (body, headers)
+    """
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if not isinstance(body, (bytes, bytearray, memoryview)) or len(body) < min_size:
+        return body, headers
+    if any(name.lower() == "content-encoding" for name in headers):
+        return body, headers
+
+    codec = (registry or _default_registry).get(encoding)
+    if codec is None:
+        return body, headers
+    compressed = codec.compress(bytes(body))
+    if len(compressed) >= len(body):
+        return body, headers
+    headers = {**headers, "Content-Encoding": codec.name}
+    return compressed, headers
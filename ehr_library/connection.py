@@ -0,0 +1,229 @@
+import ssl
+import sys
+import socket
+import threading
+from time import perf_counter
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util.timeout import _DEFAULT_TIMEOUT
+from .resolver import get_default_dns_cache
+
+
+_context = threading.local()
+
+
+def current_timing():
+    """
+    RequestTiming of the request running on this thread, if it is measured.
+    """
+    return getattr(_context, "timing", None)
+
+
+@contextmanager
+def measure(timing):
+    """
+    Attribute pool and connection events on this thread to ``timing``.
+    """
+    previous = getattr(_context, "timing", None)
+    _context.timing = timing
+    try:
+        yield timing
+    finally:
+        _context.timing = previous
+
+
+class _TimedConnectMixin:
+    def _new_conn(self):
+        timing = current_timing()
+        if timing is None:
+            return super()._new_conn()
+        start = perf_counter()
+        sock = super()._new_conn()
+        timing.add("connect", perf_counter() - start)
+        timing.new_connections += 1
+        return sock
+
+
+class _ResolvingConnectMixin:
+    """
+    Open sockets through the shared DNS cache and Happy Eyeballs connect,
+    with the same exception mapping as urllib3's own ``_new_conn``.
+    """
+
+    def _new_conn(self):
+        try:
+            sock = get_default_dns_cache().create_connection(
+                (self._dns_host, self.port),
+                self.timeout,
+                source_address=self.source_address,
+                socket_options=self.socket_options,
+                default_timeout=_DEFAULT_TIMEOUT,
+            )
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        except socket.timeout as e:
+            raise ConnectTimeoutError(
+                self,
+                f"Connection to {self.host} timed out. (connect timeout={self.timeout})",
+            ) from e
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+
+        sys.audit("http.client.connect", self, self.host, self.port)
+        return sock
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """
+    SSLContext that offers the last TLS session seen for a hostname when
+    wrapping a new socket, so reconnects can skip the full handshake.
+
+    urllib3 creates a context per connection unless one is given, which
+    makes resumption impossible; pool managers share one of these instead.
+    """
+
+    max_sessions = 256
+
+    def __new__(cls, protocol=ssl.PROTOCOL_TLS_CLIENT, *args, **kwargs):
+        self = super().__new__(cls, protocol, *args, **kwargs)
+        self._sessions = OrderedDict()
+        self._sessions_lock = threading.Lock()
+        self.resumed = 0
+        return self
+
+    def wrap_socket(self, sock, server_side=False, do_handshake_on_connect=True,
+                    suppress_ragged_eofs=True, server_hostname=None, session=None):
+        if session is None and server_hostname and not server_side:
+            with self._sessions_lock:
+                session = self._sessions.get(server_hostname)
+        try:
+            ssl_sock = super().wrap_socket(
+                sock, server_side=server_side, do_handshake_on_connect=do_handshake_on_connect,
+                suppress_ragged_eofs=suppress_ragged_eofs, server_hostname=server_hostname,
+                session=session,
+            )
+        except ssl.SSLError:
+            if session is None:
+                raise
+            self.forget(server_hostname)
+            raise
+        if ssl_sock.session_reused:
+            self.resumed += 1
+        self.remember(server_hostname, ssl_sock)
+        return ssl_sock
+
+    def remember(self, server_hostname, ssl_sock):
+        """
+        Store the session of ``ssl_sock`` for the next connection to ``server_hostname``.
+
+        TLS 1.3 tickets arrive after the handshake, so this is called again
+        when a connection goes back to its pool.
+        """
+        session = getattr(ssl_sock, "session", None)
+        if not server_hostname or session is None:
+            return
+        if ssl_sock.version() == "TLSv1.3" and not session.has_ticket:
+            return
+        with self._sessions_lock:
+            self._sessions[server_hostname] = session
+            self._sessions.move_to_end(server_hostname)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def forget(self, server_hostname):
+        with self._sessions_lock:
+            self._sessions.pop(server_hostname, None)
+
+
+def create_ssl_context(cert_reqs="CERT_REQUIRED", ca_certs=None):
+    """
+    Build a ResumingSSLContext configured like urllib3's default context.
+
+    :param cert_reqs: "CERT_REQUIRED" or "CERT_NONE" (or the ssl constants)
+    :param ca_certs: CA bundle path, loaded once for every connection (defaults to certifi's)
+    """
+    context = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.options |= ssl.OP_NO_COMPRESSION
+    if hasattr(context, "post_handshake_auth"):
+        context.post_handshake_auth = True
+    if isinstance(cert_reqs, str):
+        cert_reqs = getattr(ssl, cert_reqs if cert_reqs.startswith("CERT_") else "CERT_" + cert_reqs)
+    if cert_reqs == ssl.CERT_NONE:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    else:
+        context.verify_mode = cert_reqs
+        context.check_hostname = True
+        context.hostname_checks_common_name = False
+        if ca_certs is None:
+            import certifi
+
+            ca_certs = certifi.where()
+        context.load_verify_locations(ca_certs)
+    return context
+
+
+class InstrumentedHTTPConnection(_TimedConnectMixin, _ResolvingConnectMixin, HTTPConnection):
+    """
+    HTTPConnection reporting its TCP connect time to the current RequestTiming.
+    """
+
+
+class InstrumentedHTTPSConnection(_TimedConnectMixin, _ResolvingConnectMixin, HTTPSConnection):
+    """
+    HTTPSConnection reporting TCP connect and TLS handshake times.
+    """
+
+    def remember_tls_session(self):
+        if isinstance(self.ssl_context, ResumingSSLContext) and isinstance(self.sock, ssl.SSLSocket):
+            self.ssl_context.remember(self.server_hostname or self.host, self.sock)
+
+    def close(self):
+        if self.sock is not None:
+            self.remember_tls_session()
+        super().close()
+
+    def connect(self):
+        timing = current_timing()
+        if timing is None:
+            return super().connect()
+        tcp_before = timing.phases.get("connect", 0.0)
+        start = perf_counter()
+        super().connect()
+        tcp = timing.phases.get("connect", 0.0) - tcp_before
+        timing.add("tls", perf_counter() - start - tcp)
+
+
+class _TimedPoolMixin:
+    def _get_conn(self, timeout=None):
+        timing = current_timing()
+        if timing is None:
+            return super()._get_conn(timeout)
+        start = perf_counter()
+        conn = super()._get_conn(timeout)
+        timing.add("queue_wait", perf_counter() - start)
+        timing.checkouts += 1
+        return conn
+
+
+class InstrumentedHTTPConnectionPool(_TimedPoolMixin, HTTPConnectionPool):
+    ConnectionCls = InstrumentedHTTPConnection
+
+
+class InstrumentedHTTPSConnectionPool(_TimedPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = InstrumentedHTTPSConnection
+
+    def _put_conn(self, conn):
+        if conn is not None and conn.sock is not None:
+            conn.remember_tls_session()
+        super()._put_conn(conn)
+
+
+POOL_CLASSES_BY_SCHEME = {
+    "http": InstrumentedHTTPConnectionPool,
+    "https": InstrumentedHTTPSConnectionPool,
+}
@@ -0,0 +1,316 @@
+import time
+import heapq
+import threading
+from urllib.parse import urlsplit
+from email.utils import parsedate_to_datetime
+
+
+# Minimal public-suffix guard: no cookie may be scoped to a whole registry.
+# Not the full Public Suffix List, only its most common multi-label entries.
+PUBLIC_SUFFIXES = frozenset({
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "ltd.uk", "plc.uk", "me.uk",
+    "com.au", "net.au", "org.au", "edu.au", "gov.au",
+    "co.jp", "ne.jp", "or.jp", "ac.jp", "go.jp",
+    "com.br", "net.br", "org.br", "gov.br",
+    "co.nz", "org.nz", "co.za", "co.in", "co.kr", "com.cn", "com.mx", "com.ar", "com.tr",
+    "github.io", "herokuapp.com", "appspot.com", "blogspot.com", "cloudfront.net",
+})
+# Second-level labels registries commonly sell under two-letter country codes (co.xx, com.xx, ...).
+_REGISTRY_LABELS = frozenset({"co", "com", "net", "org", "gov", "edu", "ac", "or", "ne", "go"})
+
+
+class Cookie:
+    """
+    A single cookie as stored by CookieStore (RFC 6265 section 5.3).
+    """
+    __slots__ = ("name", "value", "domain", "path", "host_only",
+                 "secure", "http_only", "expires", "created")
+
+    def __init__(self, name, value, domain, path="/", host_only=True,
+                 secure=False, http_only=False, expires=None, created=None):
+        self.name = name
+        self.value = value
+        self.domain = domain
+        self.path = path
+        self.host_only = host_only
+        self.secure = secure
+        self.http_only = http_only
+        self.expires = expires
+        self.created = time.time() if created is None else created
+
+    def is_expired(self, now=None):
+        now = time.time() if now is None else now
+        return self.expires is not None and self.expires <= now
+
+    def same_as(self, other):
+        """
+        True when ``other`` carries the same value, expiry and attributes.
+        """
+        return all(getattr(self, name) == getattr(other, name)
+                   for name in self.__slots__ if name != "created")
+
+    def __repr__(self):
+        return f"<Cookie {self.name}={self.value} for {self.domain}{self.path}>"
+
+
+def domain_match(host, domain):
+    """
+    RFC 6265 domain matching: ``host`` equals ``domain`` or is a subdomain of it.
+    """
+    return host == domain or (host.endswith("." + domain) and not _is_ip(host))
+
+
+def path_match(request_path, cookie_path):
+    """
+    RFC 6265 path matching.
+    """
+    if request_path == cookie_path:
+        return True
+    if request_path.startswith(cookie_path):
+        return cookie_path.endswith("/") or request_path[len(cookie_path)] == "/"
+    return False
+
+
+def default_path(request_path):
+    """
+    Default cookie path derived from the request path (RFC 6265 section 5.1.4).
+    """
+    if not request_path.startswith("/") or request_path.count("/") == 1:
+        return "/"
+    return request_path[:request_path.rindex("/")]
+
+
+def _is_ip(host):
+    return host.replace(".", "").isdigit() or ":" in host
+
+
+def is_public_suffix(domain):
+    """
+    True when ``domain`` is a public suffix ("com", "co.uk", ...) no site may set cookies for.
+    """
+    if domain in PUBLIC_SUFFIXES:
+        return True
+    labels = domain.split(".")
+    if len(labels) == 1:
+        return True
+    return len(labels) == 2 and len(labels[1]) == 2 and labels[0] in _REGISTRY_LABELS
+
+
+def parse_set_cookie(header, host, request_path, now=None):
+    """
+    Parse a Set-Cookie header value sent by ``host``.
+
+    :param header: Set-Cookie header value
+    :param host: Lowercase host the response came from
+    :param request_path: Path of the request that received the header
+    :return: Cookie, or None when the header is invalid or must be ignored
+    """
+    now = time.time() if now is None else now
+    pair, *attributes = header.split(";")
+    name, separator, value = pair.partition("=")
+    name, value = name.strip(), value.strip()
+    if not separator or not name:
+        return None
+
+    domain = None
+    path = None
+    secure = http_only = False
+    max_age = expires = None
+    for attribute in attributes:
+        key, _, argument = attribute.strip().partition("=")
+        key, argument = key.lower(), argument.strip()
+        if key == "domain" and argument:
+            domain = argument.lstrip(".").lower()
+        elif key == "path" and argument.startswith("/"):
+            path = argument
+        elif key == "secure":
+            secure = True
+        elif key == "httponly":
+            http_only = True
+        elif key == "max-age":
+            try:
+                max_age = int(argument)
+            except ValueError:
+                pass
+        elif key == "expires":
+            try:
+                expires = parsedate_to_datetime(argument).timestamp()
+            except (TypeError, ValueError, IndexError):
+                pass
+
+    if max_age is not None:
+        expires = now + max_age if max_age > 0 else now
+
+    host_only = True
+    if domain:
+        # Reject cookies for other sites and supercookies for public suffixes;
+        # a host that is itself a public suffix keeps a host-only cookie (RFC 6265, 5.3 step 5).
+        if not domain_match(host, domain):
+            return None
+        if not is_public_suffix(domain):
+            host_only = False
+        elif domain != host:
+            return None
+    else:
+        domain = host
+
+    return Cookie(name, value, domain, path or default_path(request_path),
+                  host_only=host_only, secure=secure, http_only=http_only,
+                  expires=expires, created=now)
+
+
+class CookieStore:
+    """
+    Thread-safe cookie store indexed by domain and path.
+
+    Cookies are kept in ``{domain: {(path, name): Cookie}}``; building the
+    Cookie header for a host only looks at the host itself and its parent
+    domains, so its cost does not grow with the number of stored cookies.
+    Rendered headers are cached per (host, path, secure) until the store
+    changes or one of the cookies they contain expires.
+    """
+
+    def __init__(self, header_cache_size=1024):
+        """
+        :param header_cache_size: Maximum number of rendered Cookie headers kept
+        """
+        self._domains = {}
+        self._expiry_heap = []
+        self._header_cache = {}
+        self._header_cache_size = header_cache_size
+        self._lock = threading.RLock()
+
+    def set_cookie(self, cookie):
+        """
+        Add, replace or (when already expired) delete a cookie.
+
+        Re-sending an identical cookie, as many servers do on every
+        response, leaves the store and its header cache untouched.
+        """
+        with self._lock:
+            cookies = self._domains.setdefault(cookie.domain, {})
+            key = (cookie.path, cookie.name)
+            previous = cookies.get(key)
+            if previous is not None:
+                if previous.same_as(cookie) and not cookie.is_expired():
+                    return
+                cookie.created = previous.created
+
+            if cookie.is_expired():
+                cookies.pop(key, None)
+                if not cookies:
+                    del self._domains[cookie.domain]
+            else:
+                cookies[key] = cookie
+                if cookie.expires is not None:
+                    self._push_expiry(cookie, key)
+            self._header_cache.clear()
+
+    def _push_expiry(self, cookie, key):
+        heapq.heappush(self._expiry_heap, (cookie.expires, cookie.domain, key))
+        # Replaced cookies leave stale entries behind; rebuild once they dominate.
+        if len(self._expiry_heap) > 2 * len(self) + 64:
+            self._expiry_heap = [
+                (stored.expires, domain, stored_key)
+                for domain, domain_cookies in self._domains.items()
+                for stored_key, stored in domain_cookies.items()
+                if stored.expires is not None
+            ]
+            heapq.heapify(self._expiry_heap)
+
+    def extract(self, url, set_cookie_headers):
+        """
+        Store the cookies carried by a response's Set-Cookie headers.
+
+        :param url: URL of the request that received the response
+        :param set_cookie_headers: Iterable of Set-Cookie header values
+        """
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        now = time.time()
+        for header in set_cookie_headers:
+            cookie = parse_set_cookie(header, host, parts.path or "/", now)
+            if cookie is not None:
+                self.set_cookie(cookie)
+
+    def _evict_expired(self, now):
+        evicted = False
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, domain, key = heapq.heappop(self._expiry_heap)
+            cookies = self._domains.get(domain)
+            cookie = cookies.get(key) if cookies else None
+            if cookie is not None and cookie.is_expired(now):
+                del cookies[key]
+                if not cookies:
+                    del self._domains[domain]
+                evicted = True
+        if evicted:
+            self._header_cache.clear()
+
+    def header_for(self, url):
+        """
+        Render the Cookie header value to send with a request to ``url``.
+
+        :param url: Request URL
+        :return: Header value, or an empty string when no cookie applies
+        """
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        path = parts.path or "/"
+        secure = parts.scheme in ("https", "wss")
+        cache_key = (host, path, secure)
+        now = time.time()
+
+        with self._lock:
+            if self._expiry_heap and self._expiry_heap[0][0] <= now:
+                self._evict_expired(now)
+
+            cached = self._header_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            matches = []
+            labels = host.split(".")
+            for index in range(len(labels)):
+                domain = ".".join(labels[index:])
+                for cookie in self._domains.get(domain, {}).values():
+                    if cookie.host_only and domain != host:
+                        continue
+                    if cookie.secure and not secure:
+                        continue
+                    if path_match(path, cookie.path):
+                        matches.append(cookie)
+
+            matches.sort(key=lambda cookie: (-len(cookie.path), cookie.created))
+            header = "; ".join(f"{cookie.name}={cookie.value}" for cookie in matches)
+
+            if len(self._header_cache) >= self._header_cache_size:
+                self._header_cache.clear()
+            self._header_cache[cache_key] = header
+            return header
+
+    def clear(self, domain=None):
+        """
+        Remove every cookie, or only the ones set for ``domain``.
+        """
+        with self._lock:
+            if domain is None:
+                self._domains.clear()
+                self._expiry_heap.clear()
+            else:
+                self._domains.pop(domain.lstrip(".").lower(), None)
+            self._header_cache.clear()
+
+    def __iter__(self):
+        now = time.time()
+        with self._lock:
+            cookies = [
+                cookie
+                for domain_cookies in self._domains.values()
+                for cookie in domain_cookies.values()
+            ]
+        return iter([cookie for cookie in cookies if not cookie.is_expired(now)])
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(cookies) for cookies in self._domains.values())
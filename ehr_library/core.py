@@ -1,27 +1,90 @@
+import copy
 import time
-import base64
+import functools
 import urllib3
-import gzip
-import zlib
+from time import perf_counter
+from urllib.parse import urlsplit
 from urllib3.exceptions import SSLError
-from urllib.parse import urlencode, urlparse, parse_qs, urlunparse
-from http.cookiejar import CookieJar
 from .session import HTTPSessionManager
-from .sockets import WebSocketManager
+from .auth import get_default_token_cache
+from .exceptions import HTTPRequestException
+from .compression import IncrementalDecoder
+from .batch import RequestBatch
+from .coalesce import RequestCoalescer
+from .response import Response
+from .jsonlib import dumps as json_dumps
+from .utils import (
+    build_url,
+    get_proxy_url,
+    oauth2_token_request,
+    sanitize_headers,
+    static_auth_header,
+)
+
+
+def _fetch_oauth2_token(oauth_config, proxy_url=None, ca_certs=None):
+    """
+    Fetch OAuth 2.0 token using client credentials.
+
+    Module-level so the token cache's background refresh never keeps a
+    client alive; pools still come from the shared registry.
+
+    :param oauth_config: Dictionary with OAuth 2.0 configuration
+    :param proxy_url: Optional proxy URL the token request goes through
+    :param ca_certs: Optional CA bundle used to verify the token endpoint
+    :return: Token information
+    """
+    token_url, headers, body = oauth2_token_request(oauth_config)
+    response = HTTPSessionManager(proxy_url=proxy_url, ca_certs=ca_certs).request(
+        method="POST", url=token_url, headers=headers, body=body
+    )
+
+    if response.status != 200:
+        raise HTTPRequestException(
+            f"Failed to fetch OAuth 2.0 token: {response.text}",
+            status_code=response.status,
+            url=token_url,
+        )
+
+    token_data = response.json()
+    return {
+        "access_token": token_data["access_token"],
+        "expires_at": time.time() + token_data["expires_in"],
+    }
 
 
 class Request:
     def __init__(self, method, debug=False,
                  proxies=None,
                  user_agent=None,
-                 auth=None):
+                 auth=None,
+                 session_manager=None,
+                 token_cache=None,
+                 coalesce=None):
+        """
+        :param coalesce: True (or a RequestCoalescer) to merge concurrent identical GET/HEAD requests
+        """
         self.method = method
-        self.session_manager = HTTPSessionManager()
+        self.session_manager = session_manager or HTTPSessionManager(
+            proxy_url=self._get_proxy_url(proxies)
+        )
         self.debug = debug
         self.proxies = proxies
         self.user_agent = user_agent or "MyHttpClient/1.0"
         self.auth = auth
         self.token_info = None
+        self.token_cache = token_cache or get_default_token_cache()
+        self.coalescer = RequestCoalescer() if coalesce is True else coalesce or None
+
+    @staticmethod
+    def _get_proxy_url(proxies):
+        """
+        Pick the proxy URL to use from a {"http": ..., "https": ...} mapping.
+
+        :param proxies: Optional proxies dictionary
+        :return: Proxy URL or None
+        """
+        return get_proxy_url(proxies)
 
     def _add_user_agent(self, headers):
         """
@@ -46,59 +109,30 @@ class Request:
             headers = {}
 
         if self.auth:
-            if "basic" in self.auth:
-                # Basic Authentication
-                username, password = self.auth["basic"]
-                credentials = f"{username}:{password}"
-                encoded_credentials = base64.b64encode(credentials.encode()).decode()
-                headers["Authorization"] = f"Basic {encoded_credentials}"
-
-            elif "bearer" in self.auth:
-                # Bearer Token Authentication
-                token = self.auth["bearer"]
-                headers["Authorization"] = f"Bearer {token}"
+            # Basic / Bearer Token Authentication
+            authorization = static_auth_header(self.auth)
+            if authorization:
+                headers["Authorization"] = authorization
 
             elif "oauth2" in self.auth:
-                # OAuth 2.0 Authentication
-                if self.token_info is None or time.time() > self.token_info["expires_at"]:
-                    self.token_info = self._fetch_oauth2_token(self.auth["oauth2"])
+                # OAuth 2.0 Authentication, shared by every client using the same credentials
+                self.token_info = self.token_cache.get_token(
+                    self.auth["oauth2"], self._token_fetcher()
+                )
                 headers["Authorization"] = f"Bearer {self.token_info['access_token']}"
 
         return headers
 
-    def _fetch_oauth2_token(self, oauth_config):
+    def _token_fetcher(self):
         """
-        Fetch OAuth 2.0 token using client credentials.
-
-        :param oauth_config: Dictionary with OAuth 2.0 configuration
-        :return: Token information
+        Token fetch callable bound to this client's proxy and CA settings only.
         """
-        token_url = oauth_config["token_url"]
-        client_id = oauth_config["client_id"]
-        client_secret = oauth_config["client_secret"]
-        scope = oauth_config.get("scope", "")
-
-        body = {
-            "grant_type": "client_credentials",
-            "client_id": client_id,
-            "client_secret": client_secret,
-            "scope": scope,
-        }
-
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
-        response = self.session_manager.request(
-            method="POST", url=token_url, headers=headers, body=urlencode(body)
+        return functools.partial(
+            _fetch_oauth2_token,
+            proxy_url=self.session_manager.proxy_url,
+            ca_certs=self.session_manager.pool_settings["ca_certs"],
         )
 
-        if response.status != 200:
-            raise Exception(f"Failed to fetch OAuth 2.0 token: {response.data.decode()}")
-
-        token_data = response.json()
-        return {
-            "access_token": token_data["access_token"],
-            "expires_at": time.time() + token_data["expires_in"],
-        }
-
     def _decode_compressed_response(self, response):
         """
         Decode the compressed response content if necessary.
@@ -106,25 +140,11 @@ class Request:
         :param response: urllib3.response.HTTPResponse object
         :return: Decoded content as string
         """
-        encoding = response.headers.get("Content-Encoding", "").lower()
-
-        if encoding == "gzip":
-            return gzip.decompress(response.data).decode("utf-8")
-        elif encoding == "deflate":
-            return zlib.decompress(response.data).decode("utf-8")
-        else:
-            return response.data.decode("utf-8")
+        decoder = IncrementalDecoder(response.headers.get("Content-Encoding"))
+        return (decoder.decompress(response.data) + decoder.flush()).decode("utf-8")
 
     def _sanitize_headers(self, headers):
-        if not headers:
-            return {}
-
-        sanitized = headers.copy()
-        sensitive_keys = {"Authorization", "Cookie", "Set-Cookie"}
-        for key in sensitive_keys:
-            sanitized[key] = "[REDACTED]"
-
-        return sanitized
+        return sanitize_headers(headers)
 
     def _log_request(self, method, url, headers, params=None):
         if self.debug:
@@ -146,49 +166,24 @@ class Request:
         :param params: Dicionário contendo os parâmetros de consulta.
         :return: URL com query strings.
         """
-        if not params:
-            return base_url
-
-        parsed_url = urlparse(base_url)
-        existing_params = parse_qs(parsed_url.query)
-        existing_params.update(params)
-
-        new_query_string = urlencode(existing_params, doseq=True)
-        new_url = urlunparse((
-            parsed_url.scheme, parsed_url.netloc, parsed_url.path,
-            parsed_url.params, new_query_string, parsed_url.fragment
-        ))
-
-        return new_url
+        return build_url(base_url, params)
 
     def parse_response(self, response):
         """
-        Analisa a resposta HTTP com base no tipo de conteúdo.
+        Wrap the HTTP response in a Response object.
+
+        Nothing is decoded here: ``text``, ``json()`` and ``xml()`` are only
+        computed (once) when the caller asks for them.
+
+        :param response: Response, or a urllib3 HTTPResponse
+        :return: Response
         """
-        try:
-            if isinstance(response, dict):
-                content_type = response.get("Content-Type", "").lower()
-                status = response.get("status", None)
-                data = response.get("data", None)
-            else:
-                # Assume que é um objeto HTTPResponse
-                content_type = response.headers.get("Content-Type", "").lower()
-                status = response.status
-                data = response.data
-
-                if "application/json" in content_type:
-                    return status, data.decode("utf-8"), json.loads(data)
-                elif "application/xml" in content_type or "text/xml" in content_type:
-                    return status, data.decode("utf-8"), ET.fromstring(data)
-                elif "text/" in content_type:
-                    return status, data.decode("utf-8")
-                else:
-                    return status, data
-        except Exception as e:
-            print(f"Erro ao analisar a resposta: {e}")
-            return 500, "Erro na análise da resposta", None
+        if isinstance(response, Response):
+            return response
+        return Response(response.status, response.headers, response.data, response.geturl())
 
-    def request(self, url: str, headers=None, body=None, params=None):
+    def request(self, url: str, headers=None, body=None, params=None, stream=False, method=None,
+                json=None):
         """
         Send an HTTP request using the specified method.
 
@@ -196,53 +191,101 @@ class Request:
         :param headers: Optional dictionary of headers
         :param body: Optional body for the request (used in POST, PUT, etc.)
         :param params: Optional query parameters for the request
-        :return: Parsed response based on content type
+        :param stream: Return a StreamingResponse instead of parsing the body
+        :param method: Optional method overriding the client's default one
+        :param json: Optional object sent as the JSON body (replaces ``body``)
+        :return: Response (or a StreamingResponse when streaming)
         """
+        method = method or self.method
         headers = self._add_user_agent(headers)
+        if json is not None:
+            body = json_dumps(json)
+            headers.setdefault("Content-Type", "application/json")
         headers = self._add_authentication(headers)
         url = self.build_url(url, params)
-        self._log_request(self.method, url, headers, params)
-
-        if self.proxies:
-            proxy_manager = urllib3.ProxyManager(
-                proxy_url=self.proxies.get("https", self.proxies.get("http")),
-                proxy_headers=headers
-            )
-            request_function = proxy_manager.request
-        else:
-            request_function = self.session_manager.request
-
-            try:
-                match self.method.upper():
-                    case "POST":
-                        raw_response = request_function(
-                            method="POST", url=url, headers=headers, body=body
-                        )
-                    case "GET":
-                        raw_response = request_function(
-                            method="GET", url=url, headers=headers
-                        )
-                    case "PUT":
-                        raw_response = request_function(
-                            method="PUT", url=url, headers=headers, body=body
-                        )
-                    case "DELETE":
-                        raw_response = request_function(
-                            method="DELETE", url=url, headers=headers
-                        )
-                    case _:
-                        raw_response = request_function(
-                            method="GET", url=url, headers=headers
-                        )
+        self._log_request(method, url, headers, params)
+
+        key = self.coalescer.key(method, url, headers) if self.coalescer is not None and not stream else None
+        if key is not None:
+            return self.coalescer.call(key, lambda: self._send(method, url, headers, body, stream))
+        return self._send(method, url, headers, body, stream)
 
+    def _send(self, method, url, headers, body, stream):
+        request_function = self.session_manager.request
+
+        try:
+            match method.upper():
+                case "POST":
+                    raw_response = request_function(
+                        method="POST", url=url, headers=headers, body=body,
+                        stream=stream
+                    )
+                case "GET":
+                    raw_response = request_function(
+                        method="GET", url=url, headers=headers, stream=stream
+                    )
+                case "PUT":
+                    raw_response = request_function(
+                        method="PUT", url=url, headers=headers, body=body,
+                        stream=stream
+                    )
+                case "DELETE":
+                    raw_response = request_function(
+                        method="DELETE", url=url, headers=headers, stream=stream
+                    )
+                case _:
+                    raw_response = request_function(
+                        method="GET", url=url, headers=headers, stream=stream
+                    )
+
+            if stream:
+                return raw_response
+
+            metrics = self.session_manager.metrics
+            if metrics is None:
                 return self.parse_response(raw_response)
+            started = perf_counter()
+            parsed = self.parse_response(raw_response)
+            metrics.observe(urlsplit(url).hostname or "", "parse", perf_counter() - started)
+            return parsed
+
+        except SSLError as e:
+            self._emit_error("ssl", method, url, e)
+            raise
+        except urllib3.exceptions.ProxyError as e:
+            self._emit_error("proxy", method, url, e)
+            raise
+        except Exception as e:
+            self._emit_error("request", method, url, e)
+            raise
+
+    def _emit_error(self, kind, method, url, error):
+        events = self.session_manager.events
+        if events.active:
+            events.emit("request.error", kind=kind, method=method, url=url, error=repr(error))
 
-            except SSLError as e:
-                print(f"SSL Error: {e}")
-                raise
-            except urllib3.exceptions.ProxyError as e:
-                print(f"Proxy Error: {e}")
-                raise
-            except Exception as e:
-                print(f"Request Error: {e}")
-                raise
+    def request_many(self, specs, max_workers=8, ordered=True):
+        """
+        Run many requests concurrently on a thread pool.
+
+        Every worker shares this client's HTTPSessionManager. When its pools
+        are smaller than ``max_workers``, the batch draws from pools of
+        ``max_workers`` connections per host instead, leaving the session's
+        own pools as they are. Failures are returned as values
+        (``BatchResult.error``) instead of aborting the batch.
+
+        :param specs: Iterable of URLs or dicts of ``request`` keyword arguments
+        :param max_workers: Number of worker threads
+        :param ordered: Yield results in input order instead of completion order
+        :return: RequestBatch, iterable of BatchResult (call ``cancel`` to stop it)
+        """
+        client = self
+        if self.session_manager.maxsize < max_workers:
+            client = copy.copy(self)
+            client.session_manager = self.session_manager.with_pool_size(max_workers)
+        return RequestBatch(client._request_spec, specs, max_workers=max_workers, ordered=ordered)
+
+    def _request_spec(self, spec):
+        if isinstance(spec, str):
+            return self.request(spec)
+        return self.request(**spec)
@@ -0,0 +1,249 @@
+import os
+import json
+import math
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .exceptions import HTTPRequestException
+from .streaming import DEFAULT_CHUNK_SIZE
+
+
+MANIFEST_SUFFIX = ".ehrpart"
+
+
+class _RangeIgnored(HTTPRequestException):
+    """
+    The server answered a range request with the whole file (200).
+    """
+
+
+def _write_at(fd, data, offset, lock):
+    if hasattr(os, "pwrite"):
+        while data:
+            written = os.pwrite(fd, data, offset)
+            data = data[written:]
+            offset += written
+    else:
+        with lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            os.write(fd, data)
+
+
+class DownloadManifest:
+    """
+    Sidecar file (``<path>.ehrpart``) recording which byte ranges are done.
+
+    It is rewritten atomically, so a crash leaves either the previous or
+    the new progress on disk, never a torn file.
+    """
+
+    def __init__(self, path, url, size, validator, parts):
+        self.path = path
+        self.url = url
+        self.size = size
+        self.validator = validator
+        # Each part is [start, end (inclusive), bytes already written].
+        self.parts = parts
+        self._lock = threading.Lock()
+        self._saved_at = 0.0
+
+    @classmethod
+    def load(cls, path, url, size, validator):
+        """
+        Load the manifest at ``path`` if it describes the same remote file.
+        """
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if (data.get("url"), data.get("size"), data.get("validator")) != (url, size, validator):
+            return None
+        return cls(path, url, size, validator, data["parts"])
+
+    def advance(self, index, count, interval=0.5):
+        """
+        Record ``count`` more bytes written for part ``index``.
+        """
+        with self._lock:
+            self.parts[index][2] += count
+            if time.monotonic() - self._saved_at >= interval:
+                self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump({
+                "url": self.url,
+                "size": self.size,
+                "validator": self.validator,
+                "parts": self.parts,
+            }, file)
+        os.replace(temporary, self.path)
+        self._saved_at = time.monotonic()
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class RangedDownloader:
+    """
+    Download engine splitting large files into byte ranges fetched in parallel.
+
+    The server is probed with a HEAD request: when it advertises
+    ``Accept-Ranges: bytes`` and a Content-Length, the destination file is
+    preallocated and every range is streamed over its own pooled connection
+    and written in place with ``os.pwrite``. Progress is kept in a sidecar
+    manifest, so an interrupted download resumes where it stopped (as long
+    as the ETag/Last-Modified of the remote file did not change). Servers
+    without range support, or ignoring the Range header despite advertising
+    it, get a plain single-stream download.
+    """
+
+    def __init__(self, session_manager, connections=4, min_part_size=8 * 1024 * 1024,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        :param session_manager: HTTPSessionManager used for every request
+        :param connections: Maximum number of ranges fetched in parallel
+        :param min_part_size: Files smaller than two parts are downloaded in one stream
+        :param chunk_size: Size of the chunks read from each connection
+        """
+        self.session_manager = session_manager
+        self.connections = connections
+        self.min_part_size = min_part_size
+        self.chunk_size = chunk_size
+
+    def download(self, url, path, headers=None):
+        """
+        Download ``url`` to ``path``.
+
+        :param url: URL of the file
+        :param path: Destination file path
+        :param headers: Optional request headers
+        :return: Number of bytes in the downloaded file
+        :raises: HTTPRequestException when the server answers with an error status
+        """
+        headers = dict(headers or {})
+        size, validator = self._probe(url, headers)
+        if size is None or self.connections <= 1 or size < 2 * self.min_part_size:
+            return self._download_single(url, path, headers)
+
+        manifest_path = path + MANIFEST_SUFFIX
+        manifest = None
+        if os.path.exists(path):
+            manifest = DownloadManifest.load(manifest_path, url, size, validator)
+        if manifest is None:
+            part_size = max(self.min_part_size, math.ceil(size / self.connections))
+            parts = [[start, min(start + part_size, size) - 1, 0] for start in range(0, size, part_size)]
+            manifest = DownloadManifest(manifest_path, url, size, validator, parts)
+            self._preallocate(path, size)
+            manifest.save()
+
+        # Larger pools for the parts, without resizing the caller's session.
+        session = self.session_manager.with_pool_size(max(self.session_manager.maxsize, self.connections))
+
+        range_headers = {**headers, "Accept-Encoding": "identity"}
+        if validator:
+            # The file changed in between: the server answers 200 and we start over.
+            range_headers["If-Range"] = validator
+
+        fd = os.open(path, os.O_WRONLY | getattr(os, "O_BINARY", 0))
+        lock = threading.Lock()
+        try:
+            pending = [index for index, part in enumerate(manifest.parts) if part[0] + part[2] <= part[1]]
+            with ThreadPoolExecutor(max_workers=self.connections) as executor:
+                futures = [
+                    executor.submit(self._download_part, session, url, range_headers, fd, lock, manifest, index)
+                    for index in pending
+                ]
+                for future in futures:
+                    future.result()
+        except _RangeIgnored:
+            # Range not honoured, or the file changed since the manifest (If-Range).
+            os.close(fd)
+            manifest.remove()
+            return self._download_single(url, path, headers)
+        except BaseException:
+            os.close(fd)
+            manifest.save()
+            raise
+        os.close(fd)
+        manifest.remove()
+        return size
+
+    def _probe(self, url, headers):
+        """
+        Return (size, validator) when the server supports byte ranges, (None, None) otherwise.
+        """
+        response = self.session_manager.request(
+            "HEAD", url, headers={**headers, "Accept-Encoding": "identity"}
+        )
+        if response.status != 200:
+            return None, None
+        if response.headers.get("Accept-Ranges", "").lower() != "bytes":
+            return None, None
+        try:
+            size = int(response.headers.get("Content-Length"))
+        except (TypeError, ValueError):
+            return None, None
+        validator = response.headers.get("ETag")
+        if not validator or validator.startswith("W/"):
+            # Weak ETags cannot be used with If-Range.
+            validator = response.headers.get("Last-Modified")
+        return size, validator
+
+    @staticmethod
+    def _preallocate(path, size):
+        with open(path, "wb") as file:
+            if hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(file.fileno(), 0, size)
+                    return
+                except OSError:
+                    pass
+            file.truncate(size)
+
+    def _download_part(self, session, url, headers, fd, lock, manifest, index):
+        start, end, done = manifest.parts[index]
+        offset = start + done
+        response = session.request(
+            "GET", url, headers={**headers, "Range": f"bytes={offset}-{end}"},
+            stream=True, chunk_size=self.chunk_size,
+        )
+        with response:
+            if response.status == 200:
+                raise _RangeIgnored("Server ignored the byte range request", status_code=200, url=url)
+            if response.status != 206:
+                raise HTTPRequestException(
+                    "Server did not honour the byte range request",
+                    status_code=response.status,
+                    url=url,
+                )
+            for chunk in response.iter_content(decode_content=False):
+                # Never write past the range, whatever the server sends.
+                chunk = chunk[:end + 1 - offset]
+                if not chunk:
+                    break
+                _write_at(fd, chunk, offset, lock)
+                offset += len(chunk)
+                manifest.advance(index, len(chunk))
+        if offset != end + 1:
+            raise HTTPRequestException(
+                f"Range {start}-{end} ended early at byte {offset}", url=url
+            )
+
+    def _download_single(self, url, path, headers):
+        response = self.session_manager.request(
+            "GET", url, headers=headers, stream=True, chunk_size=self.chunk_size
+        )
+        if response.status != 200:
+            response.close()
+            raise HTTPRequestException("Download failed", status_code=response.status, url=url)
+        return response.save(path)
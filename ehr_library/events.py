@@ -0,0 +1,162 @@
+import time
+import queue
+import random
+import logging
+import threading
+from .utils import sanitize_headers
+
+
+class Event:
+    """
+    A structured event emitted by the library.
+    """
+    __slots__ = ("name", "timestamp", "fields")
+
+    def __init__(self, name, timestamp, fields):
+        self.name = name
+        self.timestamp = timestamp
+        self.fields = fields
+
+    def __repr__(self):
+        return f"<Event {self.name} {self.fields}>"
+
+
+class EventBus:
+    """
+    Structured event hook replacing the library's stdout printing.
+
+    ``emit`` returns immediately when no listener is attached, and callers
+    on hot paths check ``active`` first so not even the event fields are
+    built. Each listener has its own sampling rate. Events are delivered by
+    a background thread through a bounded queue, so slow listeners never
+    block requests; when the queue is full events are dropped and counted.
+    Any ``headers`` field is redacted with ``sanitize_headers`` before
+    delivery.
+    """
+
+    def __init__(self, queue_size=10000, asynchronous=True):
+        """
+        :param queue_size: Maximum number of events waiting for delivery
+        :param asynchronous: Deliver from a background thread (False delivers inline)
+        """
+        self.asynchronous = asynchronous
+        self.dropped = 0
+        self._listeners = ()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._worker = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return bool(self._listeners)
+
+    def subscribe(self, listener, sample_rate=1.0, events=None):
+        """
+        Attach a listener.
+
+        :param listener: Callable receiving an Event
+        :param sample_rate: Fraction of events delivered to this listener (0..1)
+        :param events: Optional collection of event names (or "prefix." groups) to receive
+        :return: The listener, so it can be used as a decorator
+        """
+        names = frozenset(events) if events else None
+        with self._lock:
+            self._listeners = self._listeners + ((listener, sample_rate, names),)
+            if self.asynchronous and self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._deliver_forever, name="ehr-events", daemon=True
+                )
+                self._worker.start()
+        return listener
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            self._listeners = tuple(entry for entry in self._listeners if entry[0] != listener)
+
+    def emit(self, name, **fields):
+        """
+        Emit an event to every listener interested in it.
+
+        :param name: Event name, e.g. "request.error"
+        :param fields: Event payload
+        """
+        listeners = self._listeners
+        if not listeners:
+            return
+
+        event = None
+        group = name.split(".", 1)[0] + "."
+        for listener, sample_rate, names in listeners:
+            if names is not None and name not in names and group not in names:
+                continue
+            if sample_rate < 1.0 and random.random() >= sample_rate:
+                continue
+            if event is None:
+                if "headers" in fields:
+                    fields["headers"] = sanitize_headers(fields["headers"])
+                event = Event(name, time.time(), fields)
+            if not self.asynchronous:
+                self._call(listener, event)
+                continue
+            try:
+                self._queue.put_nowait((listener, event))
+            except queue.Full:
+                with self._lock:
+                    self.dropped += 1
+
+    @staticmethod
+    def _call(listener, event):
+        try:
+            listener(event)
+        except Exception:
+            # A broken listener must never break requests.
+            pass
+
+    def _deliver_forever(self):
+        while True:
+            listener, event = self._queue.get()
+            try:
+                self._call(listener, event)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """
+        Wait until every queued event has been delivered.
+        """
+        if self.asynchronous:
+            self._queue.join()
+
+    def stats(self):
+        """
+        Delivery counters, to spot listeners too slow for the event rate.
+        """
+        with self._lock:
+            return {
+                "listeners": len(self._listeners),
+                "queued": self._queue.qsize(),
+                "dropped": self.dropped,
+            }
+
+
+class LoggingListener:
+    """
+    Listener forwarding events to a standard ``logging`` logger.
+    """
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger("ehr_library")
+        self.level = level
+
+    def __call__(self, event):
+        self.logger.log(self.level, "%s %s", event.name, event.fields)
+
+
+_default_bus = EventBus()
+
+
+def get_event_bus():
+    """
+    Return the process-wide event bus used by every client.
+    """
+    return _default_bus
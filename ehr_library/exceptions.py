@@ -42,4 +42,21 @@ class InvalidURLException(HTTPRequestException):
     """
     Exception raised for invalid URLs.
     """
-    pass
\ No newline at end of file
+    pass
+
+
+class CircuitOpenException(HTTPRequestException):
+    """
+    Exception raised when a host's circuit breaker is open and the request
+    was not sent.
+    """
+    def __init__(self, message, url=None, host=None, retry_after=None):
+        """
+        :param message: Description of the error
+        :param url: Optional URL of the rejected request
+        :param host: Host whose breaker is open
+        :param retry_after: Seconds until the breaker lets a probe through
+        """
+        super().__init__(message, url=url)
+        self.host = host
+        self.retry_after = retry_after
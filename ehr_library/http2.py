@@ -0,0 +1,788 @@
+import io
+import ssl
+import socket
+import asyncio
+import fnmatch
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+from urllib3 import HTTPHeaderDict, HTTPResponse
+from .uploads import is_streamed, iter_chunks
+from .resolver import get_default_dns_cache
+from .connection import create_ssl_context
+
+try:
+    import h2.config
+    import h2.events
+    import h2.connection
+    import h2.exceptions
+except ImportError:  # pragma: no cover - h2 is optional
+    h2 = None
+
+
+# Connection-specific headers are forbidden in HTTP/2 (RFC 9113, 8.2.2).
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-connection", "transfer-encoding", "upgrade", "host", "te",
+}
+READ_SIZE = 65536
+DEFAULT_CONNECT_TIMEOUT = 10.0
+# Longest wait for a response header block, a body chunk or a flow-control window.
+DEFAULT_READ_TIMEOUT = 300.0
+
+
+class HTTP2NotNegotiated(Exception):
+    """
+    The server did not agree on HTTP/2 during ALPN; use HTTP/1.1 instead.
+    """
+
+
+class HTTP2StreamError(Exception):
+    """
+    A stream was reset or its connection went away before the response ended.
+    """
+
+
+class HTTP2TimeoutError(HTTP2StreamError, TimeoutError):
+    """
+    The server sent nothing on a stream for longer than the read timeout.
+    """
+
+
+def http2_available():
+    return h2 is not None
+
+
+def _ssl_context(ca_certs=None):
+    context = create_ssl_context("CERT_REQUIRED", ca_certs)
+    context.set_alpn_protocols(["h2", "http/1.1"])
+    return context
+
+
+def _request_headers(method, scheme, authority, path, headers):
+    """
+    Build the HTTP/2 header block: pseudo-headers first, lower-case names,
+    connection-specific headers dropped.
+    """
+    block = [
+        (":method", method.upper()),
+        (":scheme", scheme),
+        (":authority", authority),
+        (":path", path),
+    ]
+    for name, value in (headers or {}).items():
+        name = name.lower()
+        if name not in HOP_BY_HOP_HEADERS:
+            block.append((name, str(value)))
+    return block
+
+
+def _split_response_headers(raw_headers):
+    status = None
+    headers = HTTPHeaderDict()
+    for name, value in raw_headers:
+        name = name.decode("ascii") if isinstance(name, bytes) else name
+        value = value.decode("latin-1") if isinstance(value, bytes) else value
+        if name == ":status":
+            status = int(value)
+        elif not name.startswith(":"):
+            headers.add(name, value)
+    return status, headers
+
+
+def _body_chunks(body):
+    if body is None:
+        return ()
+    if isinstance(body, str):
+        return (body.encode("utf-8"),)
+    if is_streamed(body):
+        return iter_chunks(body)
+    return (bytes(body),)
+
+
+def _target(url):
+    parts = urlsplit(url)
+    secure = parts.scheme == "https"
+    port = parts.port or (443 if secure else 80)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    authority = parts.hostname if parts.port is None else f"{parts.hostname}:{parts.port}"
+    return parts.scheme, parts.hostname, port, authority, path
+
+
+class _Stream:
+    __slots__ = ("status", "headers", "chunks", "ended", "error", "responded")
+
+    def __init__(self):
+        self.status = None
+        self.headers = None
+        self.chunks = deque()
+        self.ended = False
+        self.error = None
+        self.responded = False
+
+
+class _StreamDispatcher:
+    """
+    h2 event handling shared by the threaded and the asyncio connections.
+    """
+
+    def _new_h2(self):
+        config = h2.config.H2Configuration(client_side=True, header_encoding=None)
+        connection = h2.connection.H2Connection(config=config)
+        connection.initiate_connection()
+        return connection
+
+    def _dispatch(self, events):
+        for event in events:
+            stream = self._streams.get(getattr(event, "stream_id", None))
+            if isinstance(event, h2.events.ResponseReceived):
+                if stream is not None:
+                    stream.status, stream.headers = _split_response_headers(event.headers)
+                    stream.responded = True
+            elif isinstance(event, h2.events.DataReceived):
+                if stream is not None:
+                    stream.chunks.append((event.data, event.flow_controlled_length))
+                else:
+                    self._h2.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            elif isinstance(event, h2.events.StreamEnded):
+                if stream is not None:
+                    stream.ended = True
+            elif isinstance(event, h2.events.StreamReset):
+                if stream is not None:
+                    stream.error = HTTP2StreamError(f"Stream reset by peer (error {event.error_code})")
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self._fail_all(HTTP2StreamError(f"Connection terminated (error {event.error_code})"))
+
+    def _fail_all(self, error):
+        self.closed = True
+        for stream in self._streams.values():
+            if not stream.ended and stream.error is None:
+                stream.error = error
+
+    def _can_open_stream(self):
+        return self._h2.open_outbound_streams < self._h2.remote_settings.max_concurrent_streams
+
+    @property
+    def open_streams(self):
+        return self._h2.open_outbound_streams
+
+
+class HTTP2Connection(_StreamDispatcher):
+    """
+    One HTTP/2 connection multiplexing concurrent requests from many threads.
+
+    A background thread reads frames and hands them to the waiting streams,
+    so every in-flight request shares the same socket. Response bodies are
+    streamed and acknowledged (flow control) only as they are consumed.
+    """
+
+    def __init__(self, host, port, secure=True, ssl_context=None, timeout=None, sock=None,
+                 read_timeout=None):
+        """
+        :param host: Server host name
+        :param port: Server port
+        :param secure: Negotiate HTTP/2 over TLS with ALPN (False uses h2c prior knowledge)
+        :param ssl_context: Optional SSLContext (must offer "h2" in ALPN)
+        :param timeout: Connect timeout in seconds
+        :param sock: Optional already connected socket (TLS or not)
+        :param read_timeout: Seconds a request waits for the server before HTTP2TimeoutError
+            (None waits forever)
+        :raises: HTTP2NotNegotiated when the server picks HTTP/1.1
+        """
+        if h2 is None:
+            raise ImportError("HTTP/2 support requires the 'h2' package")
+        self.host = host
+        self.port = port
+        self.read_timeout = read_timeout
+        self.closed = False
+        self._retired = False
+        if sock is None:
+            sock = get_default_dns_cache().create_connection((host, port), timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if secure:
+                sock = (ssl_context or _ssl_context()).wrap_socket(sock, server_hostname=host)
+        if secure and sock.selected_alpn_protocol() != "h2":
+            sock.close()
+            raise HTTP2NotNegotiated(f"{host}:{port} does not speak HTTP/2")
+        # The reader thread blocks on recv; timeouts apply per request instead.
+        sock.settimeout(None)
+        self._sock = sock
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        self._streams = {}
+        self._h2 = self._new_h2()
+        self._flush()
+        self._reader = threading.Thread(target=self._read_forever, name=f"ehr-h2-{host}", daemon=True)
+        self._reader.start()
+
+    def _flush(self):
+        data = self._h2.data_to_send()
+        if data:
+            self._sock.sendall(data)
+
+    def _wait_for(self, predicate):
+        """
+        Wait (holding the lock) until ``predicate()`` holds, at most ``read_timeout`` seconds.
+
+        :raises: HTTP2TimeoutError
+        """
+        if not self._changed.wait_for(predicate, self.read_timeout):
+            raise HTTP2TimeoutError(
+                f"{self.host}:{self.port} sent nothing for {self.read_timeout}s"
+            )
+
+    def _read_forever(self):
+        try:
+            while True:
+                data = self._sock.recv(READ_SIZE)
+                if not data:
+                    raise HTTP2StreamError("Connection closed by peer")
+                with self._lock:
+                    self._dispatch(self._h2.receive_data(data))
+                    self._flush()
+                    self._forget_finished()
+                    self._changed.notify_all()
+                self._close_if_retired()
+        except Exception as e:
+            with self._lock:
+                self._fail_all(e if isinstance(e, HTTP2StreamError) else HTTP2StreamError(str(e)))
+                self._changed.notify_all()
+
+    def _forget_finished(self):
+        # Waiters hold their _Stream; fully delivered ones leave the table as
+        # they end, since urllib3 stops at Content-Length and may never ask for b"".
+        for stream_id in [stream_id for stream_id, stream in self._streams.items()
+                          if stream.ended and not stream.chunks]:
+            del self._streams[stream_id]
+
+    def request(self, method, url, headers=None, body=None):
+        """
+        Send a request on a new stream and wait for the response headers.
+
+        :return: urllib3 HTTPResponse whose body is read from the stream
+        """
+        scheme, _, _, authority, path = _target(url)
+        block = _request_headers(method, scheme, authority, path, headers)
+        chunks = _body_chunks(body)
+        has_body = body is not None
+
+        with self._lock:
+            self._wait_for(lambda: self.closed or self._can_open_stream())
+            if self.closed:
+                raise HTTP2StreamError("Connection is closed")
+            stream_id = self._h2.get_next_available_stream_id()
+            stream = self._streams[stream_id] = _Stream()
+            self._h2.send_headers(stream_id, block, end_stream=not has_body)
+            self._flush()
+
+        try:
+            if has_body:
+                self._send_body(stream_id, stream, chunks)
+            with self._lock:
+                self._wait_for(lambda: stream.responded or stream.error is not None)
+                if stream.error is not None and not stream.responded:
+                    raise stream.error
+        except BaseException:
+            self._discard(stream_id)
+            raise
+
+        return HTTPResponse(
+            body=_HTTP2Body(self, stream_id, stream),
+            headers=stream.headers,
+            status=stream.status,
+            version=20,
+            preload_content=False,
+            decode_content=False,
+            request_method=method,
+            request_url=url,
+        )
+
+    def _send_body(self, stream_id, stream, chunks):
+        for chunk in chunks:
+            view = memoryview(chunk)
+            while view:
+                with self._lock:
+                    self._wait_for(lambda: (
+                        stream.error is not None or self.closed
+                        or self._h2.local_flow_control_window(stream_id) > 0
+                    ))
+                    if stream.error is not None:
+                        raise stream.error
+                    size = min(
+                        len(view),
+                        self._h2.local_flow_control_window(stream_id),
+                        self._h2.max_outbound_frame_size,
+                    )
+                    self._h2.send_data(stream_id, view[:size].tobytes())
+                    self._flush()
+                view = view[size:]
+        with self._lock:
+            self._h2.end_stream(stream_id)
+            self._flush()
+
+    def _read_chunk(self, stream_id, stream):
+        """
+        Next body chunk of a stream (b"" once it ended), acknowledging it.
+        """
+        with self._lock:
+            self._wait_for(lambda: stream.chunks or stream.ended or stream.error is not None)
+            if stream.chunks:
+                data, flow_controlled_length = stream.chunks.popleft()
+                if not self.closed:
+                    self._h2.acknowledge_received_data(flow_controlled_length, stream_id)
+                    self._flush()
+                if not (stream.ended and not stream.chunks):
+                    return data
+                self._streams.pop(stream_id, None)
+            else:
+                if stream.error is not None and not stream.ended:
+                    raise stream.error
+                self._streams.pop(stream_id, None)
+                data = b""
+        self._close_if_retired()
+        return data
+
+    def _discard(self, stream_id):
+        with self._lock:
+            stream = self._streams.pop(stream_id, None)
+            if stream is not None and not stream.ended and not self.closed:
+                try:
+                    self._h2.reset_stream(stream_id)
+                    self._flush()
+                except (h2.exceptions.ProtocolError, OSError):
+                    pass
+            self._changed.notify_all()
+        self._close_if_retired()
+
+    def retire(self):
+        """
+        Close the connection once the streams in flight have finished.
+        """
+        with self._lock:
+            self._retired = True
+        self._close_if_retired()
+
+    def _close_if_retired(self):
+        # Checked and closed under one lock hold, so no stream slips in between.
+        with self._lock:
+            if self._retired and not self._streams and not self.closed:
+                self.close()
+
+    def close(self):
+        with self._lock:
+            if not self.closed:
+                try:
+                    self._h2.close_connection()
+                    self._flush()
+                except OSError:
+                    pass
+            self.closed = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+
+class _HTTP2Body(io.RawIOBase):
+    """
+    File-like view of a response stream, fed to urllib3's HTTPResponse.
+    """
+
+    def __init__(self, connection, stream_id, stream):
+        self._connection = connection
+        self._stream_id = stream_id
+        self._stream = stream
+        self._pending = b""
+        self._done = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self._pending and not self._done:
+            self._pending = self._connection._read_chunk(self._stream_id, self._stream)
+            self._done = not self._pending
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self):
+        if not self._done:
+            self._done = True
+            self._connection._discard(self._stream_id)
+        super().close()
+
+
+class HostSelector:
+    """
+    Decide which hosts use HTTP/2.
+
+    ``True`` selects every https host; an iterable of fnmatch patterns
+    selects matching hosts, including plain http ones (h2c prior knowledge).
+    """
+
+    def __init__(self, hosts):
+        self.all_https = hosts is True
+        self.patterns = () if hosts in (None, False, True) else tuple(hosts)
+
+    def __call__(self, scheme, host):
+        if self.all_https and scheme == "https":
+            return True
+        return any(fnmatch.fnmatch(host, pattern) for pattern in self.patterns)
+
+
+class _PendingConnection:
+    """
+    A connection being opened; other threads asking for the origin wait on it.
+    """
+
+    __slots__ = ("done", "connection", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.connection = None
+        self.error = None
+
+
+class HTTP2Pool:
+    """
+    One multiplexed HTTP/2 connection per origin, shared across threads.
+
+    Origins that refuse HTTP/2 during ALPN are remembered and answered with
+    None, so the caller falls back to its HTTP/1.1 pool. Connections are
+    opened outside the pool lock, so a slow origin never holds up the others.
+    """
+
+    def __init__(self, hosts=True, ca_certs=None, timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT):
+        """
+        :param hosts: True for every https host, or an iterable of host patterns
+        :param ca_certs: Optional CA bundle used to verify servers
+        :param timeout: Connect timeout in seconds (None waits forever)
+        :param read_timeout: Seconds a request waits for the server (None waits forever)
+        """
+        self.select = HostSelector(hosts)
+        self.timeout = timeout
+        self.read_timeout = read_timeout
+        self._ssl_context = _ssl_context(ca_certs)
+        self._connections = {}
+        self._connecting = {}
+        self._http1_only = set()
+        self._lock = threading.Lock()
+
+    def handles(self, url):
+        scheme, host, port, _, _ = _target(url)
+        return (
+            h2 is not None
+            and (scheme, host, port) not in self._http1_only
+            and self.select(scheme, host)
+        )
+
+    def _connection(self, scheme, host, port):
+        key = (scheme, host, port)
+        with self._lock:
+            connection = self._connections.get(key)
+            if connection is not None and not connection.closed:
+                return connection
+            if key in self._http1_only:
+                return None
+            pending = self._connecting.get(key)
+            opening = pending is None
+            if opening:
+                pending = self._connecting[key] = _PendingConnection()
+
+        if not opening:
+            # Another thread is already connecting: share its outcome.
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.connection
+
+        try:
+            pending.connection = HTTP2Connection(
+                host, port, secure=scheme == "https", ssl_context=self._ssl_context,
+                timeout=self.timeout, read_timeout=self.read_timeout,
+            )
+        except HTTP2NotNegotiated:
+            with self._lock:
+                self._http1_only.add(key)
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                if pending.connection is not None:
+                    self._connections[key] = pending.connection
+                del self._connecting[key]
+            pending.done.set()
+        return pending.connection
+
+    def warm_up(self, url):
+        """
+        Open (and TLS-handshake) the HTTP/2 connection for ``url`` ahead of time.
+
+        :return: True when the origin speaks HTTP/2
+        """
+        scheme, host, port, _, _ = _target(url)
+        return self._connection(scheme, host, port) is not None
+
+    def urlopen(self, method, url, headers=None, body=None):
+        """
+        Send the request over HTTP/2.
+
+        :return: urllib3 HTTPResponse, or None when the origin only speaks HTTP/1.1
+        """
+        scheme, host, port, _, _ = _target(url)
+        for attempt in (1, 2):
+            connection = self._connection(scheme, host, port)
+            if connection is None:
+                return None
+            try:
+                return connection.request(method, url, headers=headers, body=body)
+            except HTTP2StreamError:
+                # A connection that went away before sending is replaced once;
+                # streamed bodies cannot be replayed.
+                if attempt == 2 or not connection.closed or is_streamed(body):
+                    raise
+
+    def stats(self):
+        with self._lock:
+            return {
+                f"{scheme}://{host}:{port}": connection.open_streams
+                for (scheme, host, port), connection in self._connections.items()
+                if not connection.closed
+            }
+
+    def clear(self):
+        """
+        Forget every connection, closing each once its streams in flight are done.
+        """
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for connection in connections:
+            connection.retire()
+
+
+class AsyncHTTP2Connection(_StreamDispatcher):
+    """
+    asyncio counterpart of HTTP2Connection.
+    """
+
+    def __init__(self, reader, writer):
+        self.closed = False
+        self._reader = reader
+        self._writer = writer
+        self._streams = {}
+        self._changed = asyncio.Condition()
+        self._h2 = self._new_h2()
+        self._flush()
+        self._reader_task = asyncio.ensure_future(self._read_forever())
+
+    @classmethod
+    async def open(cls, host, port, secure=True, ssl_context=None, timeout=None):
+        """
+        Connect and negotiate HTTP/2.
+
+        :raises: HTTP2NotNegotiated when the server picks HTTP/1.1
+        """
+        if h2 is None:
+            raise ImportError("HTTP/2 support requires the 'h2' package")
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                host, port,
+                ssl=(ssl_context or _ssl_context()) if secure else None,
+                server_hostname=host if secure else None,
+            ),
+            timeout,
+        )
+        if secure:
+            ssl_object = writer.get_extra_info("ssl_object")
+            if ssl_object is None or ssl_object.selected_alpn_protocol() != "h2":
+                writer.close()
+                raise HTTP2NotNegotiated(f"{host}:{port} does not speak HTTP/2")
+        return cls(reader, writer)
+
+    def _flush(self):
+        data = self._h2.data_to_send()
+        if data:
+            self._writer.write(data)
+
+    async def _notify(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _read_forever(self):
+        try:
+            while True:
+                data = await self._reader.read(READ_SIZE)
+                if not data:
+                    raise HTTP2StreamError("Connection closed by peer")
+                self._dispatch(self._h2.receive_data(data))
+                self._flush()
+                await self._notify()
+        except asyncio.CancelledError:
+            self._fail_all(HTTP2StreamError("Connection closed"))
+            raise
+        except Exception as e:
+            self._fail_all(e if isinstance(e, HTTP2StreamError) else HTTP2StreamError(str(e)))
+            await self._notify()
+
+    async def _wait_for(self, predicate):
+        async with self._changed:
+            await self._changed.wait_for(predicate)
+
+    async def request(self, method, url, headers=None, body=None):
+        """
+        Send a request on a new stream and read the whole response.
+
+        :return: Tuple (status, headers, body bytes)
+        """
+        scheme, _, _, authority, path = _target(url)
+        block = _request_headers(method, scheme, authority, path, headers)
+        has_body = body is not None
+
+        await self._wait_for(lambda: self.closed or self._can_open_stream())
+        if self.closed:
+            raise HTTP2StreamError("Connection is closed")
+        stream_id = self._h2.get_next_available_stream_id()
+        stream = self._streams[stream_id] = _Stream()
+        self._h2.send_headers(stream_id, block, end_stream=not has_body)
+        self._flush()
+
+        try:
+            if has_body:
+                await self._send_body(stream_id, stream, body)
+            data = bytearray()
+            while True:
+                await self._wait_for(
+                    lambda: stream.chunks or stream.ended or stream.error is not None
+                )
+                while stream.chunks:
+                    chunk, flow_controlled_length = stream.chunks.popleft()
+                    data += chunk
+                    if not self.closed:
+                        self._h2.acknowledge_received_data(flow_controlled_length, stream_id)
+                if stream.ended:
+                    break
+                if stream.error is not None:
+                    raise stream.error
+                self._flush()
+                await self._writer.drain()
+            return stream.status, stream.headers, bytes(data)
+        finally:
+            self._streams.pop(stream_id, None)
+            if not stream.ended and not self.closed:
+                try:
+                    self._h2.reset_stream(stream_id)
+                except h2.exceptions.ProtocolError:
+                    pass
+            self._flush()
+
+    async def _send_body(self, stream_id, stream, body):
+        if hasattr(body, "__aiter__"):
+            chunks = body
+        else:
+            async def sync_chunks():
+                for chunk in _body_chunks(body):
+                    yield chunk
+            chunks = sync_chunks()
+
+        async for chunk in chunks:
+            view = memoryview(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+            while view:
+                await self._wait_for(
+                    lambda: stream.error is not None or self.closed
+                    or self._h2.local_flow_control_window(stream_id) > 0
+                )
+                if stream.error is not None:
+                    raise stream.error
+                size = min(
+                    len(view),
+                    self._h2.local_flow_control_window(stream_id),
+                    self._h2.max_outbound_frame_size,
+                )
+                self._h2.send_data(stream_id, view[:size].tobytes())
+                self._flush()
+                await self._writer.drain()
+                view = view[size:]
+        self._h2.end_stream(stream_id)
+        self._flush()
+
+    async def close(self):
+        if not self.closed:
+            self.closed = True
+            self._h2.close_connection()
+            self._flush()
+        self._reader_task.cancel()
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except (OSError, ssl.SSLError):
+            pass
+
+
+class AsyncHTTP2Pool:
+    """
+    asyncio counterpart of HTTP2Pool (one connection per origin).
+    """
+
+    def __init__(self, hosts=True, ca_certs=None, timeout=DEFAULT_CONNECT_TIMEOUT):
+        self.select = HostSelector(hosts)
+        self.timeout = timeout
+        self._ssl_context = _ssl_context(ca_certs)
+        self._connections = {}
+        self._connecting = {}
+        self._http1_only = set()
+
+    def handles(self, url):
+        scheme, host, port, _, _ = _target(url)
+        return (
+            h2 is not None
+            and (scheme, host, port) not in self._http1_only
+            and self.select(scheme, host)
+        )
+
+    async def _connection(self, scheme, host, port):
+        key = (scheme, host, port)
+        connection = self._connections.get(key)
+        if connection is not None and not connection.closed:
+            return connection
+
+        # Concurrent first requests share a single connection attempt.
+        pending = self._connecting.get(key)
+        if pending is None:
+            pending = self._connecting[key] = asyncio.ensure_future(AsyncHTTP2Connection.open(
+                host, port, secure=scheme == "https",
+                ssl_context=self._ssl_context, timeout=self.timeout,
+            ))
+        try:
+            connection = await asyncio.shield(pending)
+        except HTTP2NotNegotiated:
+            self._http1_only.add(key)
+            return None
+        finally:
+            if self._connecting.get(key) is pending and pending.done():
+                del self._connecting[key]
+        self._connections[key] = connection
+        return connection
+
+    async def request(self, method, url, headers=None, body=None):
+        """
+        Send the request over HTTP/2.
+
+        :return: Tuple (status, headers, body), or None when the origin only speaks HTTP/1.1
+        """
+        connection = await self._connection(*_target(url)[:3])
+        if connection is None:
+            return None
+        return await connection.request(method, url, headers=headers, body=body)
+
+    async def close(self):
+        connections = list(self._connections.values())
+        self._connections.clear()
+        for connection in connections:
+            await connection.close()
@@ -0,0 +1,178 @@
+import json
+import dataclasses
+import importlib
+
+
+class JSONBackend:
+    """
+    Interface of a JSON implementation.
+
+    ``dumps`` always returns bytes, so request bodies never make a str round
+    trip, and ``loads`` accepts bytes directly.
+    """
+    name = None
+
+    def dumps(self, obj):
+        raise NotImplementedError
+
+    def loads(self, data):
+        raise NotImplementedError
+
+    def decode(self, data, type=None):
+        """
+        Decode ``data``, optionally converting it into ``type``.
+
+        :param data: JSON document (bytes or str)
+        :param type: Optional dataclass (or msgspec Struct) to build
+        :return: Decoded object
+        """
+        obj = self.loads(data)
+        if type is None:
+            return obj
+        return _convert(obj, type)
+
+    def __repr__(self):
+        return f"<JSONBackend {self.name}>"
+
+
+class StdlibBackend(JSONBackend):
+    name = "json"
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonBackend(JSONBackend):
+    name = "orjson"
+
+    def __init__(self):
+        self._orjson = importlib.import_module("orjson")
+
+    def dumps(self, obj):
+        return self._orjson.dumps(obj)
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+
+class MsgspecBackend(JSONBackend):
+    name = "msgspec"
+
+    def __init__(self):
+        self._msgspec = importlib.import_module("msgspec")
+        self._encoder = self._msgspec.json.Encoder()
+        self._decoders = {}
+
+    def dumps(self, obj):
+        return self._encoder.encode(obj)
+
+    def loads(self, data):
+        return self._msgspec.json.decode(data)
+
+    def decode(self, data, type=None):
+        if type is None:
+            return self.loads(data)
+        # msgspec validates and builds Structs/dataclasses straight from the bytes.
+        decoder = self._decoders.get(type)
+        if decoder is None:
+            decoder = self._decoders[type] = self._msgspec.json.Decoder(type)
+        return decoder.decode(data)
+
+
+class UjsonBackend(JSONBackend):
+    name = "ujson"
+
+    def __init__(self):
+        self._ujson = importlib.import_module("ujson")
+
+    def dumps(self, obj):
+        return self._ujson.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    def loads(self, data):
+        return self._ujson.loads(data)
+
+
+BACKENDS = {
+    "orjson": OrjsonBackend,
+    "msgspec": MsgspecBackend,
+    "ujson": UjsonBackend,
+    "json": StdlibBackend,
+}
+
+# Fastest first; the stdlib always works.
+PREFERENCE = ("orjson", "msgspec", "ujson", "json")
+
+
+def _convert(obj, type):
+    if dataclasses.is_dataclass(type):
+        if isinstance(obj, list):
+            return [type(**item) for item in obj]
+        return type(**obj)
+    try:
+        msgspec = importlib.import_module("msgspec")
+    except ImportError:
+        raise TypeError(f"Cannot decode JSON into {type!r} without msgspec") from None
+    return msgspec.convert(obj, type)
+
+
+def load_backend(name):
+    """
+    Instantiate the backend called ``name``.
+
+    :raises: ImportError when the backend's package is not installed
+    """
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown JSON backend: {name}") from None
+    return backend_class()
+
+
+_backend = None
+
+
+def get_json_backend():
+    """
+    Return the JSON backend in use, picking the fastest installed one on first use.
+    """
+    global _backend
+    if _backend is None:
+        for name in PREFERENCE:
+            try:
+                _backend = load_backend(name)
+                break
+            except ImportError:
+                continue
+    return _backend
+
+
+def set_json_backend(backend):
+    """
+    Force the JSON backend used by every client.
+
+    :param backend: Backend name ("orjson", "msgspec", "ujson", "json") or a JSONBackend
+    :return: The backend now in use
+    """
+    global _backend
+    _backend = load_backend(backend) if isinstance(backend, str) else backend
+    return _backend
+
+
+def dumps(obj):
+    """
+    Serialize ``obj`` to JSON bytes with the current backend.
+    """
+    return get_json_backend().dumps(obj)
+
+
+def loads(data, type=None):
+    """
+    Parse JSON bytes with the current backend.
+
+    :param data: JSON document (bytes or str)
+    :param type: Optional dataclass (or msgspec Struct) to decode into
+    """
+    return get_json_backend().decode(data, type)
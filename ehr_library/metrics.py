@@ -0,0 +1,218 @@
+import bisect
+import threading
+from time import perf_counter
+
+
+PHASES = ("queue_wait", "connect", "tls", "ttfb", "download", "decompress", "parse", "total")
+
+# Upper bounds (seconds) of the latency histogram buckets: 100us .. ~105s.
+DEFAULT_BUCKETS = tuple(0.0001 * 2 ** exponent for exponent in range(21))
+
+
+class RequestTiming:
+    """
+    Phase breakdown and counters of a single request.
+    """
+    __slots__ = ("host", "method", "status", "phases", "checkouts", "new_connections",
+                 "retries", "bytes_in", "bytes_out", "started")
+
+    def __init__(self, host, method):
+        self.host = host
+        self.method = method
+        self.status = None
+        self.phases = {}
+        self.checkouts = 0
+        self.new_connections = 0
+        self.retries = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.started = perf_counter()
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def finish(self):
+        self.phases["total"] = perf_counter() - self.started
+        return self
+
+
+class MetricsSink:
+    """
+    Interface of the metrics sinks HTTPSessionManager reports to.
+
+    Subclass it to forward measurements to another metrics system.
+    """
+
+    def record(self, timing):
+        """
+        Called once per request with its RequestTiming.
+        """
+
+    def observe(self, host, phase, seconds):
+        """
+        Called for phases measured outside the session (e.g. parsing).
+        """
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: constant memory, cheap inserts, approximate percentiles.
+    """
+    __slots__ = ("bounds", "counts", "count", "total")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q):
+        """
+        Estimate the ``q`` quantile (0..1) by interpolating inside its bucket.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.bounds[-1]
+
+
+class InMemoryMetrics(MetricsSink):
+    """
+    Metrics sink keeping per-host phase histograms and counters in memory.
+    """
+
+    COUNTERS = ("requests", "checkouts", "new_connections", "retries", "bytes_in", "bytes_out")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.histograms = {}
+        self.counters = {}
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, host, phase):
+        histogram = self.histograms.get((host, phase))
+        if histogram is None:
+            histogram = self.histograms[(host, phase)] = Histogram(self.buckets)
+        return histogram
+
+    def record(self, timing):
+        with self._lock:
+            for phase, seconds in timing.phases.items():
+                self._histogram(timing.host, phase).observe(seconds)
+
+            counters = self.counters.get(timing.host)
+            if counters is None:
+                counters = self.counters[timing.host] = dict.fromkeys(self.COUNTERS, 0)
+            counters["requests"] += 1
+            counters["checkouts"] += timing.checkouts
+            counters["new_connections"] += timing.new_connections
+            counters["retries"] += timing.retries
+            counters["bytes_in"] += timing.bytes_in
+            counters["bytes_out"] += timing.bytes_out
+
+            status_key = (timing.host, timing.status)
+            self.statuses[status_key] = self.statuses.get(status_key, 0) + 1
+
+    def observe(self, host, phase, seconds):
+        with self._lock:
+            self._histogram(host, phase).observe(seconds)
+
+    def percentile(self, host, phase="total", q=0.99):
+        """
+        Approximate latency percentile of a phase for one host.
+        """
+        with self._lock:
+            histogram = self.histograms.get((host, phase))
+            return histogram.percentile(q) if histogram else None
+
+    def reuse_ratio(self, host):
+        """
+        Share of pool checkouts served by an already open connection.
+        """
+        with self._lock:
+            counters = self.counters.get(host)
+            if not counters or not counters["checkouts"]:
+                return None
+            reused = counters["checkouts"] - counters["new_connections"]
+            return max(0, reused) / counters["checkouts"]
+
+    def snapshot(self):
+        """
+        Plain-data copy of everything recorded so far.
+        """
+        with self._lock:
+            return {
+                "counters": {host: dict(values) for host, values in self.counters.items()},
+                "statuses": dict(self.statuses),
+                "latency": {
+                    f"{host}:{phase}": {
+                        "count": histogram.count,
+                        "sum": histogram.total,
+                        "p50": histogram.percentile(0.5),
+                        "p99": histogram.percentile(0.99),
+                    }
+                    for (host, phase), histogram in self.histograms.items()
+                },
+            }
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PrometheusExporter:
+    """
+    Render an InMemoryMetrics sink in the Prometheus text exposition format.
+    """
+
+    def __init__(self, metrics, prefix="ehr"):
+        self.metrics = metrics
+        self.prefix = prefix
+
+    def render(self):
+        """
+        :return: Prometheus text-format payload
+        """
+        metrics = self.metrics
+        prefix = self.prefix
+        lines = []
+        with metrics._lock:
+            name = f"{prefix}_request_phase_seconds"
+            lines.append(f"# HELP {name} Time spent in each request phase.")
+            lines.append(f"# TYPE {name} histogram")
+            for (host, phase), histogram in sorted(metrics.histograms.items()):
+                labels = f'host="{_escape(host)}",phase="{phase}"'
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.bounds, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.total}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+            name = f"{prefix}_responses_total"
+            lines.append(f"# HELP {name} Responses received by status code.")
+            lines.append(f"# TYPE {name} counter")
+            for (host, status), value in sorted(metrics.statuses.items(), key=str):
+                lines.append(f'{name}{{host="{_escape(host)}",status="{status}"}} {value}')
+
+            for counter in InMemoryMetrics.COUNTERS:
+                name = f"{prefix}_{counter}_total"
+                lines.append(f"# TYPE {name} counter")
+                for host, values in sorted(metrics.counters.items()):
+                    lines.append(f'{name}{{host="{_escape(host)}"}} {values[counter]}')
+
+        return "\n".join(lines) + "\n"
@@ -1 +1,23 @@
-from .call import AsyncRequestHandler
\ No newline at end of file
+import importlib
+
+
+# Importado sob demanda: aiohttp só é carregado quando o cliente assíncrono é usado.
+_LAZY = {
+    "AsyncRequestHandler": ".call",
+    "AsyncRequest": ".call",
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -1,23 +1,107 @@
+import time
 import asyncio
 import aiohttp
+import functools
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+from ..auth import get_default_token_cache
+from ..exceptions import HTTPRequestException
+from ..response import Response
+from ..compression import IncrementalDecoder, compress_body, get_codec_registry
+from ..uploads import MultipartEncoder, aiter_chunks, body_length, is_replayable, is_streamed
+from ..resilience import get_default_resilience_policy
+from ..coalesce import RequestCoalescer
+from ..jsonlib import dumps as json_dumps, loads as json_loads
+from ..utils import (
+    build_url,
+    get_proxy_url,
+    oauth2_token_request,
+    sanitize_headers,
+    static_auth_header,
+)
+
+
+@asynccontextmanager
+async def _rate_limit_async(rate_limiter, url):
+    """Aplica o RateLimiter (se houver) ao host da URL."""
+    if rate_limiter is None:
+        yield None
+    else:
+        async with rate_limiter.limit_async(urlsplit(url).hostname or "") as limiter:
+            yield limiter
+
+
+async def _read_body(response):
+    """Lê o corpo bruto e o descomprime pelo registro de codecs."""
+    decoder = IncrementalDecoder(response.headers.get("Content-Encoding"))
+    return decoder.decompress(await response.read()) + decoder.flush()
+
+
+async def _fetch_oauth2_token(oauth_config, proxy=None):
+    """
+    Busca um token OAuth 2.0 (client credentials).
+
+    Fica fora do AsyncRequest para que o refresh em background do cache de
+    tokens não mantenha nenhum cliente (nem sua ClientSession) vivo.
+
+    :param oauth_config: Dicionário com a configuração OAuth 2.0.
+    :param proxy: (Opcional) URL do proxy usado na requisição do token.
+    :return: Informações do token.
+    """
+    token_url, headers, body = oauth2_token_request(oauth_config)
+    async with aiohttp.ClientSession() as session:
+        async with session.post(token_url, headers=headers, data=body, proxy=proxy) as response:
+            data = await _read_body(response)
+            if response.status != 200:
+                raise HTTPRequestException(
+                    f"Failed to fetch OAuth 2.0 token: {data.decode('utf-8', 'replace')}",
+                    status_code=response.status,
+                    url=token_url,
+                )
+            token_data = json_loads(data)
+
+    return {
+        "access_token": token_data["access_token"],
+        "expires_at": time.time() + token_data["expires_in"],
+    }
 
 
 class AsyncRequestHandler:
-    def __init__(self, urls):
+    def __init__(self, urls=None, max_in_flight=100, timeout=None, rate_limiter=None):
+        """
+        :param urls: Iterável de URLs (ou specs {"url", "method", "headers", "body", "timeout"}).
+        :param max_in_flight: Número máximo de requisições em andamento no modo streaming.
+        :param timeout: (Opcional) Timeout padrão de cada requisição, em segundos.
+        :param rate_limiter: (Opcional) RateLimiter que controla o ritmo por host.
+        """
         self.urls = urls
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
 
-    async def fetch(self, session, url):
-        """Faz uma requisição GET assíncrona a um URL."""
+    async def fetch(self, session, url, method="GET", headers=None, body=None, timeout=None):
+        """Faz uma requisição assíncrona (GET por padrão) a um URL."""
         try:
-            async with session.get(url) as response:
-                return {
-                    "status": response.status,
-                    "data": await response.text(),
-                }
+            # Sem timeout explícito vale o da sessão (300 s por padrão no aiohttp).
+            options = {} if timeout is None else {"timeout": aiohttp.ClientTimeout(total=timeout)}
+            async with _rate_limit_async(self.rate_limiter, url) as limiter:
+                async with session.request(
+                    method,
+                    url,
+                    headers=headers,
+                    data=body,
+                    **options,
+                ) as response:
+                    if limiter is not None:
+                        limiter.feedback(response.status, response.headers.get("Retry-After"))
+                    return {
+                        "status": response.status,
+                        "data": await response.text(),
+                    }
         except Exception as e:
             return {
                 "status": "error",
-                "error": str(e),
+                "error": str(e) or e.__class__.__name__,
             }
 
     async def fetch_all(self):
@@ -31,3 +115,368 @@ class AsyncRequestHandler:
     def request(self):
         """Executa o loop de eventos e retorna as respostas."""
         return asyncio.run(self.fetch_all())
+
+    def _fetch_spec(self, session, spec, timeout):
+        """Converte uma URL ou spec em uma corrotina de fetch."""
+        if isinstance(spec, str):
+            return spec, self.fetch(session, spec, timeout=timeout)
+        return spec["url"], self.fetch(
+            session,
+            spec["url"],
+            method=spec.get("method", "GET").upper(),
+            headers=spec.get("headers"),
+            body=spec.get("body"),
+            timeout=spec.get("timeout", timeout),
+        )
+
+    async def iter_completed(self, urls=None, max_in_flight=None, timeout=None):
+        """
+        Gera pares (url, resultado) conforme as requisições terminam.
+
+        As URLs são consumidas de forma preguiçosa: no máximo
+        ``max_in_flight`` requisições ficam em andamento e novas entradas só
+        são lidas quando uma vaga é liberada, então a memória fica limitada
+        mesmo para entradas enormes.
+
+        :param urls: Iterável (ou iterável assíncrono) de URLs ou specs; usa self.urls se omitido.
+        :param max_in_flight: Limite de requisições simultâneas.
+        :param timeout: Timeout de cada requisição, em segundos.
+        """
+        source = urls if urls is not None else self.urls
+        max_in_flight = max_in_flight or self.max_in_flight
+        timeout = timeout if timeout is not None else self.timeout
+
+        if hasattr(source, "__aiter__"):
+            specs = aiter(source)
+            next_spec = lambda: anext(specs, None)
+        else:
+            specs = iter(source)
+
+            async def next_spec():
+                return next(specs, None)
+
+        connector = aiohttp.TCPConnector(limit=max_in_flight)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            pending = {}
+            exhausted = False
+            try:
+                while True:
+                    while not exhausted and len(pending) < max_in_flight:
+                        spec = await next_spec()
+                        if spec is None:
+                            exhausted = True
+                            break
+                        url, coroutine = self._fetch_spec(session, spec, timeout)
+                        pending[asyncio.ensure_future(coroutine)] = url
+
+                    if not pending:
+                        break
+
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield pending.pop(task), task.result()
+            finally:
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+
+    def iter_completed_sync(self, urls=None, max_in_flight=None, timeout=None):
+        """
+        Versão síncrona de ``iter_completed``, para código bloqueante.
+
+        Roda um loop de eventos próprio e entrega cada par (url, resultado)
+        assim que ele fica pronto.
+        """
+        loop = asyncio.new_event_loop()
+        results = self.iter_completed(urls, max_in_flight=max_in_flight, timeout=timeout)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(anext(results))
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.close()
+
+
+class AsyncRequest:
+    """
+    Cliente assíncrono com a mesma interface do Request.
+
+    Mantém uma única ClientSession (e um único connector) durante toda a
+    vida do cliente, com limite de conexões por host e um semáforo global
+    que limita quantas requisições ficam em andamento ao mesmo tempo.
+    """
+
+    def __init__(self, method, debug=False,
+                 proxies=None,
+                 user_agent=None,
+                 auth=None,
+                 limit=100,
+                 limit_per_host=10,
+                 concurrency=100,
+                 timeout=None,
+                 token_cache=None,
+                 rate_limiter=None,
+                 compress_requests=None,
+                 compress_min_size=1024,
+                 http2=None,
+                 retries=3,
+                 backoff_factor=0.3,
+                 resilience=None,
+                 coalesce=None):
+        """
+        :param method: Método HTTP padrão das requisições.
+        :param debug: Exibe as requisições enviadas.
+        :param proxies: Dicionário {"http": ..., "https": ...} com os proxies.
+        :param user_agent: User-Agent enviado nas requisições.
+        :param auth: Autenticação (basic, bearer ou oauth2), igual ao Request.
+        :param limit: Número máximo de conexões abertas pelo connector.
+        :param limit_per_host: Número máximo de conexões por host.
+        :param concurrency: Número máximo de requisições em andamento.
+        :param timeout: (Opcional) Timeout total de cada requisição, em segundos.
+        :param token_cache: (Opcional) Cache de tokens OAuth 2.0; usa o cache global se omitido.
+        :param rate_limiter: (Opcional) RateLimiter que controla o ritmo por host.
+        :param compress_requests: (Opcional) Codec usado para comprimir os corpos enviados ("gzip", "br", "zstd"...).
+        :param compress_min_size: Tamanho mínimo, em bytes, para comprimir um corpo.
+        :param http2: (Opcional) True para usar HTTP/2 com todo host https que o negociar, ou
+            padrões de host (também para http, via h2c). Requer o pacote ``h2``.
+        :param retries: Número máximo de novas tentativas (só requisições idempotentes, dentro do orçamento do host).
+        :param backoff_factor: Base do backoff exponencial com jitter entre tentativas.
+        :param resilience: (Opcional) ResiliencePolicy com orçamento de retries e circuit breaker por host;
+            criada a partir de ``retries`` e ``backoff_factor`` se omitida.
+        :param coalesce: (Opcional) True, ou um RequestCoalescer, para unir requisições GET/HEAD
+            idênticas em andamento numa única chamada.
+        """
+        self.method = method
+        self.debug = debug
+        self.proxies = proxies
+        self.user_agent = user_agent or "MyHttpClient/1.0"
+        self.auth = auth
+        self.token_info = None
+        self.token_cache = token_cache or get_default_token_cache()
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.compress_requests = compress_requests
+        self.compress_min_size = compress_min_size
+        self.resilience = resilience or get_default_resilience_policy().with_retries(retries, backoff_factor)
+        self.coalescer = RequestCoalescer() if coalesce is True else coalesce or None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._session = None
+        # Conexões HTTP/2 não passam por proxy.
+        self._http2 = None
+        if http2 and not proxies:
+            from ..http2 import AsyncHTTP2Pool
+
+            self._http2 = AsyncHTTP2Pool(hosts=http2)
+
+    async def _get_session(self):
+        """Cria a ClientSession compartilhada na primeira utilização."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+            )
+            # A descompressão passa pelo mesmo registro de codecs do cliente síncrono.
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                auto_decompress=False,
+                headers={"Accept-Encoding": get_codec_registry().accept_encoding()},
+            )
+        return self._session
+
+    def _add_user_agent(self, headers):
+        """
+        Add or override the User-Agent header.
+
+        :param headers: The existing headers
+        :return: Updated headers with User-Agent included
+        """
+        if headers is None:
+            headers = {}
+        headers["User-Agent"] = self.user_agent
+        return headers
+
+    async def _add_authentication(self, headers):
+        """
+        Add authentication headers based on the provided authentication type.
+
+        :param headers: Existing headers
+        :return: Updated headers with authentication
+        """
+        if not headers:
+            headers = {}
+
+        if self.auth:
+            authorization = static_auth_header(self.auth)
+            if authorization:
+                headers["Authorization"] = authorization
+
+            elif "oauth2" in self.auth:
+                self.token_info = await self.token_cache.get_token_async(
+                    self.auth["oauth2"], self._token_fetcher()
+                )
+                headers["Authorization"] = f"Bearer {self.token_info['access_token']}"
+
+        return headers
+
+    def _token_fetcher(self):
+        """Busca de token ligada apenas ao proxy deste cliente, nunca ao cliente."""
+        return functools.partial(_fetch_oauth2_token, proxy=get_proxy_url(self.proxies))
+
+    def _log_request(self, method, url, headers, params=None):
+        if self.debug:
+            sanitized_headers = sanitize_headers(headers)
+            print("DEBUG: HTTP Request")
+            print(f'Method::: {method}')
+            print(f'Url::: {url}')
+            if params:
+                print(f'Params::: {params}')
+            print(f'Headers::: {sanitized_headers}')
+            if self.proxies:
+                print(f'PROXIES::: {self.proxies}')
+
+    def build_url(self, base_url, params=None):
+        """
+        Constrói uma URL com query strings adicionadas ou atualizadas.
+
+        :param base_url: URL base.
+        :param params: Dicionário contendo os parâmetros de consulta.
+        :return: URL com query strings.
+        """
+        return build_url(base_url, params)
+
+    async def request(self, url: str, headers=None, body=None, params=None, method=None,
+                      json=None):
+        """
+        Send an HTTP request using the specified method.
+
+        :param url: URL for the request
+        :param headers: Optional dictionary of headers
+        :param body: Optional body: bytes, str, file object, (async) iterable or MultipartEncoder
+        :param params: Optional query parameters for the request
+        :param method: Optional method overriding the client's default one
+        :param json: Optional object sent as the JSON body (replaces ``body``)
+        :return: Response (body decoded lazily)
+        """
+        method = (method or self.method).upper()
+        headers = self._add_user_agent(headers)
+        if json is not None:
+            body = json_dumps(json)
+            headers.setdefault("Content-Type", "application/json")
+        if body is not None and self.compress_requests:
+            body, headers = compress_body(
+                body, headers, self.compress_requests, self.compress_min_size
+            )
+        # Corpos enviados em pedaços (geradores, pipes) não podem ser reenviados.
+        replayable = is_replayable(body)
+        start = body.tell() if replayable and is_streamed(body) else None
+        headers = await self._add_authentication(headers)
+        url = self.build_url(url, params)
+        self._log_request(method, url, headers, params)
+
+        key = self.coalescer.key(method, url, headers) if self.coalescer is not None else None
+        if key is not None:
+            return await self.coalescer.call_async(
+                key, lambda: self._send_with_retries(method, url, headers, body, replayable, start)
+            )
+        return await self._send_with_retries(method, url, headers, body, replayable, start)
+
+    async def _send_with_retries(self, method, url, headers, body, replayable, start):
+        """
+        Envia a requisição aplicando a ResiliencePolicy (circuit breaker e retries).
+        """
+        host = urlsplit(url).hostname or ""
+        # CircuitOpenException enquanto o host estiver instável.
+        self.resilience.before_request(host, url)
+        attempt = 0
+        while True:
+            if attempt and start is not None:
+                body.seek(start)
+            try:
+                response = await self._send(method, url, headers, body)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                self.resilience.record(host, error=e)
+                # Falhas de conexão nunca chegaram ao servidor: qualquer método pode ser repetido.
+                sent = not isinstance(e, aiohttp.ClientConnectorError)
+                if replayable and self.resilience.should_retry(host, method, headers, attempt, error=e, sent=sent):
+                    await asyncio.sleep(self.resilience.backoff(attempt))
+                    attempt += 1
+                    continue
+                raise
+            except Exception as e:
+                # Outros erros (ClientPayloadError, ...) também contam como falha do host.
+                self.resilience.record(host, error=e)
+                raise
+            except BaseException:
+                # Cancelada ou interrompida: libera a vaga de sonda do half-open sem julgar o host.
+                self.resilience.release(host)
+                raise
+            self.resilience.record(host, status=response.status)
+            if replayable and self.resilience.should_retry(host, method, headers, attempt, status=response.status):
+                await asyncio.sleep(self.resilience.backoff(attempt, response.headers.get("Retry-After")))
+                attempt += 1
+                continue
+            return response
+
+    async def _send(self, method, url, headers, body):
+        """
+        Envia uma única tentativa, por HTTP/2 quando disponível.
+        """
+        if is_streamed(body):
+            body, headers = self._stream_body(body, dict(headers))
+        session = await self._get_session()
+        async with self._semaphore, _rate_limit_async(self.rate_limiter, url) as limiter:
+            if self._http2 is not None and self._http2.handles(url):
+                headers.setdefault("Accept-Encoding", get_codec_registry().accept_encoding())
+                # None quando o servidor recusou HTTP/2 no ALPN: segue por HTTP/1.1.
+                result = await self._http2.request(method, url, headers=headers, body=body)
+                if result is not None:
+                    status, response_headers, data = result
+                    if limiter is not None:
+                        limiter.feedback(status, response_headers.get("Retry-After"))
+                    decoder = IncrementalDecoder(response_headers.get("Content-Encoding"))
+                    return Response(status, response_headers, decoder.decompress(data) + decoder.flush(), url)
+            async with session.request(
+                method,
+                url,
+                headers=headers,
+                data=body,
+                proxy=get_proxy_url(self.proxies),
+            ) as response:
+                if limiter is not None:
+                    limiter.feedback(response.status, response.headers.get("Retry-After"))
+                return Response(response.status, response.headers, await _read_body(response), url)
+
+    @staticmethod
+    def _stream_body(body, headers):
+        """
+        Envia arquivos, iteráveis (síncronos ou assíncronos) e MultipartEncoder
+        em pedaços, com Content-Length quando o tamanho é conhecido (chunked caso contrário).
+        """
+        if isinstance(body, MultipartEncoder):
+            headers.setdefault("Content-Type", body.content_type)
+        length = body_length(body)
+        if length is not None:
+            headers.setdefault("Content-Length", str(length))
+        return aiter_chunks(body), headers
+
+    async def close(self):
+        """Fecha a sessão e todas as conexões do connector."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self._http2 is not None:
+            await self._http2.close()
+
+    async def __aenter__(self):
+        await self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
@@ -1,66 +1,300 @@
 import time
+import heapq
 import random
+import asyncio
+import warnings
 import threading
+from collections import deque
+from itertools import count
+
+
+class _KeyState:
+    """
+    Token bucket de uma chave: ``capacity`` usos, reabastecidos a ``rate`` por segundo.
+    """
+    __slots__ = ("name", "value", "capacity", "rate", "weight",
+                 "tokens", "updated", "pass_value")
+
+    def __init__(self, name, value, capacity, rate, weight, now):
+        self.name = name
+        self.value = value
+        self.capacity = capacity
+        self.rate = rate
+        self.weight = weight
+        self.tokens = float(capacity)
+        self.updated = now
+        self.pass_value = 0.0
+
+    def refill(self, now):
+        if self.rate and self.tokens < self.capacity:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_at(self, now):
+        """Instante em que a chave volta a ter um uso disponível."""
+        if self.tokens >= 1:
+            return now
+        if not self.rate:
+            return float("inf")
+        return now + (1 - self.tokens) / self.rate
+
+
+class _RingQueue:
+    """Round robin: fila circular, O(1)."""
+
+    def __init__(self):
+        self._items = deque()
+
+    def push(self, state):
+        self._items.append(state)
+
+    def pop(self):
+        return self._items.popleft()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class _RandomQueue:
+    """Escolha aleatória uniforme, O(1) (troca com o último e remove)."""
+
+    def __init__(self):
+        self._items = []
+
+    def push(self, state):
+        self._items.append(state)
+
+    def pop(self):
+        index = random.randrange(len(self._items))
+        self._items[index], self._items[-1] = self._items[-1], self._items[index]
+        return self._items.pop()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class _HeapQueue:
+    """Heap ordenado por ``priority(state)``, O(log n)."""
+
+    def __init__(self, priority):
+        self._priority = priority
+        self._items = []
+        self._sequence = count()
+
+    def push(self, state):
+        heapq.heappush(self._items, (self._priority(state), next(self._sequence), state))
+
+    def pop(self):
+        return heapq.heappop(self._items)[2]
+
+    def __len__(self):
+        return len(self._items)
 
 
 class APIKeyManager:
-    def __init__(self, keys_with_limits, rotation_interval=None):
+    POLICIES = ("round_robin", "least_loaded", "weighted", "random")
+
+    def __init__(self, keys_with_limits, rotation_interval=None, policy="round_robin"):
         """
         Inicializa o gerenciador de chaves de API.
 
-        :param keys_with_limits: Dicionário {chave: limite} onde 'limite' é o número máximo de usos por chave.
-        :param rotation_interval: (Opcional) Intervalo em segundos para rotacionar as chaves periodicamente.
+        Cada chave tem um token bucket com ``limit`` usos. Com
+        ``rotation_interval`` os usos são reabastecidos continuamente (``limit``
+        por intervalo), sem thread de reset; sem ele, só ``reset_usage`` os repõe.
+
+        :param keys_with_limits: Dicionário {chave: {"value": ..., "limit": ..., "weight": ...}}; "weight" é opcional.
+        :param rotation_interval: (Opcional) Intervalo em segundos em que o limite de cada chave é reabastecido.
+        :param policy: Política de escolha: "round_robin", "least_loaded", "weighted" ou "random".
         """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Política desconhecida: {policy}")
+
         self.keys_with_limits = keys_with_limits
+        self.rotation_interval = rotation_interval
+        self.policy = policy
         self.usage_count = {key: 0 for key in keys_with_limits}
         self.last_used_key = None
 
-        # Inicia a rotação periódica das chaves, se o intervalo for fornecido
-        if rotation_interval:
-            thread = threading.Thread(target=self.rotate_keys_periodically, args=(rotation_interval,))
-            thread.daemon = True
-            thread.start()
+        now = time.monotonic()
+        self._states = [
+            _KeyState(
+                key,
+                data["value"],
+                data["limit"],
+                data["limit"] / rotation_interval if rotation_interval else 0.0,
+                data.get("weight", 1),
+                now,
+            )
+            for key, data in keys_with_limits.items()
+        ]
+        self._virtual_time = 0.0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._rebuild()
+
+    def _new_queue(self):
+        if self.policy == "round_robin":
+            return _RingQueue()
+        if self.policy == "random":
+            return _RandomQueue()
+        if self.policy == "least_loaded":
+            return _HeapQueue(lambda state: -state.tokens / state.capacity)
+        return _HeapQueue(lambda state: state.pass_value)
+
+    def _rebuild(self):
+        self._ready = self._new_queue()
+        self._exhausted = []
+        self._sequence = count()
+        now = time.monotonic()
+        for state in self._states:
+            state.refill(now)
+            self._park(state, now)
+
+    def _park(self, state, now):
+        if state.tokens >= 1:
+            self._ready.push(state)
+        else:
+            heapq.heappush(self._exhausted, (state.ready_at(now), next(self._sequence), state))
+
+    def _try_acquire(self):
+        """Tenta consumir um uso; retorna o estado da chave ou None. Exige o lock."""
+        now = time.monotonic()
+        while self._exhausted and self._exhausted[0][0] <= now:
+            state = heapq.heappop(self._exhausted)[2]
+            state.refill(now)
+            # Chaves que voltam não podem "furar" a fila da política ponderada.
+            state.pass_value = max(state.pass_value, self._virtual_time)
+            self._park(state, now)
+
+        while self._ready:
+            state = self._ready.pop()
+            state.refill(now)
+            if state.tokens >= 1:
+                break
+            self._park(state, now)
+        else:
+            return None
+
+        state.tokens -= 1
+        self._virtual_time = state.pass_value
+        state.pass_value += 1 / state.weight
+        self._park(state, now)
+
+        self.usage_count[state.name] += 1
+        self.last_used_key = state.name
+        return state
+
+    def _next_ready_at(self):
+        return self._exhausted[0][0] if self._exhausted else float("inf")
 
-    def get_next_key(self):
+    def get_next_key(self, wait=True, timeout=None):
         """
-        Retorna a próxima chave de API disponível com base nos limites.
+        Retorna a próxima chave de API disponível segundo a política.
 
+        :param wait: Espera a próxima chave ficar disponível em vez de falhar.
+        :param timeout: (Opcional) Tempo máximo de espera, em segundos.
         :return: Uma chave de API disponível.
-        :raises: RuntimeError se nenhuma chave estiver disponível.
+        :raises: RuntimeError se nenhuma chave ficar disponível a tempo.
         """
-        for key, data in self.keys_with_limits.items():
-            if self.usage_count[key] < data["limit"]:
-                self.usage_count[key] += 1
-                self.last_used_key = key
-                print(f'VALOR CHAVE::: {data["value"]}')
-                return data["value"]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._available:
+            while True:
+                state = self._try_acquire()
+                if state is not None:
+                    return state.value
 
-        raise RuntimeError("Todas as chaves atingiram o limite de uso.")
+                if not wait:
+                    raise RuntimeError("Todas as chaves atingiram o limite de uso.")
+                now = time.monotonic()
+                delay = self._next_ready_at() - now
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise RuntimeError("Todas as chaves atingiram o limite de uso.")
+                    delay = min(delay, remaining)
+                elif delay == float("inf"):
+                    # Sem reabastecimento e sem timeout, esperar seria para sempre.
+                    raise RuntimeError("Todas as chaves atingiram o limite de uso.")
+                self._available.wait(max(delay, 0))
+
+    async def get_next_key_async(self, timeout=None):
+        """
+        Versão assíncrona de ``get_next_key``: aguarda sem bloquear o loop.
+
+        :param timeout: (Opcional) Tempo máximo de espera, em segundos.
+        :return: Uma chave de API disponível.
+        :raises: RuntimeError se nenhuma chave ficar disponível a tempo.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                state = self._try_acquire()
+                next_ready_at = self._next_ready_at()
+            if state is not None:
+                return state.value
+
+            now = time.monotonic()
+            delay = next_ready_at - now
+            if delay == float("inf"):
+                if deadline is None:
+                    raise RuntimeError("Todas as chaves atingiram o limite de uso.")
+                # Sem reabastecimento, só um reset_usage libera chaves: verifica periodicamente.
+                delay = 0.05
+            if deadline is not None:
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise RuntimeError("Todas as chaves atingiram o limite de uso.")
+                delay = min(delay, remaining)
+            await asyncio.sleep(max(delay, 0))
 
     def reset_usage(self):
         """
-        Reseta os contadores de uso para todas as chaves.
+        Reseta os contadores de uso e reabastece todas as chaves.
         """
-        self.usage_count = {key: 0 for key in self.keys_with_limits}
+        with self._available:
+            self.usage_count = {key: 0 for key in self.keys_with_limits}
+            for state in self._states:
+                state.tokens = float(state.capacity)
+            self._rebuild()
+            self._available.notify_all()
 
     def rotate_keys_periodically(self, interval_seconds):
         """
-        Rotaciona as chaves periodicamente, resetando os contadores de uso.
+        Obsoleto: use ``APIKeyManager(rotation_interval=...)``.
+
+        Antes zerava os contadores a cada ``interval_seconds`` num loop
+        bloqueante. Agora só configura o reabastecimento contínuo dos token
+        buckets (``limit`` usos por intervalo) e retorna imediatamente.
 
         :param interval_seconds: Intervalo em segundos para a rotação.
         """
-        while True:
-            print("Resetando uso de chaves...")
-            self.reset_usage()
-            time.sleep(interval_seconds)
+        warnings.warn(
+            "rotate_keys_periodically está obsoleto; use APIKeyManager(rotation_interval=...)",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        with self._available:
+            now = time.monotonic()
+            self.rotation_interval = interval_seconds
+            for state in self._states:
+                state.refill(now)
+                state.rate = state.capacity / interval_seconds
+            self._rebuild()
+            self._available.notify_all()
 
     def get_next_key_random(self):
         """
-        Retorna uma chave de API disponível aleatoriamente.
+        Obsoleto: use ``APIKeyManager(policy="random")`` e ``get_next_key``.
+
+        Mantido como atalho para ``get_next_key(wait=False)``, de modo que os
+        token buckets de cada chave são sempre respeitados. A escolha só é
+        aleatória quando a política do gerenciador é "random".
+
+        :raises: RuntimeError se todas as chaves atingiram o limite de uso.
         """
-        available_keys = [key for key, count in self.usage_count.items() if count < self.keys_with_limits[key]]
-        if not available_keys:
-            raise RuntimeError("Todas as chaves atingiram o limite de uso.")
-        selected_key = random.choice(available_keys)
-        self.usage_count[selected_key] += 1
-        return selected_key
+        warnings.warn(
+            'get_next_key_random está obsoleto; use APIKeyManager(policy="random").get_next_key()',
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return self.get_next_key(wait=False)
@@ -0,0 +1,172 @@
+import time
+import threading
+import urllib3
+from collections import OrderedDict
+from .connection import POOL_CLASSES_BY_SCHEME, create_ssl_context
+
+
+class HostAwarePoolManager(urllib3.PoolManager):
+    """
+    PoolManager that applies per-host overrides (maxsize, block, ...) when
+    a connection pool is first created for that host.
+    """
+
+    def __init__(self, host_limits=None, **kwargs):
+        super().__init__(**kwargs)
+        self.host_limits = dict(host_limits or {})
+        self.pool_classes_by_scheme = POOL_CLASSES_BY_SCHEME
+
+    def connection_from_host(self, host, port=None, scheme="http", pool_kwargs=None):
+        limits = self.host_limits.get(host)
+        if limits:
+            pool_kwargs = {**limits, **(pool_kwargs or {})}
+        return super().connection_from_host(host, port=port, scheme=scheme, pool_kwargs=pool_kwargs)
+
+
+class HostAwareProxyManager(urllib3.ProxyManager):
+    """
+    ProxyManager counterpart of HostAwarePoolManager.
+    """
+
+    def __init__(self, proxy_url, host_limits=None, **kwargs):
+        super().__init__(proxy_url, **kwargs)
+        self.host_limits = dict(host_limits or {})
+        self.pool_classes_by_scheme = POOL_CLASSES_BY_SCHEME
+
+    def connection_from_host(self, host, port=None, scheme="http", pool_kwargs=None):
+        limits = self.host_limits.get(host)
+        if limits:
+            pool_kwargs = {**limits, **(pool_kwargs or {})}
+        return super().connection_from_host(host, port=port, scheme=scheme, pool_kwargs=pool_kwargs)
+
+
+class PoolRegistry:
+    """
+    Process-wide, thread-safe registry of urllib3 pool managers and HTTP/2 pools.
+
+    Managers are keyed by their pool settings and proxy URL, so every
+    HTTPSessionManager asking for the same configuration shares the same
+    keep-alive connections. Least recently used managers are cleared once
+    the registry grows past ``max_managers`` or sits idle for longer than
+    ``idle_timeout`` seconds.
+    """
+
+    def __init__(self, max_managers=32, idle_timeout=300.0):
+        """
+        :param max_managers: Maximum number of pool managers kept alive
+        :param idle_timeout: Seconds after which an unused manager is cleared (None disables it)
+        """
+        self.max_managers = max_managers
+        self.idle_timeout = idle_timeout
+        self._managers = OrderedDict()
+        self._last_used = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(proxy_url=None, num_pools=10, maxsize=10, block=False,
+                 host_limits=None, cert_reqs="CERT_REQUIRED", ca_certs=None):
+        """
+        Build the hashable registry key for a set of pool settings.
+        """
+        frozen_limits = tuple(sorted(
+            (host, tuple(sorted(limits.items())))
+            for host, limits in (host_limits or {}).items()
+        ))
+        # None stands for certifi's bundle, only located when a manager is created.
+        return (proxy_url, num_pools, maxsize, block, frozen_limits, cert_reqs, ca_certs)
+
+    @staticmethod
+    def make_http2_key(hosts=True, ca_certs=None):
+        """
+        Build the registry key of an HTTP/2 pool (see HTTP2Pool).
+
+        :param hosts: True for every https host, or an iterable of host patterns
+        :param ca_certs: Optional CA bundle used to verify servers
+        """
+        frozen_hosts = True if hosts is True else tuple(sorted(hosts))
+        return ("http2", frozen_hosts, ca_certs)
+
+    def get(self, key):
+        """
+        Return the pool manager for ``key``, creating it if needed.
+
+        :param key: Key produced by ``make_key`` or ``make_http2_key``
+        :return: urllib3.PoolManager (ProxyManager when a proxy is set, HTTP2Pool for HTTP/2 keys)
+        """
+        now = time.monotonic()
+        with self._lock:
+            manager = self._managers.get(key)
+            if manager is None:
+                manager = self._create(key)
+                self._managers[key] = manager
+            else:
+                self._managers.move_to_end(key)
+            self._last_used[key] = now
+            evicted = self._collect_evictions(now)
+
+        for stale in evicted:
+            stale.clear()
+        return manager
+
+    def _create(self, key):
+        if key[0] == "http2":
+            # Imported on demand: h2 is optional.
+            from .http2 import HTTP2Pool
+
+            _, hosts, ca_certs = key
+            return HTTP2Pool(hosts=hosts, ca_certs=ca_certs)
+        proxy_url, num_pools, maxsize, block, frozen_limits, cert_reqs, ca_certs = key
+        host_limits = {host: dict(limits) for host, limits in frozen_limits}
+        pool_kwargs = {
+            "num_pools": num_pools,
+            "maxsize": maxsize,
+            "block": block,
+            "host_limits": host_limits,
+            "cert_reqs": cert_reqs,
+            # One context per manager: CA bundle parsed once, TLS sessions resumable.
+            "ssl_context": create_ssl_context(cert_reqs, ca_certs),
+        }
+        if proxy_url:
+            return HostAwareProxyManager(proxy_url, **pool_kwargs)
+        return HostAwarePoolManager(**pool_kwargs)
+
+    def _collect_evictions(self, now):
+        evicted = []
+        while len(self._managers) > self.max_managers:
+            key, manager = self._managers.popitem(last=False)
+            self._last_used.pop(key, None)
+            evicted.append(manager)
+
+        if self.idle_timeout is not None:
+            for key in list(self._managers):
+                if now - self._last_used[key] <= self.idle_timeout:
+                    # OrderedDict is in LRU order, the rest is fresher.
+                    break
+                evicted.append(self._managers.pop(key))
+                self._last_used.pop(key)
+        return evicted
+
+    def clear(self):
+        """
+        Close every pooled connection and forget all managers.
+        """
+        with self._lock:
+            managers = list(self._managers.values())
+            self._managers.clear()
+            self._last_used.clear()
+        for manager in managers:
+            manager.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._managers)
+
+
+_default_registry = PoolRegistry()
+
+
+def get_default_registry():
+    """
+    Return the process-wide registry used when none is given explicitly.
+    """
+    return _default_registry
@@ -0,0 +1,285 @@
+import time
+import fnmatch
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager, asynccontextmanager
+from email.utils import parsedate_to_datetime
+
+
+THROTTLE_STATUSES = {429, 503}
+
+
+def parse_retry_after(value, now=None):
+    """
+    Convert a Retry-After header (seconds or HTTP date) into a delay.
+
+    :param value: Header value
+    :return: Delay in seconds, or None when the header is missing/invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        now = time.time() if now is None else now
+        return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class HostLimiter:
+    """
+    Client-side limits for one host: paced token bucket plus in-flight cap.
+
+    Requests are spaced evenly at ``rate`` per second (allowing bursts of
+    ``burst``) instead of being sent all at once and backed off later. The
+    rate adapts to the upstream: it is halved on 429/503 answers, recovers
+    additively on successes, and Retry-After pauses the host entirely.
+    The same limiter can be shared by threads and event loops.
+    """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None,
+                 min_rate=None, adaptive=True):
+        """
+        :param rate: Requests per second (None disables pacing)
+        :param burst: Requests allowed back to back (defaults to 1, i.e. smooth pacing)
+        :param max_in_flight: Maximum concurrent requests (None disables the cap)
+        :param min_rate: Floor used when adapting to throttling answers
+        :param adaptive: Adapt the rate to 429/503 answers
+        """
+        self.rate = rate
+        self.burst = burst or 1
+        self.max_in_flight = max_in_flight
+        self.min_rate = min_rate or (rate / 10 if rate else None)
+        self.adaptive = adaptive
+        self.current_rate = rate
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._slot_free = threading.Condition(self._lock)
+        self._async_waiters = deque()
+
+    def _reserve(self):
+        """
+        Reserve the next send slot and return how long to wait for it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self.blocked_until - now)
+            if self.current_rate:
+                self._tokens = min(
+                    float(self.burst),
+                    self._tokens + (now - self._updated) * self.current_rate,
+                )
+                self._updated = now
+                self._tokens -= 1
+                if self._tokens < 0:
+                    delay = max(delay, -self._tokens / self.current_rate)
+            return delay
+
+    def _acquire_slot(self):
+        if self.max_in_flight is None:
+            return
+        with self._lock:
+            while self.in_flight >= self.max_in_flight:
+                self._slot_free.wait()
+            self.in_flight += 1
+
+    async def _acquire_slot_async(self):
+        if self.max_in_flight is None:
+            return
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_flight < self.max_in_flight:
+                self.in_flight += 1
+                return
+            future = loop.create_future()
+            self._async_waiters.append((loop, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over right before the cancellation.
+                self._release_slot()
+            raise
+
+    def _release_slot(self):
+        if self.max_in_flight is None:
+            return
+        with self._lock:
+            # Hand the slot straight to a waiting coroutine, if any.
+            while self._async_waiters:
+                loop, future = self._async_waiters.popleft()
+                if future.done():
+                    continue
+                try:
+                    loop.call_soon_threadsafe(self._hand_over, future)
+                    return
+                except RuntimeError:
+                    # That event loop is closed.
+                    continue
+            self.in_flight -= 1
+            self._slot_free.notify()
+
+    def _hand_over(self, future):
+        if future.done():
+            self._release_slot()
+        else:
+            future.set_result(None)
+
+    @contextmanager
+    def limit(self):
+        """
+        Hold an in-flight slot and wait for the pacing delay (sync).
+        """
+        self._acquire_slot()
+        try:
+            delay = self._reserve()
+            if delay:
+                time.sleep(delay)
+            yield self
+        finally:
+            self._release_slot()
+
+    @asynccontextmanager
+    async def limit_async(self):
+        """
+        Hold an in-flight slot and wait for the pacing delay (asyncio).
+        """
+        await self._acquire_slot_async()
+        try:
+            delay = self._reserve()
+            if delay:
+                import asyncio
+
+                await asyncio.sleep(delay)
+            yield self
+        finally:
+            self._release_slot()
+
+    def feedback(self, status, retry_after=None):
+        """
+        Adapt the limiter to an upstream answer.
+
+        :param status: HTTP status code received
+        :param retry_after: Retry-After header value, if any
+        """
+        delay = parse_retry_after(retry_after)
+        with self._lock:
+            if delay:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            if not (self.adaptive and self.rate):
+                return
+            if status in THROTTLE_STATUSES:
+                self.current_rate = max(self.min_rate, self.current_rate / 2)
+            elif status < 400 and self.current_rate < self.rate:
+                self.current_rate = min(self.rate, self.current_rate + self.rate / 20)
+
+    def snapshot(self):
+        """
+        Current limiter state, for monitoring.
+        """
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "current_rate": self.current_rate,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "blocked_for": max(0.0, self.blocked_until - time.monotonic()),
+            }
+
+
+class RateLimiter:
+    """
+    Per-host rate limits configured by host pattern.
+
+    ``rules`` maps host patterns (fnmatch syntax, e.g. "*.example.com") to
+    HostLimiter keyword arguments. Each matching host gets its own limiter;
+    the first matching pattern wins, then ``default`` applies, and hosts
+    matching nothing are not limited until they answer 429/503, which
+    gives them a limiter honouring Retry-After. At most ``max_hosts``
+    limiters are kept; the least recently used ones are dropped first.
+    """
+
+    def __init__(self, rules=None, default=None, max_hosts=1024):
+        """
+        :param rules: Dictionary {host pattern: {"rate", "burst", "max_in_flight", ...}}
+        :param default: Optional HostLimiter settings applied to every other host
+        :param max_hosts: Maximum number of hosts tracked
+        """
+        self.rules = dict(rules or {})
+        self.default = default
+        self.max_hosts = max_hosts
+        self._limiters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def limiter_for(self, host):
+        """
+        Return the HostLimiter of ``host`` (None when the host is unlimited).
+        """
+        with self._lock:
+            if host in self._limiters:
+                self._limiters.move_to_end(host)
+                return self._limiters[host]
+
+        settings = self.default
+        for pattern, rule in self.rules.items():
+            if fnmatch.fnmatch(host, pattern):
+                settings = rule
+                break
+
+        return self._add(host, lambda: HostLimiter(**settings) if settings is not None else None)
+
+    def _add(self, host, create, replace_none=False):
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if host not in self._limiters or (limiter is None and replace_none):
+                limiter = self._limiters[host] = create()
+            self._limiters.move_to_end(host)
+            while len(self._limiters) > self.max_hosts:
+                self._limiters.popitem(last=False)
+            return limiter
+
+    @contextmanager
+    def limit(self, host):
+        limiter = self.limiter_for(host)
+        if limiter is None:
+            yield None
+        else:
+            with limiter.limit():
+                yield limiter
+
+    @asynccontextmanager
+    async def limit_async(self, host):
+        limiter = self.limiter_for(host)
+        if limiter is None:
+            yield None
+        else:
+            async with limiter.limit_async():
+                yield limiter
+
+    def feedback(self, host, status, retry_after=None):
+        """
+        Report an upstream answer to the limiter of ``host``.
+        """
+        limiter = self.limiter_for(host)
+        if limiter is None:
+            if status not in THROTTLE_STATUSES:
+                return
+            # Throttled by a host without a rule: honour its Retry-After from now on.
+            limiter = self._add(host, HostLimiter, replace_none=True)
+        limiter.feedback(status, retry_after)
+
+    def snapshot(self):
+        """
+        State of every active host limiter, for monitoring.
+        """
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {host: limiter.snapshot() for host, limiter in limiters.items() if limiter}
@@ -0,0 +1,460 @@
+import copy
+import time
+import random
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+from urllib3.util.retry import Retry
+from urllib3.exceptions import MaxRetryError, ResponseError
+from .events import get_event_bus
+from .exceptions import CircuitOpenException
+from .ratelimit import parse_retry_after
+
+
+# Safe to send twice (RFC 9110, 9.2.2); other methods need an Idempotency-Key header.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"})
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Answers counted against a host's health (429 is throttling, not an outage).
+FAILURE_STATUSES = frozenset({500, 502, 503, 504})
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def full_jitter(attempt, base, cap):
+    """
+    Full-jitter exponential backoff: uniform in [0, min(cap, base * 2 ** attempt)].
+
+    Spreading retries over the whole window keeps clients that failed
+    together from retrying together.
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def is_idempotent(method, headers=None):
+    """
+    True when repeating the request cannot apply it twice.
+    """
+    if method.upper() in IDEMPOTENT_METHODS:
+        return True
+    return any(name.lower() == "idempotency-key" for name in (headers or ()))
+
+
+class RetryBudget:
+    """
+    Caps retries to a ratio of first attempts over a sliding window.
+
+    With ``ratio=0.2`` at most one request in five may be retried, so an
+    unhealthy upstream sees at most 1.2x its normal load instead of
+    ``retries + 1`` times. ``min_per_second`` keeps a few retries
+    available when traffic is low.
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=1.0, window=10.0):
+        """
+        :param ratio: Retries allowed per first attempt
+        :param min_per_second: Retries always allowed per second, whatever the traffic
+        :param window: Sliding window, in seconds
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self.rejected = 0
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        horizon = now - self.window
+        for timestamps in (self._requests, self._retries):
+            while timestamps and timestamps[0] < horizon:
+                timestamps.popleft()
+
+    def record_request(self):
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            self._requests.append(now)
+
+    def try_withdraw(self):
+        """
+        Reserve one retry.
+
+        :return: False when the budget is spent
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            allowed = self.min_per_second * self.window + self.ratio * len(self._requests)
+            if len(self._retries) >= allowed:
+                self.rejected += 1
+                return False
+            self._retries.append(now)
+            return True
+
+    def snapshot(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return {"requests": len(self._requests), "retries": len(self._retries), "rejected": self.rejected}
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker for one host.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    requests fail fast with CircuitOpenException. After ``recovery_timeout``
+    seconds it lets ``half_open_max_calls`` probes through: a success closes
+    it again, a failure reopens it. A probe that never reports back (lost
+    or cancelled without ``release``) frees its slot after ``probe_timeout``.
+    """
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0, half_open_max_calls=1,
+                 on_state_change=None, probe_timeout=None):
+        """
+        :param failure_threshold: Consecutive failures opening the breaker
+        :param recovery_timeout: Seconds spent open before probing the host again
+        :param half_open_max_calls: Concurrent probes allowed while half-open
+        :param on_state_change: Optional callable(old_state, new_state)
+        :param probe_timeout: Seconds after which an unanswered probe is given up
+            (defaults to ``recovery_timeout``)
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.on_state_change = on_state_change
+        self.probe_timeout = recovery_timeout if probe_timeout is None else probe_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        # Start times of the probes in flight while half-open.
+        self._probes = deque()
+        self._lock = threading.Lock()
+
+    def _transition(self, state):
+        old, self.state = self.state, state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        self._probes.clear()
+        if self.on_state_change is not None and old != state:
+            self.on_state_change(old, state)
+
+    def allow(self):
+        """
+        Admit a request.
+
+        :return: 0 when it may be sent, otherwise seconds until the next probe
+        """
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.recovery_timeout - time.monotonic()
+                if remaining > 0:
+                    self.rejected += 1
+                    return remaining
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                now = time.monotonic()
+                while self._probes and self._probes[0] + self.probe_timeout <= now:
+                    self._probes.popleft()
+                if len(self._probes) >= self.half_open_max_calls:
+                    self.rejected += 1
+                    return self._probes[0] + self.probe_timeout - now
+                self._probes.append(now)
+            return 0
+
+    def release(self):
+        """
+        Give back a probe slot without reporting an outcome (cancelled request).
+        """
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes:
+                self._probes.popleft()
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self._transition(OPEN)
+
+    def snapshot(self):
+        with self._lock:
+            opened_for = time.monotonic() - self.opened_at if self.state != CLOSED else 0.0
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "opened_for": opened_for,
+            }
+
+
+class ResiliencePolicy:
+    """
+    Retry rules, per-host retry budgets and per-host circuit breakers shared
+    by the sync and async clients.
+
+    Only idempotent requests (or ones carrying an Idempotency-Key header)
+    are retried after they may have reached the server; connection
+    failures are retried for every method. Retries wait with full jitter,
+    honour Retry-After, and stop when the host's budget is spent or its
+    breaker opens.
+    """
+
+    def __init__(self, retries=3, backoff_factor=0.3, backoff_max=30.0, retry_statuses=RETRY_STATUSES,
+                 budget_ratio=0.2, budget_min_per_second=1.0, budget_window=10.0,
+                 failure_threshold=5, recovery_timeout=30.0, half_open_max_calls=1,
+                 failure_statuses=FAILURE_STATUSES, event_bus=None, probe_timeout=None,
+                 max_retry_after=None):
+        """
+        :param retries: Maximum retries per request
+        :param backoff_factor: Base of the exponential backoff, in seconds
+        :param backoff_max: Maximum backoff, in seconds
+        :param retry_statuses: Status codes worth retrying
+        :param budget_ratio: Retries allowed per first attempt, per host (None disables the budget)
+        :param budget_min_per_second: Retries always allowed per second, per host
+        :param budget_window: Budget sliding window, in seconds
+        :param failure_threshold: Consecutive failures opening a host's breaker (None disables breakers)
+        :param recovery_timeout: Seconds a breaker stays open before probing
+        :param half_open_max_calls: Probes allowed while half-open
+        :param failure_statuses: Status codes counted as host failures
+        :param event_bus: Optional EventBus (defaults to the process-wide one)
+        :param probe_timeout: Seconds after which an unanswered half-open probe is given up
+            (defaults to ``recovery_timeout``)
+        :param max_retry_after: Longest Retry-After honoured, in seconds (defaults to ``backoff_max``)
+        """
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.budget_ratio = budget_ratio
+        self.budget_min_per_second = budget_min_per_second
+        self.budget_window = budget_window
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.failure_statuses = frozenset(failure_statuses)
+        self.probe_timeout = probe_timeout
+        self.max_retry_after = backoff_max if max_retry_after is None else max_retry_after
+        self.events = event_bus or get_event_bus()
+        self._breakers = {}
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def with_retries(self, retries, backoff_factor):
+        """
+        Copy of this policy with other retry settings, sharing its breakers and budgets.
+        """
+        if (retries, backoff_factor) == (self.retries, self.backoff_factor):
+            return self
+        policy = copy.copy(self)
+        policy.retries = retries
+        policy.backoff_factor = backoff_factor
+        return policy
+
+    def breaker_for(self, host):
+        """
+        Return the CircuitBreaker of ``host`` (None when breakers are disabled).
+        """
+        if self.failure_threshold is None:
+            return None
+        try:
+            return self._breakers[host]
+        except KeyError:
+            pass
+        with self._lock:
+            if host not in self._breakers:
+                def on_state_change(old, new, host=host):
+                    if self.events.active:
+                        self.events.emit("circuit.state_changed", host=host, old=old, new=new)
+
+                self._breakers[host] = CircuitBreaker(
+                    self.failure_threshold, self.recovery_timeout, self.half_open_max_calls,
+                    on_state_change=on_state_change, probe_timeout=self.probe_timeout,
+                )
+            return self._breakers[host]
+
+    def budget_for(self, host):
+        """
+        Return the RetryBudget of ``host`` (None when budgets are disabled).
+        """
+        if self.budget_ratio is None:
+            return None
+        try:
+            return self._budgets[host]
+        except KeyError:
+            pass
+        with self._lock:
+            if host not in self._budgets:
+                self._budgets[host] = RetryBudget(self.budget_ratio, self.budget_min_per_second, self.budget_window)
+            return self._budgets[host]
+
+    def before_request(self, host, url=None):
+        """
+        Count a first attempt and fail fast when the host's breaker is open.
+
+        :raises: CircuitOpenException
+        """
+        breaker = self.breaker_for(host)
+        if breaker is not None:
+            wait = breaker.allow()
+            if wait:
+                raise CircuitOpenException(
+                    f"Circuit open for {host}, retry in {wait:.1f}s", url=url, host=host, retry_after=wait
+                )
+        budget = self.budget_for(host)
+        if budget is not None:
+            budget.record_request()
+
+    def record(self, host, status=None, error=None):
+        """
+        Report the outcome of an attempt to the host's breaker.
+        """
+        breaker = self.breaker_for(host)
+        if breaker is None:
+            return
+        if error is not None or status in self.failure_statuses:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    def release(self, host):
+        """
+        Report that an attempt ended without an outcome (cancelled or interrupted).
+        """
+        breaker = self.breaker_for(host)
+        if breaker is not None:
+            breaker.release()
+
+    def allow_retry(self, host):
+        """
+        Spend one retry from the host's budget, if its breaker is still closed.
+        """
+        breaker = self.breaker_for(host)
+        if breaker is not None and breaker.state != CLOSED:
+            return False
+        budget = self.budget_for(host)
+        return budget is None or budget.try_withdraw()
+
+    def should_retry(self, host, method, headers, attempt, status=None, error=None, sent=True):
+        """
+        Decide whether a failed attempt is retried, spending budget when it is.
+
+        The attempt's outcome must already have been passed to ``record``.
+
+        :param attempt: Retries already made for this request
+        :param sent: False when the request cannot have reached the server (connect errors)
+        """
+        if attempt >= self.retries:
+            return False
+        if error is None and status not in self.retry_statuses:
+            return False
+        if sent and not is_idempotent(method, headers):
+            return False
+        return self.allow_retry(host)
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        Seconds to wait before retry number ``attempt + 1``.
+        """
+        delay = parse_retry_after(retry_after)
+        if delay is not None:
+            return min(delay, self.max_retry_after)
+        return full_jitter(attempt, self.backoff_factor, self.backoff_max)
+
+    def urllib3_retry(self, method, headers=None):
+        """
+        Build the urllib3 Retry object enforcing this policy for one request.
+        """
+        allowed = set(IDEMPOTENT_METHODS)
+        if is_idempotent(method, headers):
+            allowed.add(method.upper())
+        return BudgetedRetry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            backoff_max=self.backoff_max,
+            status_forcelist=self.retry_statuses,
+            allowed_methods=frozenset(allowed),
+            policy=self,
+        )
+
+    def snapshot(self):
+        """
+        Breaker and budget state of every host seen, for monitoring.
+        """
+        with self._lock:
+            hosts = set(self._breakers) | set(self._budgets)
+        state = {}
+        for host in sorted(hosts):
+            breaker = self._breakers.get(host)
+            budget = self._budgets.get(host)
+            state[host] = {
+                "breaker": breaker.snapshot() if breaker is not None else None,
+                "budget": budget.snapshot() if budget is not None else None,
+            }
+        return state
+
+
+_default_policy = ResiliencePolicy()
+
+
+def get_default_resilience_policy():
+    """
+    Return the process-wide ResiliencePolicy, so every client shares the
+    breakers and retry budgets of the hosts it talks to.
+    """
+    return _default_policy
+
+
+class BudgetedRetry(Retry):
+    """
+    urllib3 Retry bound to a ResiliencePolicy: full-jitter backoff, no
+    retry of possibly-sent non-idempotent requests, and every retry paid
+    from the host's budget and reported to its breaker.
+    """
+
+    def __init__(self, *args, policy=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.policy = policy
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.policy = self.policy
+        return retry
+
+    def get_retry_after(self, response):
+        # Same cap as ResiliencePolicy.backoff: a server cannot park a thread for hours.
+        delay = super().get_retry_after(response)
+        if delay is None or self.policy is None:
+            return delay
+        return min(delay, self.policy.max_retry_after)
+
+    def get_backoff_time(self):
+        attempt = len(self.history)
+        if attempt == 0:
+            return 0
+        return full_jitter(attempt - 1, self.backoff_factor, self.backoff_max)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        redirect = error is None and response is not None and response.get_redirect_location()
+        if error is not None and not self._is_connection_error(error) and method is not None \
+                and not self._is_method_retryable(method):
+            # The request may have been processed: never replay it blindly.
+            raise error.with_traceback(_stacktrace)
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        if redirect or self.policy is None or _pool is None:
+            return retry
+        # Through an HTTP proxy the pool is the proxy's, but the URL is absolute.
+        host = urlsplit(url).hostname if url and "://" in url else _pool.host
+        if not self.policy.allow_retry(host):
+            # The caller records this final attempt.
+            reason = error or ResponseError(f"retry budget exhausted for {host}")
+            raise MaxRetryError(_pool, url, reason) from reason
+        self.policy.record(host, status=response.status if response is not None else None, error=error)
+        return retry
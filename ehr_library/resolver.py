@@ -0,0 +1,244 @@
+import os
+import time
+import errno
+import socket
+import selectors
+import threading
+from collections import OrderedDict, deque
+
+
+HAPPY_EYEBALLS_DELAY = 0.25
+
+_IN_PROGRESS = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, getattr(errno, "WSAEWOULDBLOCK", -1)}
+
+
+class _Entry:
+    __slots__ = ("addresses", "error", "expires")
+
+    def __init__(self, addresses, error, expires):
+        self.addresses = addresses
+        self.error = error
+        self.expires = expires
+
+
+def interleave_families(addresses):
+    """
+    Alternate address families (RFC 8305 section 4), keeping the resolver's
+    preferred family first: [v6, v6, v4, v4] becomes [v6, v4, v6, v4].
+    """
+    by_family = OrderedDict()
+    for address in addresses:
+        by_family.setdefault(address[0], deque()).append(address)
+    ordered = []
+    queues = list(by_family.values())
+    while queues:
+        for queue in list(queues):
+            ordered.append(queue.popleft())
+            if not queue:
+                queues.remove(queue)
+    return ordered
+
+
+class DNSCache:
+    """
+    Thread-safe cache in front of the blocking system resolver.
+
+    The system resolver does not expose record TTLs, so answers are kept for
+    ``ttl`` seconds (failures for ``negative_ttl``) and an entry is dropped
+    as soon as connecting to all of its addresses fails. New connections
+    race the resolved addresses Happy Eyeballs style (RFC 8305) instead of
+    trying them one timeout at a time.
+    """
+
+    def __init__(self, ttl=60.0, negative_ttl=5.0, max_entries=1024,
+                 happy_eyeballs_delay=HAPPY_EYEBALLS_DELAY):
+        """
+        :param ttl: Seconds a successful answer is reused
+        :param negative_ttl: Seconds a failed lookup is remembered
+        :param max_entries: Maximum number of cached (host, port, family) entries
+        :param happy_eyeballs_delay: Seconds before racing the next address
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.happy_eyeballs_delay = happy_eyeballs_delay
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, host, port, family=socket.AF_UNSPEC):
+        """
+        Return the getaddrinfo() answer for ``host``, from the cache when fresh.
+
+        :raises: socket.gaierror when the name does not resolve
+        """
+        key = (host, port, family)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if entry.error is not None:
+                    raise entry.error
+                return entry.addresses
+            self.misses += 1
+
+        try:
+            addresses = socket.getaddrinfo(host, port, family, socket.SOCK_STREAM)
+            entry = _Entry(addresses, None, now + self.ttl)
+        except socket.gaierror as e:
+            entry = _Entry(None, e, now + self.negative_ttl)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if entry.error is not None:
+            raise entry.error
+        return entry.addresses
+
+    def invalidate(self, host=None):
+        """
+        Forget the answers for ``host`` (every host when omitted).
+        """
+        with self._lock:
+            if host is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == host]:
+                del self._entries[key]
+
+    def create_connection(self, address, timeout=None, source_address=None, socket_options=None,
+                          default_timeout=None):
+        """
+        Drop-in replacement for ``urllib3.util.connection.create_connection``.
+
+        :param address: Tuple (host, port)
+        :param timeout: Connect timeout in seconds (``default_timeout`` keeps the socket default)
+        :param default_timeout: Sentinel meaning "no explicit timeout"
+        :return: Connected socket
+        """
+        host, port = address
+        if host.startswith("["):
+            host = host.strip("[]")
+        family = socket.AF_UNSPEC
+        addresses = self.resolve(host, port, family)
+
+        explicit = timeout is not default_timeout
+        try:
+            sock = happy_eyeballs_connect(
+                addresses,
+                timeout if explicit else None,
+                source_address=source_address,
+                socket_options=socket_options,
+                delay=self.happy_eyeballs_delay,
+            )
+        except OSError:
+            # The cached addresses may be stale: resolve again next time.
+            self.invalidate(host)
+            raise
+        sock.settimeout(timeout if explicit else socket.getdefaulttimeout())
+        return sock
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def _start_attempt(address, source_address, socket_options):
+    family, type_, proto, _, sockaddr = address
+    sock = socket.socket(family, type_, proto)
+    try:
+        for option in socket_options or ():
+            sock.setsockopt(*option)
+        if source_address:
+            sock.bind(source_address)
+        sock.setblocking(False)
+        error = sock.connect_ex(sockaddr)
+        if error and error not in _IN_PROGRESS:
+            raise OSError(error, os.strerror(error))
+        return sock, error == 0
+    except BaseException:
+        sock.close()
+        raise
+
+
+def happy_eyeballs_connect(addresses, timeout=None, source_address=None, socket_options=None,
+                           delay=HAPPY_EYEBALLS_DELAY):
+    """
+    Connect to the first address that answers, starting a new attempt every
+    ``delay`` seconds (or as soon as one fails) across interleaved families.
+
+    :param addresses: getaddrinfo() results
+    :param timeout: Overall connect timeout in seconds (None waits forever)
+    :return: Connected (blocking) socket; every losing attempt is closed
+    :raises: socket.timeout, or the last connection error
+    """
+    if not addresses:
+        raise OSError("getaddrinfo returned an empty list")
+
+    queue = deque(interleave_families(addresses))
+    deadline = None if timeout is None else time.monotonic() + timeout
+    selector = selectors.DefaultSelector()
+    pending = set()
+    winner = None
+    last_error = None
+    next_attempt = time.monotonic()
+    try:
+        while winner is None and (queue or pending):
+            now = time.monotonic()
+            if queue and (now >= next_attempt or not pending):
+                try:
+                    sock, connected = _start_attempt(queue.popleft(), source_address, socket_options)
+                except OSError as e:
+                    last_error = e
+                    continue
+                if connected:
+                    winner = sock
+                    break
+                pending.add(sock)
+                selector.register(sock, selectors.EVENT_WRITE)
+                next_attempt = now + delay
+
+            wait = max(0.0, next_attempt - now) if queue else None
+            if deadline is not None:
+                left = deadline - now
+                if left <= 0:
+                    raise socket.timeout("timed out")
+                wait = left if wait is None else min(wait, left)
+
+            for key, _ in selector.select(wait):
+                sock = key.fileobj
+                selector.unregister(sock)
+                pending.discard(sock)
+                error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if error == 0:
+                    winner = sock
+                    break
+                last_error = OSError(error, os.strerror(error))
+                sock.close()
+                # A failed attempt starts the next one right away.
+                next_attempt = time.monotonic()
+    finally:
+        for sock in pending:
+            if sock is not winner:
+                sock.close()
+        selector.close()
+
+    if winner is None:
+        raise last_error or OSError("Could not connect to any address")
+    winner.setblocking(True)
+    return winner
+
+
+_default_cache = DNSCache()
+
+
+def get_default_dns_cache():
+    """
+    Return the process-wide DNS cache used by every connection pool.
+    """
+    return _default_cache
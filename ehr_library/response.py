@@ -0,0 +1,103 @@
+from .jsonlib import get_json_backend
+
+
+class Response:
+    """
+    HTTP response holding the raw body and decoding it lazily.
+
+    Nothing is decoded up front: ``text``, ``json()`` and ``xml()`` are
+    computed on first access and memoized, so status-only callers never
+    pay for decoding or parsing. ``view`` exposes the body as a zero-copy
+    memoryview.
+    """
+    __slots__ = ("status", "headers", "url", "_body", "_text", "_json", "_xml")
+
+    _UNSET = object()
+
+    def __init__(self, status, headers=None, body=b"", url=None):
+        """
+        :param status: HTTP status code
+        :param headers: Response headers (case-insensitive mapping)
+        :param body: Raw (already decompressed) body bytes
+        :param url: URL the response belongs to
+        """
+        self.status = status
+        self.headers = headers if headers is not None else {}
+        self.url = url
+        self._body = body or b""
+        self._text = None
+        self._json = self._UNSET
+        self._xml = self._UNSET
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 400
+
+    @property
+    def content(self):
+        """
+        Raw body as bytes.
+        """
+        return self._body
+
+    # urllib3-style alias, kept for code reading ``response.data``.
+    data = content
+
+    @property
+    def view(self):
+        """
+        Zero-copy memoryview over the raw body.
+        """
+        return memoryview(self._body)
+
+    @property
+    def content_type(self):
+        return self.headers.get("Content-Type", "").split(";", 1)[0].strip().lower()
+
+    @property
+    def encoding(self):
+        """
+        Charset announced in Content-Type, defaulting to UTF-8.
+        """
+        for parameter in self.headers.get("Content-Type", "").split(";")[1:]:
+            name, _, value = parameter.strip().partition("=")
+            if name.lower() == "charset" and value:
+                return value.strip('"').lower()
+        return "utf-8"
+
+    @property
+    def text(self):
+        """
+        Body decoded with the response charset (decoded once).
+        """
+        if self._text is None:
+            try:
+                self._text = str(self._body, self.encoding, errors="replace")
+            except LookupError:
+                self._text = str(self._body, "utf-8", errors="replace")
+        return self._text
+
+    def json(self, type=None):
+        """
+        Body parsed as JSON (parsed once, straight from the bytes).
+
+        :param type: Optional dataclass (or msgspec Struct) to decode into
+        """
+        if type is not None:
+            return get_json_backend().decode(self._body, type)
+        if self._json is self._UNSET:
+            self._json = get_json_backend().loads(self._body)
+        return self._json
+
+    def xml(self):
+        """
+        Body parsed as an XML element (parsed once).
+        """
+        if self._xml is self._UNSET:
+            from xml.etree import ElementTree
+
+            self._xml = ElementTree.fromstring(self._body)
+        return self._xml
+
+    def __repr__(self):
+        return f"<Response [{self.status}]>"
@@ -1,84 +1,376 @@
-import urllib3
-import certifi
-from urllib3.util.retry import Retry
-from http.cookiejar import CookieJar
-from urllib3.contrib.pyopenssl import inject_into_urllib3
+import copy
+from contextlib import nullcontext
+from time import perf_counter, sleep
+from urllib.parse import urlsplit
+from urllib3 import HTTPHeaderDict
+from .pool import PoolRegistry, get_default_registry
+from .cookies import CookieStore
+from .streaming import StreamingResponse, DEFAULT_CHUNK_SIZE
+from .compression import IncrementalDecoder, compress_body, get_codec_registry
+from .uploads import prepare_body, is_replayable, is_streamed
+from .exceptions import HTTPRequestException
+from .resilience import get_default_resilience_policy
+from .response import Response
+from .connection import measure
+from .metrics import RequestTiming
+from .events import get_event_bus
 
 
 class HTTPSessionManager:
     """
     Centralized session manager for HTTP requests with retry policy.
+
+    Connections come from a shared PoolRegistry, so every session created
+    with the same pool settings reuses the same warm keep-alive pools.
     """
 
-    def __init__(self, retries=3, backoff_factor=0.3):
-        self.cookie_jar = CookieJar()
-        self.http = urllib3.PoolManager(
-            headers={},
-            retries=Retry(
-                total=retries,
-                backoff_factor=backoff_factor,
-                status_forcelist=[500, 502, 503, 504],
-                allowed_methods=["GET", "POST", "PUT", "DELETE"],
-            ),
-            cert_reqs="CERT_REQUIRED",
-            ca_certs=certifi.where(),
-        )
+    def __init__(self, retries=3, backoff_factor=0.3,
+                 maxsize=10, block=False, num_pools=10,
+                 host_limits=None, proxy_url=None, registry=None, cache=None,
+                 rate_limiter=None, metrics=None, event_bus=None,
+                 compress_requests=None, compress_min_size=1024, download_connections=4,
+                 ca_certs=None, http2=None, resilience=None):
+        """
+        :param retries: Maximum retries per request (idempotent requests only, within the host's retry budget)
+        :param backoff_factor: Base of the full-jitter exponential backoff between retries
+        :param maxsize: Maximum number of connections kept per host
+        :param block: Block when a host pool is exhausted instead of opening extra connections
+        :param num_pools: Number of host pools kept before the least recently used is dropped
+        :param host_limits: Optional per-host overrides, e.g. {"api.example.com": {"maxsize": 50}}
+        :param proxy_url: Optional proxy URL all traffic is routed through
+        :param registry: Optional PoolRegistry (defaults to the process-wide one)
+        :param cache: Optional ResponseCache serving repeated GET requests
+        :param rate_limiter: Optional RateLimiter pacing requests per host
+        :param metrics: Optional MetricsSink receiving a timing breakdown of every request
+        :param event_bus: Optional EventBus (defaults to the process-wide one)
+        :param compress_requests: Optional codec ("gzip", "deflate", "br", "zstd") used to compress request bodies
+        :param compress_min_size: Minimum body size, in bytes, worth compressing
+        :param download_connections: Parallel byte ranges used by ``download_path`` downloads
+        :param ca_certs: Optional CA bundle used to verify servers (defaults to certifi's)
+        :param http2: True to use HTTP/2 with every https host that negotiates it, or host patterns
+            (e.g. ["api.example.com", "*.internal"]) also covering plain http hosts (h2c). Requires ``h2``.
+        :param resilience: Optional ResiliencePolicy (retry budget and circuit breaker per host);
+            defaults to the process-wide one, with ``retries`` and ``backoff_factor``
+        """
+        self.cookie_jar = CookieStore()
+        self.registry = registry if registry is not None else get_default_registry()
+        self.pool_settings = {
+            "proxy_url": proxy_url,
+            "num_pools": num_pools,
+            "maxsize": maxsize,
+            "block": block,
+            "host_limits": host_limits,
+            "ca_certs": ca_certs,
+        }
+        self.pool_key = PoolRegistry.make_key(**self.pool_settings)
+        self.events = event_bus or get_event_bus()
+        self.resilience = resilience or get_default_resilience_policy().with_retries(retries, backoff_factor)
+        self.retry = self.resilience.urllib3_retry("GET")
         self.retries = retries
         self.backoff_factor = backoff_factor
+        self.proxy_url = proxy_url
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self.compress_requests = compress_requests
+        self.compress_min_size = compress_min_size
+        self.download_connections = download_connections
+        # HTTP/2 is not tunnelled through proxies.
+        self.http2_key = PoolRegistry.make_http2_key(http2, ca_certs) if http2 and not proxy_url else None
+
+    @property
+    def http(self):
+        """
+        The pool manager currently backing this session.
+        """
+        return self.registry.get(self.pool_key)
+
+    @property
+    def http2(self):
+        """
+        The HTTP/2 pool currently backing this session (None when HTTP/2 is off).
+        """
+        if self.http2_key is None:
+            return None
+        return self.registry.get(self.http2_key)
+
+    @property
+    def maxsize(self):
+        """
+        Maximum number of connections kept per host.
+        """
+        return self.pool_settings["maxsize"]
+
+    def set_pool_size(self, maxsize):
+        """
+        Switch this session to pools keeping ``maxsize`` connections per host.
+
+        :param maxsize: New per-host pool size
+        """
+        self.pool_settings["maxsize"] = maxsize
+        self.pool_key = PoolRegistry.make_key(**self.pool_settings)
+
+    def with_pool_size(self, maxsize):
+        """
+        Copy of this session drawing from pools of ``maxsize`` connections per host.
+
+        Cookies, cache, metrics and resilience state stay shared with this
+        session, which keeps its own pools untouched.
+
+        :param maxsize: Per-host pool size of the copy
+        """
+        if maxsize == self.maxsize:
+            return self
+        session = copy.copy(self)
+        session.pool_settings = dict(self.pool_settings)
+        session.set_pool_size(maxsize)
+        return session
+
+    def warm_up(self, hosts, connections_per_host=1):
+        """
+        Resolve, connect and TLS-handshake pooled connections ahead of the first request.
+
+        :param hosts: Base URLs ("https://api.example.com") or bare host names (https is assumed)
+        :param connections_per_host: Connections to open per host (capped by the pool size)
+        :return: Dict host -> number of connections opened or already open, or the error raised
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        hosts = list(hosts)
+        urls = [host if "://" in host else f"https://{host}" for host in hosts]
+        with ThreadPoolExecutor(max_workers=min(32, len(urls) or 1)) as executor:
+            results = executor.map(lambda url: self._warm_up(url, connections_per_host), urls)
+            return dict(zip(hosts, results))
 
-    def request(self, method, url, headers=None, body=None, download_path=None):
+    def _warm_up(self, url, connections_per_host):
+        try:
+            if self.http2 is not None and self.http2.handles(url) and self.http2.warm_up(url):
+                # One HTTP/2 connection multiplexes every request to the origin.
+                return 1
+            pool = self.http.connection_from_url(url)
+            # Check every connection out before returning any, or the pool
+            # would hand the same one back each time.
+            count = min(connections_per_host, pool.pool.maxsize)
+            connections = [pool._get_conn() for _ in range(count)]
+            try:
+                for conn in connections:
+                    if conn.sock is None:
+                        conn.connect()
+            finally:
+                for conn in connections:
+                    pool._put_conn(conn)
+            return len(connections)
+        except Exception as e:
+            return e
+
+    def request(self, method, url, headers=None, body=None, download_path=None,
+                stream=False, chunk_size=DEFAULT_CHUNK_SIZE):
         """
         Make an HTTP request using the managed session.
 
         :param method: HTTP method (GET, POST, etc.)
         :param url: URL for the request
         :param headers: Optional headers dictionary
-        :param body: Optional request body
-        :param download_path: Optional path to save the response content as a file.
-        :return: Response data or path to the saved file.
+        :param body: Optional request body: bytes, str, file object, iterable or MultipartEncoder
+        :param download_path: Optional path to save the response content as a file (GET only; parallel and resumable).
+        :param stream: Return a StreamingResponse instead of reading the body
+        :param chunk_size: Chunk size used when streaming the request or response body
+        :return: Response, a StreamingResponse or path to the saved file.
         """
+        if download_path and method.upper() == "GET":
+            return self._download(url, download_path, headers, chunk_size)
 
         cookie_headers = self._generate_cookie_header(url)
-        print(f'HEADERS::: {headers}')
-        headers = cookie_headers
-
-        response = self.http.request(
-            method=method,
-            url=url,
-            headers=headers,
-            body=body,
-            retries=self.retries,
-        )
+        headers = {**(headers or {}), **cookie_headers}
+        # Every body is decoded through the codec registry, stream or not.
+        headers.setdefault("Accept-Encoding", get_codec_registry().accept_encoding())
+        if body is not None and self.compress_requests:
+            body, headers = compress_body(
+                body, headers, self.compress_requests, self.compress_min_size
+            )
+        # One-shot bodies (generators, pipes) cannot be replayed on retry.
+        retries = self.resilience.urllib3_retry(method, headers) if is_replayable(body) else False
+        body, headers = prepare_body(body, headers, chunk_size)
+
+        request_headers = headers
+        cached = None
+        use_cache = self.cache is not None and method.upper() == "GET" and not stream
+        if use_cache:
+            cached = self.cache.lookup(url, request_headers)
+            if cached is not None and cached.is_fresh():
+                self.cache.record_hit()
+                return self._build_result(cached.status, cached.headers, cached.body, url)
+            if cached is not None:
+                headers = {**headers, **self.cache.conditional_headers(cached)}
+
+        host = urlsplit(url).hostname or ""
+        # Fails fast with CircuitOpenException while the host is unhealthy.
+        self.resilience.before_request(host, url)
+        timing = RequestTiming(host, method) if self.metrics is not None else None
+        try:
+            with self._rate_limit(host), measure(timing):
+                sent_at = perf_counter()
+                response = None
+                http2 = self.http2
+                if http2 is not None and http2.handles(url):
+                    # None when the server refused HTTP/2 during ALPN.
+                    response = self._urlopen_http2(http2, host, method, url, headers, body, retries is not False)
+                if response is None:
+                    response = self.http.request(
+                        method=method,
+                        url=url,
+                        headers=headers,
+                        body=body,
+                        retries=retries,
+                        preload_content=False,
+                    )
+        except Exception as e:
+            self.resilience.record(host, error=e)
+            raise
+        except BaseException:
+            # Interrupted: free the half-open probe slot without judging the host.
+            self.resilience.release(host)
+            raise
+        self.resilience.record(host, status=response.status)
+        if timing is not None:
+            self._time_headers(timing, response, body, perf_counter() - sent_at)
+        if self.rate_limiter is not None:
+            self.rate_limiter.feedback(host, response.status, response.headers.get("Retry-After"))
+        if self.events.active:
+            self.events.emit(
+                "request.response", method=method, url=url, headers=headers, status=response.status
+            )
 
         self._store_cookies(url, response)
 
-        if download_path and method.upper() == "GET" and response.status == 200:
+        if stream:
+            self._record(timing)
+            return StreamingResponse(response, url=url, chunk_size=chunk_size)
+
+        data = self._read_body(response, timing)
+        self._record(timing)
+
+        if use_cache:
+            if cached is not None and response.status == 304:
+                self.cache.revalidated(url, request_headers, cached, response.headers)
+                self.cache.record_hit()
+                return self._build_result(cached.status, cached.headers, cached.body, url)
+            self.cache.record_miss()
+            self.cache.store(url, request_headers, response.status, response.headers, data)
+
+        return self._build_result(response.status, response.headers, data, url)
+
+    def _urlopen_http2(self, http2, host, method, url, headers, body, replayable):
+        """
+        Send over HTTP/2 with the retry rules urllib3 applies on HTTP/1.1.
+
+        Retried attempts are reported to the resilience policy here; the
+        final one is left for the caller, as BudgetedRetry does.
+        """
+        from .http2 import HTTP2StreamError
+
+        start = None
+        if is_streamed(body):
+            # Files are rewound between attempts, iterators cannot be replayed.
+            replayable = replayable and hasattr(body, "seek")
+            start = body.tell() if replayable else None
+        attempt = 0
+        while True:
+            if attempt and start is not None:
+                body.seek(start)
             try:
-                with open(download_path, "wb") as file:
-                    file.write(response.data)
-                return {"message": "File downloaded successfully", "path": download_path}
-            except IOError as e:
-                return {"error": f"Failed to save file: {e}"}
-        else:
-            return {
-                "status": response.status,
-                "data": response.data.decode('utf-8') if response.data else None,
-            }
+                response = http2.urlopen(method, url, headers=headers, body=body)
+            except HTTP2StreamError as e:
+                if not (replayable and self.resilience.should_retry(host, method, headers, attempt, error=e)):
+                    raise
+                self.resilience.record(host, error=e)
+                retry_after = None
+            else:
+                if response is None or not (
+                    replayable and self.resilience.should_retry(host, method, headers, attempt, status=response.status)
+                ):
+                    return response
+                self.resilience.record(host, status=response.status)
+                retry_after = response.headers.get("Retry-After")
+                # Resets the stream instead of reading a body nobody wants.
+                response.close()
+            sleep(self.resilience.backoff(attempt, retry_after))
+            attempt += 1
+
+    def _download(self, url, path, headers, chunk_size):
+        """
+        Download ``url`` to ``path`` with the ranged (resumable) download engine.
+        """
+        from .download import RangedDownloader
+
+        downloader = RangedDownloader(
+            self, connections=self.download_connections, chunk_size=chunk_size
+        )
+        try:
+            downloader.download(url, path, headers)
+            return {"message": "File downloaded successfully", "path": path}
+        except HTTPRequestException as e:
+            return {"error": str(e), "status": e.status_code}
+        except IOError as e:
+            return {"error": f"Failed to save file: {e}"}
+
+    def _read_body(self, response, timing=None):
+        """
+        Read and decompress a whole response body, timing both phases.
+        """
+        started = perf_counter()
+        raw = response.read(decode_content=False)
+        response.release_conn()
+        downloaded = perf_counter()
+
+        decoder = IncrementalDecoder(response.headers.get("Content-Encoding"))
+        data = decoder.decompress(raw) + decoder.flush()
+
+        if timing is not None:
+            timing.add("download", downloaded - started)
+            timing.add("decompress", perf_counter() - downloaded)
+            timing.bytes_in += len(raw)
+        return data
+
+    @staticmethod
+    def _time_headers(timing, response, body, elapsed):
+        setup = sum(timing.phases.get(phase, 0.0) for phase in ("queue_wait", "connect", "tls"))
+        timing.add("ttfb", max(0.0, elapsed - setup))
+        timing.status = response.status
+        if response.retries is not None:
+            timing.retries += len(response.retries.history)
+        if isinstance(body, (bytes, bytearray, str)):
+            timing.bytes_out += len(body)
+
+    def _record(self, timing):
+        if timing is not None:
+            self.metrics.record(timing.finish())
+
+    def _rate_limit(self, host):
+        if self.rate_limiter is None:
+            return nullcontext()
+        return self.rate_limiter.limit(host)
+
+    def _build_result(self, status, headers, data, url):
+        # Cached headers are stored lower-cased, lookups must stay case-insensitive.
+        if not isinstance(headers, HTTPHeaderDict):
+            headers = HTTPHeaderDict(headers)
+        return Response(status, headers, data, url)
 
     def _generate_cookie_header(self, url):
         """
-        Generate the Cookie header based on the current cookies in the jar.
+        Generate the Cookie header based on the current cookies in the store.
         """
-        cookies = [f"{cookie.name}={cookie.value}" for cookie in self.cookie_jar if cookie.domain in url]
-        return {"Cookie": "; ".join(cookies)} if cookies else {}
+        cookie_header = self.cookie_jar.header_for(url)
+        return {"Cookie": cookie_header} if cookie_header else {}
 
     def _store_cookies(self, url, response):
         """
-        Store cookies from the response headers into the CookieJar.
+        Store cookies from the response headers into the CookieStore.
         """
         set_cookie_headers = response.headers.get_all("Set-Cookie", [])
-        for header in set_cookie_headers:
-            self.cookie_jar.extract_cookies_from_response(header, url)
+        if set_cookie_headers:
+            self.cookie_jar.extract(url, set_cookie_headers)
 
     def get_cookies(self):
         """
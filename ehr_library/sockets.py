@@ -1,37 +1,580 @@
+import time
+import random
 import asyncio
+import inspect
+import threading
 import websockets
+from websockets.protocol import State
+from websockets.exceptions import ConnectionClosed, ConnectionClosedOK
+from .events import get_event_bus
+
+
+# _send_batch relies on websockets internals (Connection.send_context and
+# the sans-I/O protocol) checked against this release series only; other
+# versions go through the public send().
+BATCHED_SEND_SERIES = "14."
+
+
+def _can_batch(connection):
+    """
+    True when ``connection`` exposes the internals _send_batch writes through.
+    """
+    if not websockets.__version__.startswith(BATCHED_SEND_SERIES):
+        return False
+    protocol = getattr(connection, "protocol", None)
+    return (
+        callable(getattr(connection, "send_context", None))
+        and callable(getattr(protocol, "send_text", None))
+        and callable(getattr(protocol, "send_binary", None))
+    )
+
+
+async def _send_batch(connection, batch):
+    """
+    Write ``batch`` with a single flow-control wait.
+
+    websockets' asyncio connection drains the socket after every send();
+    framing the whole batch inside one send context writes it in one go.
+    """
+    if len(batch) == 1 or not _can_batch(connection):
+        for message in batch:
+            await connection.send(message)
+        return
+    protocol = connection.protocol
+    async with connection.send_context():
+        for message in batch:
+            if isinstance(message, str):
+                protocol.send_text(message.encode())
+            else:
+                protocol.send_binary(message)
 
 
 class WebSocketManager:
-    def __init__(self, uri):
+    """
+    WebSocket client built for high message rates.
+
+    Messages are received with ``async for message in manager`` (or
+    ``receive_message``). ``send_message`` only enqueues: a writer task
+    drains the bounded outbound queue in batches, so producers pipeline
+    instead of waiting on every frame and block once ``send_queue_size``
+    messages are pending. Dropped connections are reopened with jittered
+    exponential backoff; ``on_connect`` runs after every (re)connect to
+    replay subscriptions before queued messages are flushed.
+    """
+
+    def __init__(self, uri, event_bus=None, compression="deflate", max_size=2 ** 20, max_queue=16,
+                 send_queue_size=1024, send_batch_size=256, reconnect=True, max_reconnects=None,
+                 backoff_base=0.5, backoff_max=30.0, on_connect=None, **connect_kwargs):
+        """
+        :param uri: WebSocket URI (ws:// or wss://)
+        :param event_bus: Optional EventBus (defaults to the process-wide one)
+        :param compression: "deflate" negotiates permessage-deflate, None disables it
+        :param max_size: Maximum incoming message size in bytes (None disables the limit)
+        :param max_queue: Incoming frames buffered before reading pauses (backpressure on the server)
+        :param send_queue_size: Outgoing messages queued before ``send_message`` waits
+        :param send_batch_size: Maximum messages written per writer wake-up
+        :param reconnect: Reopen the connection when it drops
+        :param max_reconnects: Consecutive failed attempts before giving up (None retries forever)
+        :param backoff_base: First reconnect delay ceiling, in seconds
+        :param backoff_max: Maximum reconnect delay, in seconds
+        :param on_connect: Optional callable (sync or async) receiving the new websockets
+            connection after every (re)connect, e.g. to resubscribe
+        :param connect_kwargs: Extra arguments for ``websockets.connect`` (ping_interval, additional_headers, ...)
+        """
         self.uri = uri
         self.connection = None
+        self.events = event_bus or get_event_bus()
+        self.connect_kwargs = {
+            "compression": compression,
+            "max_size": max_size,
+            "max_queue": max_queue,
+            **connect_kwargs,
+        }
+        self.send_queue_size = send_queue_size
+        self.send_batch_size = send_batch_size
+        self.reconnect = reconnect
+        self.max_reconnects = max_reconnects
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.on_connect = on_connect
+        self.reconnects = 0
+        self.messages_sent = 0
+        self.messages_received = 0
+        self._outbox = None
+        self._writer = None
+        self._send_error = None
+        self._closing = False
+        self._reconnect_lock = None
+
+    @property
+    def connected(self):
+        return self.connection is not None and self.connection.state is State.OPEN
 
     async def connect(self):
-        self.connection = await websockets.connect(self.uri)
-        print(f"Connected to {self.uri}")
+        self._closing = False
+        self._send_error = None
+        if self._outbox is None:
+            self._outbox = asyncio.Queue(self.send_queue_size)
+            self._reconnect_lock = asyncio.Lock()
+        await self._open()
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._write_forever())
+
+    async def _open(self):
+        self.connection = await websockets.connect(self.uri, **self.connect_kwargs)
+        if self.on_connect is not None:
+            result = self.on_connect(self.connection)
+            if inspect.isawaitable(result):
+                await result
+        if self.events.active:
+            self.events.emit("websocket.connected", uri=self.uri)
+
+    async def _reconnect(self, failed):
+        """
+        Replace ``failed`` with a new connection, once, however many tasks noticed it.
+
+        :return: True when a connection is available again
+        """
+        async with self._reconnect_lock:
+            if self.connection is not failed:
+                return self.connected
+            if self._closing or not self.reconnect:
+                return False
+            attempt = 0
+            while not self._closing:
+                # Full jitter: spread reconnect storms after a server restart.
+                await asyncio.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+                try:
+                    await self._open()
+                except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+                    attempt += 1
+                    if self.events.active:
+                        self.events.emit("websocket.reconnect_failed", uri=self.uri, attempt=attempt, error=str(e))
+                    if self.max_reconnects is not None and attempt >= self.max_reconnects:
+                        return False
+                    continue
+                self.reconnects += 1
+                if self.events.active:
+                    self.events.emit("websocket.reconnected", uri=self.uri, attempts=attempt + 1)
+                return True
+            return False
 
     async def send_message(self, message):
-        if self.connection:
-            await self.connection.send(message)
-            print(f"Sent::: {message}")
-        else:
-            raise ConnectionError("WebSocket is not connected.")
+        """
+        Queue ``message`` (str or bytes) for sending.
+
+        Waits only while the outbound queue is full. Use ``flush`` to wait
+        until everything queued has been written.
+        """
+        if self.connection is None or self._closing or self._send_error is not None:
+            raise ConnectionError("WebSocket is not connected.") from self._send_error
+        await self._outbox.put(message)
+        if self.events.active:
+            self.events.emit("websocket.sent", uri=self.uri, message=message)
+
+    async def send_many(self, messages):
+        for message in messages:
+            await self.send_message(message)
+
+    async def flush(self):
+        """
+        Wait until every queued message has been written to the connection.
+        """
+        if self._outbox is not None:
+            await self._outbox.join()
+        if self._send_error is not None:
+            raise ConnectionError("WebSocket is not connected.") from self._send_error
+
+    async def _write_forever(self):
+        outbox = self._outbox
+        batch = []
+        while True:
+            if not batch:
+                batch.append(await outbox.get())
+                while len(batch) < self.send_batch_size:
+                    try:
+                        batch.append(outbox.get_nowait())
+                    except asyncio.QueueEmpty:
+                        break
+            connection = self.connection
+            try:
+                await _send_batch(connection, batch)
+            except ConnectionClosed as e:
+                # The batch is sent again after reconnecting: delivery is at least once.
+                if await self._reconnect(connection):
+                    continue
+                self._fail_outbox(batch, e)
+                return
+            for _ in batch:
+                outbox.task_done()
+            self.messages_sent += len(batch)
+            batch = []
+
+    def _fail_outbox(self, batch, error):
+        self._send_error = error
+        for _ in range(len(batch) + self._outbox.qsize()):
+            self._outbox.task_done()
+        while not self._outbox.empty():
+            self._outbox.get_nowait()
 
     async def receive_message(self):
-        if self.connection:
-            message = await self.connection.recv()
-            print(f"Received::: {message}")
+        if self.connection is None:
+            raise ConnectionError("WebSocket is not connected.")
+        while True:
+            connection = self.connection
+            try:
+                message = await connection.recv()
+            except ConnectionClosed:
+                if not await self._reconnect(connection):
+                    raise
+                continue
+            self.messages_received += 1
+            if self.events.active:
+                self.events.emit("websocket.received", uri=self.uri, message=message)
             return message
-        else:
+
+    async def __aiter__(self):
+        """
+        Yield incoming messages, across reconnects, until the connection is
+        closed for good.
+        """
+        if self.connection is None:
             raise ConnectionError("WebSocket is not connected.")
+        events = self.events
+        while True:
+            connection = self.connection
+            try:
+                async for message in connection:
+                    self.messages_received += 1
+                    if events.active:
+                        events.emit("websocket.received", uri=self.uri, message=message)
+                    yield message
+            except ConnectionClosed as e:
+                if not await self._reconnect(connection):
+                    if self._closing or isinstance(e, ConnectionClosedOK):
+                        return
+                    raise
+                continue
+            # Clean close from the server.
+            if not await self._reconnect(connection):
+                return
 
     async def close(self):
+        self._closing = True
+        if self._writer is not None:
+            if self.connected and self._send_error is None:
+                await self.flush()
+            self._writer.cancel()
+            self._writer = None
         if self.connection:
             await self.connection.close()
-            print(f"Connection to {self.uri} closed.")
-        else:
-            print("No connection to close.")
+            if self.events.active:
+                self.events.emit("websocket.closed", uri=self.uri)
+
+    def stats(self):
+        return {
+            "uri": self.uri,
+            "connected": self.connected,
+            "queued": self._outbox.qsize() if self._outbox is not None else 0,
+            "sent": self.messages_sent,
+            "received": self.messages_received,
+            "reconnects": self.reconnects,
+        }
 
     def websocket_connect(self, uri):
-        return WebSocketManager(uri)
+        return WebSocketManager(
+            uri,
+            event_bus=self.events,
+            send_queue_size=self.send_queue_size,
+            send_batch_size=self.send_batch_size,
+            reconnect=self.reconnect,
+            max_reconnects=self.max_reconnects,
+            backoff_base=self.backoff_base,
+            backoff_max=self.backoff_max,
+            **self.connect_kwargs,
+        )
+
+
+class _PooledConnection:
+    __slots__ = ("name", "manager", "loop", "shard", "reader", "last_message", "latency", "ping_failures", "error")
+
+    def __init__(self, name, manager, loop, shard):
+        self.name = name
+        self.manager = manager
+        self.loop = loop
+        self.shard = shard
+        self.reader = None
+        self.last_message = None
+        self.latency = None
+        self.ping_failures = 0
+        self.error = None
+
+
+class WebSocketPool:
+    """
+    Many WebSocketManager connections merged into one bounded fan-in queue.
+
+    Connections run as tasks in the caller's event loop, or are spread over
+    ``shards`` event loops running in background threads. Every message is
+    delivered as a (name, message) tuple; when the consumer falls behind,
+    the queue fills up, readers stop reading and websockets' own
+    ``max_queue`` pushes the backpressure to the servers. A health task
+    pings every connection and closes the ones that stop answering, which
+    makes their manager reconnect.
+    """
+
+    def __init__(self, uris=None, shards=0, queue_size=10000, ping_interval=20.0, ping_timeout=10.0,
+                 event_bus=None, **manager_kwargs):
+        """
+        :param uris: Optional URIs (or {name: uri}) connected by ``start``
+        :param shards: Event loop threads hosting the connections (0 uses the caller's loop)
+        :param queue_size: Maximum messages waiting in the fan-in queue
+        :param ping_interval: Seconds between health pings (None disables them)
+        :param ping_timeout: Seconds a pong may take before the connection is recycled
+        :param event_bus: Optional EventBus (defaults to the process-wide one)
+        :param manager_kwargs: Settings for every WebSocketManager (compression, reconnect, on_connect, ...)
+        """
+        self.shards = shards
+        self.queue_size = queue_size
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.events = event_bus or get_event_bus()
+        # The pool pings on its own schedule, websockets' keepalive would double it.
+        self.manager_kwargs = {"ping_interval": None, **manager_kwargs}
+        self._initial = dict(uris) if isinstance(uris, dict) else {uri: uri for uri in uris or ()}
+        self._connections = {}
+        self._loop = None
+        self._queue = None
+        self._closed = None
+        self._health = None
+        self._shard_loops = []
+        self._shard_inboxes = []
+        self._forwarders = []
+        self._threads = []
+
+    async def start(self):
+        """
+        Start the shard loops and health task, then connect the initial URIs.
+        """
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue(self.queue_size)
+            self._closed = asyncio.Event()
+            for index in range(self.shards):
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name=f"ehr-ws-shard-{index}", daemon=True)
+                thread.start()
+                self._shard_loops.append(loop)
+                self._threads.append(thread)
+                await self._run_on(loop, self._start_shard())
+            if self.ping_interval:
+                self._health = asyncio.create_task(self._check_health())
+        if self._initial:
+            initial, self._initial = self._initial, {}
+            await asyncio.gather(*(self.add(uri, name) for name, uri in initial.items()))
+        return self
+
+    async def _start_shard(self):
+        inbox = asyncio.Queue(self.queue_size)
+        self._shard_inboxes.append(inbox)
+        self._forwarders.append(asyncio.create_task(self._forward(inbox)))
+
+    async def _forward(self, inbox):
+        # Readers in a shard fill its local inbox; hopping threads once per
+        # batch instead of once per message keeps sharding worthwhile.
+        consumer = self._loop
+        while True:
+            batch = [await inbox.get()]
+            while len(batch) < 1024:
+                try:
+                    batch.append(inbox.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._put_batch(batch), consumer))
+
+    async def _put_batch(self, batch):
+        put = self._queue.put
+        for item in batch:
+            await put(item)
+
+    @staticmethod
+    async def _stop_shard(forwarder):
+        forwarder.cancel()
+
+    async def _run_on(self, loop, coroutine):
+        if loop is self._loop:
+            return await coroutine
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, loop))
+
+    async def add(self, uri, name=None):
+        """
+        Connect ``uri`` and start feeding its messages into the pool.
+
+        :param name: Source tag of its messages (defaults to the URI)
+        :return: The name
+        """
+        await self.start()
+        name = name or uri
+        if name in self._connections:
+            raise ValueError(f"A connection named {name!r} is already in the pool.")
+        shard = len(self._connections) % self.shards if self.shards else 0
+        loop = self._shard_loops[shard] if self.shards else self._loop
+        manager = WebSocketManager(uri, event_bus=self.events, **self.manager_kwargs)
+        conn = _PooledConnection(name, manager, loop, shard)
+        self._connections[name] = conn
+        try:
+            await self._run_on(loop, self._open(conn))
+        except BaseException:
+            del self._connections[name]
+            raise
+        return name
+
+    async def _open(self, conn):
+        await conn.manager.connect()
+        conn.reader = asyncio.create_task(self._read(conn))
+
+    async def _read(self, conn):
+        if conn.loop is self._loop:
+            deliver = self._queue.put
+        else:
+            deliver = self._shard_inboxes[conn.shard].put
+        name = conn.name
+        try:
+            async for message in conn.manager:
+                conn.last_message = time.monotonic()
+                await deliver((name, message))
+        except ConnectionClosed as e:
+            # The manager gave up reconnecting.
+            conn.error = e
+            if self.events.active:
+                self.events.emit("websocket.pool_connection_lost", uri=conn.manager.uri, name=name, error=str(e))
+
+    async def remove(self, name):
+        conn = self._connections.pop(name)
+        await self._run_on(conn.loop, self._close_connection(conn))
+
+    @staticmethod
+    async def _close_connection(conn):
+        if conn.reader is not None:
+            conn.reader.cancel()
+        await conn.manager.close()
+
+    async def send(self, name, message):
+        """
+        Queue ``message`` on the connection called ``name``.
+        """
+        conn = self._connections[name]
+        await self._run_on(conn.loop, conn.manager.send_message(message))
+
+    async def broadcast(self, message):
+        """
+        Queue ``message`` on every connection.
+        """
+        await asyncio.gather(*(
+            self._run_on(conn.loop, conn.manager.send_message(message))
+            for conn in list(self._connections.values())
+        ))
+
+    async def receive(self):
+        """
+        Return the next (name, message) from any connection.
+
+        :raises: ConnectionError once the pool is closed and drained
+        """
+        try:
+            item = self._queue.get_nowait()
+        except asyncio.QueueEmpty:
+            if self._closed.is_set():
+                raise ConnectionError("WebSocket pool is closed.") from None
+            getter = asyncio.ensure_future(self._queue.get())
+            closed = asyncio.ensure_future(self._closed.wait())
+            await asyncio.wait((getter, closed), return_when=asyncio.FIRST_COMPLETED)
+            closed.cancel()
+            if not getter.done():
+                getter.cancel()
+                raise ConnectionError("WebSocket pool is closed.")
+            item = getter.result()
+        return item
+
+    async def __aiter__(self):
+        while True:
+            try:
+                yield await self.receive()
+            except ConnectionError:
+                return
+
+    async def _check_health(self):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await asyncio.gather(
+                *(self._run_on(conn.loop, self._ping(conn)) for conn in list(self._connections.values())),
+                return_exceptions=True,
+            )
+
+    async def _ping(self, conn):
+        manager = conn.manager
+        if not manager.connected:
+            return
+        connection = manager.connection
+        start = time.perf_counter()
+        try:
+            pong = await connection.ping()
+            await asyncio.wait_for(pong, self.ping_timeout)
+        except (asyncio.TimeoutError, ConnectionClosed):
+            conn.ping_failures += 1
+            if self.events.active:
+                self.events.emit("websocket.ping_timeout", uri=manager.uri, name=conn.name)
+            # Closing hands the connection to the manager's reconnect logic.
+            await connection.close()
+            return
+        conn.latency = time.perf_counter() - start
+
+    def stats(self):
+        """
+        Fan-in queue depth and per-connection counters, health and latency.
+        """
+        now = time.monotonic()
+        connections = {}
+        for name, conn in list(self._connections.items()):
+            connections[name] = {
+                **conn.manager.stats(),
+                "shard": conn.shard,
+                "latency_ms": None if conn.latency is None else conn.latency * 1000,
+                "idle_s": None if conn.last_message is None else now - conn.last_message,
+                "ping_failures": conn.ping_failures,
+                "error": None if conn.error is None else str(conn.error),
+            }
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "connections": connections,
+        }
+
+    async def close(self):
+        if self._loop is None:
+            return
+        if self._health is not None:
+            self._health.cancel()
+        connections = list(self._connections.values())
+        self._connections.clear()
+        await asyncio.gather(
+            *(self._run_on(conn.loop, self._close_connection(conn)) for conn in connections),
+            return_exceptions=True,
+        )
+        for loop, forwarder in zip(self._shard_loops, self._forwarders):
+            await self._run_on(loop, self._stop_shard(forwarder))
+            loop.call_soon_threadsafe(loop.stop)
+        for thread in self._threads:
+            thread.join()
+        for loop in self._shard_loops:
+            loop.close()
+        self._shard_loops.clear()
+        self._shard_inboxes.clear()
+        self._forwarders.clear()
+        self._threads.clear()
+        self._closed.set()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
@@ -0,0 +1,119 @@
+from .compression import IncrementalDecoder
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class StreamingResponse:
+    """
+    Response whose body is read lazily from the connection.
+
+    The body is never held in memory as a whole: iterate over the response
+    (or call ``iter_content``/``iter_lines``) to consume it chunk by chunk,
+    or ``save`` it straight to disk. The connection goes back to the pool
+    once the body is exhausted or the response is closed.
+    """
+
+    def __init__(self, response, url=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        :param response: urllib3 HTTPResponse opened with preload_content=False
+        :param url: URL the response belongs to
+        :param chunk_size: Default size of the chunks read from the socket
+        """
+        self.raw = response
+        self.url = url
+        self.status = response.status
+        self.headers = response.headers
+        self.chunk_size = chunk_size
+        self._consumed = False
+        self._exhausted = False
+
+    def iter_content(self, chunk_size=None, decode_content=True):
+        """
+        Iterate over the body in chunks.
+
+        :param chunk_size: Size of the raw chunks read from the socket
+        :param decode_content: Decompress the body on the fly (any registered codec)
+        :return: Iterator of bytes
+        """
+        if self._consumed:
+            raise RuntimeError("The response body has already been consumed.")
+        self._consumed = True
+
+        decoder = IncrementalDecoder(
+            self.headers.get("Content-Encoding") if decode_content else None
+        )
+        try:
+            for raw_chunk in self.raw.stream(chunk_size or self.chunk_size, decode_content=False):
+                chunk = decoder.decompress(raw_chunk)
+                if chunk:
+                    yield chunk
+            self._exhausted = True
+            tail = decoder.flush()
+            if tail:
+                yield tail
+        finally:
+            self.close()
+
+    def __iter__(self):
+        return self.iter_content()
+
+    def iter_lines(self, chunk_size=None, delimiter=b"\n", keepends=False):
+        """
+        Iterate over the body line by line without buffering it whole.
+
+        :param chunk_size: Size of the raw chunks read from the socket
+        :param delimiter: Line delimiter
+        :param keepends: Keep the delimiter at the end of each line
+        :return: Iterator of bytes lines
+        """
+        pending = bytearray()
+        for chunk in self.iter_content(chunk_size):
+            # Only the new bytes are searched (plus the end of the previous
+            # chunk, for delimiters split across chunks), so a line spanning
+            # many chunks costs linear time.
+            search_from = max(0, len(pending) - len(delimiter) + 1)
+            pending += chunk
+            line_start = 0
+            while True:
+                index = pending.find(delimiter, search_from)
+                if index < 0:
+                    break
+                line_end = index + len(delimiter)
+                yield bytes(pending[line_start:line_end if keepends else index])
+                line_start = search_from = line_end
+            del pending[:line_start]
+        if pending:
+            yield bytes(pending)
+
+    def save(self, path, chunk_size=None):
+        """
+        Stream the body to a file in fixed-size chunks.
+
+        :param path: Destination file path
+        :param chunk_size: Size of the raw chunks read from the socket
+        :return: Number of bytes written
+        """
+        written = 0
+        with open(path, "wb") as file:
+            for chunk in self.iter_content(chunk_size):
+                file.write(chunk)
+                written += len(chunk)
+        return written
+
+    def close(self):
+        """
+        Release the underlying connection back to the pool.
+
+        A partially read body cannot be reused, so its connection is closed
+        instead of being drained.
+        """
+        if not self._exhausted:
+            self.raw.close()
+        self.raw.release_conn()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
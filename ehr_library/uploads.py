@@ -0,0 +1,239 @@
+import io
+import os
+import uuid
+import mimetypes
+from .streaming import DEFAULT_CHUNK_SIZE
+
+
+def body_length(body):
+    """
+    Length of a request body when it can be known without reading it.
+
+    :param body: bytes, str, file object, MultipartEncoder or iterable
+    :return: Size in bytes, or None for bodies of unknown length (sent chunked)
+    """
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return memoryview(body).nbytes
+    if isinstance(body, MultipartEncoder):
+        return body.content_length
+    if hasattr(body, "read"):
+        if isinstance(body, io.TextIOBase):
+            # Characters are not bytes, the encoded size is unknown.
+            return None
+        try:
+            size = os.fstat(body.fileno()).st_size
+            return max(0, size - body.tell())
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            pass
+        try:
+            position = body.tell()
+            end = body.seek(0, os.SEEK_END)
+            body.seek(position)
+            return end - position
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return None
+    return None
+
+
+def is_streamed(body):
+    """
+    True for bodies produced chunk by chunk (files, iterables, generators).
+    """
+    return body is not None and not isinstance(body, (bytes, bytearray, memoryview, str))
+
+
+def is_replayable(body):
+    """
+    True when the body can be sent again on retry (in-memory or seekable).
+    """
+    if not is_streamed(body):
+        return True
+    if hasattr(body, "seekable"):
+        try:
+            return body.seekable()
+        except (OSError, ValueError):
+            return False
+    return False
+
+
+def iter_chunks(body, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Iterate over a file object or iterable body as bytes chunks.
+    """
+    if hasattr(body, "read"):
+        encode = isinstance(body, io.TextIOBase)
+        while True:
+            chunk = body.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk.encode("utf-8") if encode else chunk
+    else:
+        for chunk in body:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if chunk:
+                yield chunk
+
+
+def prepare_body(body, headers, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Turn a streamed body into something urllib3 sends chunk by chunk.
+
+    Bodies with a known length get a Content-Length header, the others are
+    sent with chunked transfer encoding. Data is read from the source only
+    as it is written to the socket, so memory stays constant and producing
+    the body overlaps with uploading it.
+
+    :param body: Request body (bytes, str, file object, MultipartEncoder or iterable)
+    :param headers: Request headers
+    :param chunk_size: Size of the chunks read from files
+    :return: Tuple (body, headers)
+    """
+    if not is_streamed(body):
+        return body, headers
+
+    headers = dict(headers)
+    if isinstance(body, MultipartEncoder):
+        headers.setdefault("Content-Type", body.content_type)
+
+    names = {name.lower() for name in headers}
+    if "content-length" not in names and "transfer-encoding" not in names:
+        length = body_length(body)
+        if length is not None:
+            headers["Content-Length"] = str(length)
+
+    if hasattr(body, "read") and not isinstance(body, io.TextIOBase):
+        # urllib3 reads (and rewinds on retries) file objects itself.
+        return body, headers
+    return iter_chunks(body, chunk_size), headers
+
+
+async def aiter_chunks(body, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Iterate over any streamed body asynchronously.
+
+    Async iterables are consumed directly; file objects and synchronous
+    iterables are read in a worker thread so blocking producers never stall
+    the event loop.
+    """
+    if isinstance(body, MultipartEncoder):
+        async for chunk in body.aiter_chunks():
+            yield chunk
+        return
+
+    if hasattr(body, "__aiter__"):
+        async for chunk in body:
+            yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+        return
+
+    import asyncio
+
+    iterator = iter_chunks(body, chunk_size)
+    done = object()
+    while True:
+        chunk = await asyncio.to_thread(next, iterator, done)
+        if chunk is done:
+            return
+        yield chunk
+
+
+class MultipartEncoder:
+    """
+    Streaming multipart/form-data encoder.
+
+    File parts are read in ``chunk_size`` pieces while the request is being
+    sent, so uploading large files never loads them in memory. The total
+    Content-Length is computed up front when every part has a known size;
+    otherwise the body is sent chunked.
+    """
+
+    def __init__(self, fields, boundary=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        :param fields: Dict or list of (name, value) pairs. A value is a str/bytes, or a
+            tuple (filename, file object or bytes[, content type]) for file parts
+        :param boundary: Optional multipart boundary
+        :param chunk_size: Size of the chunks read from file parts
+        """
+        self.boundary = boundary or uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        items = fields.items() if isinstance(fields, dict) else fields
+        self._parts = [self._make_part(name, value) for name, value in items]
+        self._consumed = False
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def _make_part(self, name, value):
+        name = str(name).replace('"', "%22")
+        if isinstance(value, tuple):
+            filename, content = value[0], value[1]
+            content_type = value[2] if len(value) > 2 else (
+                mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            )
+            filename = str(filename).replace('"', "%22")
+            disposition = f'form-data; name="{name}"; filename="{filename}"'
+        else:
+            content, content_type = value, None
+            disposition = f'form-data; name="{name}"'
+
+        header = f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n"
+        if content_type:
+            header += f"Content-Type: {content_type}\r\n"
+        header += "\r\n"
+
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        return header.encode("utf-8"), content
+
+    @property
+    def content_length(self):
+        """
+        Total size of the encoded body, or None when a part has an unknown size.
+        """
+        total = len(self._closing)
+        for header, content in self._parts:
+            size = body_length(content)
+            if size is None:
+                return None
+            total += len(header) + size + 2
+        return total
+
+    @property
+    def _closing(self):
+        return f"--{self.boundary}--\r\n".encode("utf-8")
+
+    def _claim(self):
+        if self._consumed:
+            raise RuntimeError("A MultipartEncoder can only be sent once.")
+        self._consumed = True
+
+    def __iter__(self):
+        self._claim()
+        for header, content in self._parts:
+            yield header
+            if isinstance(content, (bytes, bytearray, memoryview)):
+                yield bytes(content)
+            else:
+                yield from iter_chunks(content, self.chunk_size)
+            yield b"\r\n"
+        yield self._closing
+
+    async def aiter_chunks(self):
+        """
+        Asynchronous counterpart of ``__iter__``; file reads run in a worker thread.
+        """
+        self._claim()
+        for header, content in self._parts:
+            yield header
+            if isinstance(content, (bytes, bytearray, memoryview)):
+                yield bytes(content)
+            else:
+                async for chunk in aiter_chunks(content, self.chunk_size):
+                    yield chunk
+            yield b"\r\n"
+        yield self._closing
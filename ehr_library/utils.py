@@ -0,0 +1,98 @@
+import base64
+from urllib.parse import urlencode, urlparse, parse_qs, urlunparse
+
+
+SENSITIVE_HEADERS = {"authorization", "proxy-authorization", "cookie", "set-cookie"}
+
+
+def build_url(base_url, params=None):
+    """
+    Constrói uma URL com query strings adicionadas ou atualizadas.
+
+    :param base_url: URL base.
+    :param params: Dicionário contendo os parâmetros de consulta.
+    :return: URL com query strings.
+    """
+    if not params:
+        return base_url
+
+    parsed_url = urlparse(base_url)
+    existing_params = parse_qs(parsed_url.query)
+    existing_params.update(params)
+
+    new_query_string = urlencode(existing_params, doseq=True)
+    new_url = urlunparse((
+        parsed_url.scheme, parsed_url.netloc, parsed_url.path,
+        parsed_url.params, new_query_string, parsed_url.fragment
+    ))
+
+    return new_url
+
+
+def sanitize_headers(headers):
+    """
+    Return a copy of the headers with sensitive values redacted.
+
+    :param headers: Headers dictionary
+    :return: Sanitized copy of the headers
+    """
+    if not headers:
+        return {}
+
+    sanitized = dict(headers)
+    for key in sanitized:
+        if key.lower() in SENSITIVE_HEADERS:
+            sanitized[key] = "[REDACTED]"
+
+    return sanitized
+
+
+def get_proxy_url(proxies):
+    """
+    Pick the proxy URL to use from a {"http": ..., "https": ...} mapping.
+
+    :param proxies: Optional proxies dictionary
+    :return: Proxy URL or None
+    """
+    if not proxies:
+        return None
+    return proxies.get("https", proxies.get("http"))
+
+
+def static_auth_header(auth):
+    """
+    Build the Authorization header value for basic and bearer auth.
+
+    :param auth: Authentication dictionary ({"basic": (user, password)} or {"bearer": token})
+    :return: Header value, or None when the auth type needs a token fetch
+    """
+    if not auth:
+        return None
+
+    if "basic" in auth:
+        username, password = auth["basic"]
+        credentials = f"{username}:{password}"
+        encoded_credentials = base64.b64encode(credentials.encode()).decode()
+        return f"Basic {encoded_credentials}"
+
+    if "bearer" in auth:
+        return f"Bearer {auth['bearer']}"
+
+    return None
+
+
+def oauth2_token_request(oauth_config):
+    """
+    Build the client credentials form body for an OAuth 2.0 token request.
+
+    :param oauth_config: Dictionary with OAuth 2.0 configuration
+    :return: Tuple (token_url, headers, urlencoded body)
+    """
+    body = {
+        "grant_type": "client_credentials",
+        "client_id": oauth_config["client_id"],
+        "client_secret": oauth_config["client_secret"],
+        "scope": oauth_config.get("scope", ""),
+    }
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    return oauth_config["token_url"], headers, urlencode(body)
@@ -0,0 +1,24 @@
+import asyncio
+from ehr_library.misc.call import AsyncRequest
+
+
+async def main():
+    async with AsyncRequest("GET", limit_per_host=20, concurrency=200) as client:
+        tasks = [
+            client.request("https://jsonplaceholder.typicode.com/posts", params={"id": i})
+            for i in range(1, 11)
+        ]
+        for response in await asyncio.gather(*tasks):
+            print(response.status, response.text[:60])
+
+        created = await client.request(
+            "https://jsonplaceholder.typicode.com/posts",
+            method="POST",
+            headers={"Content-Type": "application/json"},
+            body='{"title": "foo"}',
+        )
+        print(created.status, created.json())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -21,3 +21,7 @@ for url, result in responses.items():
         print(f"  Erro: {result['error']}")
     else:
         print(result)
+
+# Processa os resultados conforme ficam prontos, com no máximo 2 em andamento
+for url, result in handler.iter_completed_sync(urls, max_in_flight=2, timeout=5):
+    print(f"Concluído: {url} -> {result['status']}")
@@ -1,5 +1,4 @@
 import time
-import random
 from ehr_library.core import Request
 from ehr_library.misc.keys import APIKeyManager
 
@@ -13,6 +12,7 @@ rotation_interval = 600
 key_manager = APIKeyManager(keys_with_limits, rotation_interval)
 url = "https://api.example.com/endpoint"
 method = "GET"
+request_instance = Request(method)
 
 for i in range(5):
     try:
@@ -0,0 +1,18 @@
+from ehr_library.core import Request
+from ehr_library.session import HTTPSessionManager
+
+
+if __name__ == "__main__":
+    client = Request("GET")
+
+    # Lê a resposta linha a linha, sem carregar o corpo inteiro em memória.
+    response = client.request(url="https://httpbin.org/stream/20", stream=True)
+    for line in response.iter_lines():
+        print("Line:", line.decode("utf-8"))
+
+    # Downloads são gravados em disco em blocos de tamanho fixo.
+    session = HTTPSessionManager()
+    result = session.request(
+        "GET", "https://httpbin.org/gzip", download_path="gzip.json"
+    )
+    print(result)
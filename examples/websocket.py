@@ -1,5 +1,5 @@
 import asyncio
-from sockets import WebSocketManager
+from ehr_library.sockets import WebSocketManager
 
 
 async def test_websocket():
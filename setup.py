@@ -22,5 +22,7 @@ setup(
         "setuptools>=75.6.0",
         "urllib3>=2.2.3",
         "wheel>=0.45.1",
+        # ehr_library.sockets batches frames through websockets internals.
+        "websockets==14.1",
     ],
 )
@@ -0,0 +1,133 @@
+import gc
+import asyncio
+import json
+import time
+import threading
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ehr_library.auth import OAuth2TokenCache
+from ehr_library.core import Request
+
+
+CONFIG = {"token_url": "http://127.0.0.1/token", "client_id": "id", "client_secret": "secret"}
+
+
+class _Fetcher:
+    def __init__(self, expires_in=0.3):
+        self.calls = 0
+        self.expires_in = expires_in
+
+    def __call__(self, oauth_config):
+        self.calls += 1
+        return {"access_token": f"token-{self.calls}", "expires_at": time.time() + self.expires_in}
+
+
+def test_tokens_read_since_refresh_are_refreshed_ahead():
+    cache = OAuth2TokenCache(skew=0, refresh_ahead=0.2)
+    fetch = _Fetcher()
+    assert cache.get_token(CONFIG, fetch)["access_token"] == "token-1"
+    cache.get_token(CONFIG, fetch)
+    time.sleep(0.2)
+    assert fetch.calls == 2
+    cache.clear()
+
+
+def test_unread_tokens_are_not_refreshed():
+    cache = OAuth2TokenCache(skew=0, refresh_ahead=0.2)
+    fetch = _Fetcher()
+    cache.get_token(CONFIG, fetch)
+    time.sleep(0.2)
+    assert fetch.calls == 1
+    assert not cache._timers
+
+    # The next read schedules refreshes again.
+    cache.get_token(CONFIG, fetch)
+    time.sleep(0.05)
+    assert fetch.calls == 2
+    cache.clear()
+
+
+class _TokenHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({"access_token": "abc", "expires_in": 3600}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_background_refresh_does_not_keep_the_client_alive():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _TokenHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    cache = OAuth2TokenCache()
+    config = {**CONFIG, "token_url": f"http://127.0.0.1:{server.server_port}/token"}
+    try:
+        client = Request("GET", auth={"oauth2": config}, token_cache=cache)
+        headers = client._add_authentication({})
+        assert headers["Authorization"] == "Bearer abc"
+        assert cache._timers
+
+        reference = weakref.ref(client)
+        del client
+        gc.collect()
+        assert reference() is None
+    finally:
+        cache.clear()
+        server.shutdown()
+        server.server_close()
+
+
+class _AsyncFetcher(_Fetcher):
+    async def __call__(self, oauth_config):
+        return super().__call__(oauth_config)
+
+
+def test_async_refresh_is_rearmed_on_a_new_loop():
+    cache = OAuth2TokenCache(skew=0, refresh_ahead=0.2)
+    fetch = _AsyncFetcher(expires_in=0.5)
+
+    async def read(wait):
+        token = await cache.get_token_async(CONFIG, fetch)
+        await cache.get_token_async(CONFIG, fetch)
+        await asyncio.sleep(wait)
+        return token
+
+    try:
+        # The refresh armed on this loop dies with it.
+        asyncio.run(read(0))
+        assert fetch.calls == 1
+        # A new loop arms its own refresh instead of trusting the dead handle.
+        asyncio.run(read(0.5))
+        assert fetch.calls == 2
+        assert len(cache._async_timers) == 1
+    finally:
+        cache.clear()
+
+
+def test_threaded_refresh_leaves_loop_handles_alone():
+    cache = OAuth2TokenCache(skew=0, refresh_ahead=0.2)
+    fetch = _AsyncFetcher()
+    sync_fetch = _Fetcher()
+
+    async def main():
+        await cache.get_token_async(CONFIG, fetch)
+        await cache.get_token_async(CONFIG, fetch)
+        (_, handle), = cache._async_timers.values()
+        await asyncio.to_thread(cache.get_token, CONFIG, sync_fetch)
+        assert not handle.cancelled()
+        await asyncio.sleep(0.25)
+
+    try:
+        asyncio.run(main())
+        # Whichever fires first refreshes; the other sees a fresh token.
+        assert fetch.calls + sync_fetch.calls == 2
+    finally:
+        cache.clear()
@@ -0,0 +1,62 @@
+import threading
+import time
+from collections import deque
+
+import pytest
+
+from benchmarks.servers import HTTPServer
+from ehr_library.batch import RequestBatch
+from ehr_library.core import Request
+from ehr_library.session import HTTPSessionManager
+
+
+def _slow(spec):
+    time.sleep(spec)
+    return spec
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_cancel_from_another_thread_ends_iteration(ordered):
+    batch = RequestBatch(_slow, [0.01] + [0.2] * 20, max_workers=2, ordered=ordered)
+    results = []
+    threading.Timer(0.05, batch.cancel).start()
+    for result in batch:
+        results.append(result)
+    assert [result.response for result in results] == [0.01]
+
+
+def test_results_keep_input_order():
+    batch = RequestBatch(_slow, [0.05, 0.01, 0.03], max_workers=3)
+    assert [result.response for result in batch] == [0.05, 0.01, 0.03]
+
+
+def test_request_many_leaves_the_session_pools_alone():
+    session = HTTPSessionManager(maxsize=2)
+    client = Request("GET", session_manager=session)
+    with HTTPServer() as server:
+        results = client.request_many([server.url + "/small"] * 8, max_workers=8).results()
+    assert all(result.ok for result in results)
+    assert session.maxsize == 2
+    assert session.pool_key == HTTPSessionManager(maxsize=2).pool_key
+
+
+class _RecordingDeque(deque):
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def __iter__(self):
+        self.threads.add(threading.get_ident())
+        return super().__iter__()
+
+
+def test_cancel_leaves_pending_futures_to_the_iterating_thread():
+    # Walking them from another thread raced with the iterator mutating them.
+    batch = RequestBatch(_slow, [0.01] + [0.2] * 20, max_workers=2)
+    batch._pending = _RecordingDeque()
+    canceller = threading.Thread(target=batch.cancel)
+    for result in batch:
+        canceller.start()
+        canceller.join()
+    assert result.response == 0.01
+    assert batch._pending.threads <= {threading.get_ident()}
@@ -0,0 +1,78 @@
+import os
+import pickle
+
+from ehr_library.cache import ResponseCache
+
+
+HEADERS = {"Cache-Control": "max-age=60", "Content-Type": "application/octet-stream"}
+
+
+def test_disk_tier_round_trips_without_pickle(tmp_path):
+    body = bytes(range(256)) * 4
+    ResponseCache(disk_path=str(tmp_path)).store("https://a.example/x", {}, 200, HEADERS, body)
+
+    entry = ResponseCache(disk_path=str(tmp_path)).lookup("https://a.example/x")
+    assert entry is not None and entry.is_fresh()
+    assert entry.status == 200
+    assert entry.body == body
+    assert entry.headers["content-type"] == "application/octet-stream"
+
+
+def test_planted_pickle_is_ignored(tmp_path):
+    cache = ResponseCache(disk_path=str(tmp_path))
+    cache.store("https://a.example/x", {}, 200, HEADERS, b"ok")
+    for name in os.listdir(tmp_path):
+        with open(tmp_path / name, "wb") as file:
+            pickle.dump(("key", "record"), file)
+    assert ResponseCache(disk_path=str(tmp_path)).lookup("https://a.example/x") is None
+
+
+def test_authorized_responses_are_not_shared():
+    cache = ResponseCache()
+    cache.store("https://a.example/me", {"Authorization": "Bearer alice"}, 200, HEADERS, b"alice")
+
+    assert cache.lookup("https://a.example/me", {"Authorization": "Bearer alice"}).body == b"alice"
+    assert cache.lookup("https://a.example/me", {"Authorization": "Bearer bob"}) is None
+    assert cache.lookup("https://a.example/me") is None
+
+
+def test_vary_selects_the_entry():
+    cache = ResponseCache()
+    headers = {**HEADERS, "Vary": "Accept"}
+    cache.store("https://a.example/v", {"Accept": "text/html"}, 200, headers, b"html")
+    cache.store("https://a.example/v", {"Accept": "application/json"}, 200, headers, b"json")
+    assert cache.lookup("https://a.example/v", {"Accept": "application/json"}).body == b"json"
+    assert cache.lookup("https://a.example/v", {"Accept": "text/html"}).body == b"html"
+
+
+def test_vary_index_follows_evictions_and_expiry():
+    cache = ResponseCache(max_bytes=400)
+    headers = {**HEADERS, "Vary": "Accept"}
+    cache.store("https://a.example/old", {"Accept": "a"}, 200, headers, b"x" * 200)
+    cache.store("https://a.example/new", {"Accept": "a"}, 200, headers, b"x" * 200)
+    assert set(cache._vary_index) == {"https://a.example/new"}
+
+    cache.store("https://a.example/short", {}, 200, {"Cache-Control": "max-age=0"}, b"gone")
+    assert "https://a.example/short" in cache._url_entries
+    assert cache.lookup("https://a.example/short") is None
+    assert "https://a.example/short" not in cache._url_entries
+    assert cache.stats()["entries"] == 1
+
+
+def test_stale_entries_with_validators_are_kept():
+    cache = ResponseCache()
+    cache.store("https://a.example/e", {}, 200, {"ETag": '"v1"'}, b"body")
+    entry = cache.lookup("https://a.example/e")
+    assert entry is not None and not entry.is_fresh()
+    assert cache.conditional_headers(entry) == {"If-None-Match": '"v1"'}
+
+
+def test_stored_headers_describe_the_decoded_body():
+    cache = ResponseCache()
+    headers = {**HEADERS, "Content-Encoding": "gzip", "Content-Length": "12"}
+    entry = cache.store("https://a.example/z", {}, 200, headers, b"decoded body, longer")
+    assert "content-encoding" not in entry.headers
+    assert entry.headers["content-length"] == str(len(b"decoded body, longer"))
+
+    refreshed = cache.revalidated("https://a.example/z", {}, entry, {"Content-Encoding": "gzip"})
+    assert "content-encoding" not in refreshed.headers
@@ -0,0 +1,194 @@
+import io
+import json
+import time
+import socket
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+import pytest
+
+from benchmarks.servers import HTTPServer
+from ehr_library.auth import OAuth2TokenCache
+from ehr_library.misc.call import AsyncRequest, AsyncRequestHandler
+from ehr_library.resilience import ResiliencePolicy
+
+
+@pytest.fixture
+def stalled_url():
+    """A server that accepts connections and never answers."""
+    listener = socket.create_server(("127.0.0.1", 0))
+    accepted = []
+
+    def accept_forever():
+        while True:
+            try:
+                accepted.append(listener.accept()[0])
+            except OSError:
+                return
+
+    threading.Thread(target=accept_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{listener.getsockname()[1]}"
+    listener.close()
+    for sock in accepted:
+        sock.close()
+
+
+@pytest.fixture
+def http_server():
+    with HTTPServer() as server:
+        yield server
+
+
+def test_fetch_without_timeout_keeps_the_session_timeout(stalled_url):
+    async def main():
+        timeout = aiohttp.ClientTimeout(total=0.3)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            return await asyncio.wait_for(AsyncRequestHandler().fetch(session, stalled_url), 5)
+
+    result = asyncio.run(main())
+    assert result["status"] == "error"
+
+
+def test_iter_completed_times_out_stalled_requests(stalled_url, http_server):
+    async def main():
+        handler = AsyncRequestHandler(max_in_flight=4, timeout=0.3)
+        urls = [http_server.url + "/small", stalled_url + "/a", stalled_url + "/b"]
+        return [pair async for pair in handler.iter_completed(urls)]
+
+    started = time.perf_counter()
+    results = dict(asyncio.run(asyncio.wait_for(main(), 5)))
+    assert time.perf_counter() - started < 3
+    assert results[http_server.url + "/small"]["status"] == 200
+    assert results[stalled_url + "/a"]["status"] == "error"
+    assert results[stalled_url + "/b"]["status"] == "error"
+
+
+def test_iter_completed_sync_yields_as_requests_finish(stalled_url, http_server):
+    handler = AsyncRequestHandler(max_in_flight=2, timeout=0.5)
+    specs = [
+        stalled_url,
+        {"url": http_server.url + "/slow?ms=50"},
+        {"url": http_server.url + "/small", "method": "POST", "body": b"x"},
+    ]
+    order = [url for url, _ in handler.iter_completed_sync(specs)]
+    # The stalled request finishes (times out) last, whatever its position.
+    assert order[-1] == stalled_url
+    assert sorted(order[:2]) == sorted([http_server.url + "/slow?ms=50", http_server.url + "/small"])
+
+
+class _RecordingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if not size:
+                    self.rfile.readline()
+                    return bytes(body)
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _handle(self):
+        body = self._read_body()
+        self.server.received.append((self.command, self.path, dict(self.headers), body))
+        data = b"ok"
+        if self.path == "/token":
+            data = json.dumps({"access_token": "token-1", "expires_in": 3600}).encode()
+        status = int(self.path.rsplit("/", 1)[-1]) if self.path.startswith("/status/") else 200
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = _handle
+
+
+@pytest.fixture
+def recording_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RecordingHandler)
+    server.received = []
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _send(client, *args, **kwargs):
+    async def main():
+        try:
+            return await client.request(*args, **kwargs)
+        finally:
+            await client.close()
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("auth, expected", [
+    ({"basic": ("user", "secret")}, "Basic dXNlcjpzZWNyZXQ="),
+    ({"bearer": "abc"}, "Bearer abc"),
+])
+def test_async_request_sends_static_auth(recording_server, auth, expected):
+    response = _send(AsyncRequest("GET", auth=auth, user_agent="ehr-test"), recording_server.url + "/items")
+    assert response.status == 200 and response.data == b"ok"
+    _, path, headers, _ = recording_server.received[0]
+    assert path == "/items"
+    assert headers["Authorization"] == expected
+    assert headers["User-Agent"] == "ehr-test"
+
+
+def test_async_request_fetches_and_reuses_oauth2_token(recording_server):
+    oauth = {"token_url": recording_server.url + "/token", "client_id": "id", "client_secret": "secret"}
+    client = AsyncRequest("GET", auth={"oauth2": oauth}, token_cache=OAuth2TokenCache())
+
+    async def main():
+        try:
+            for _ in range(2):
+                assert (await client.request(recording_server.url + "/items")).status == 200
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+    paths = [path for _, path, _, _ in recording_server.received]
+    assert paths == ["/token", "/items", "/items"]
+    assert b"client_id=id" in recording_server.received[0][3]
+    assert all(headers["Authorization"] == "Bearer token-1" for _, _, headers, _ in recording_server.received[1:])
+
+
+def test_async_request_streams_generator_and_file_bodies(recording_server):
+    async def chunks():
+        for index in range(3):
+            yield f"part-{index};".encode()
+
+    _send(AsyncRequest("POST"), recording_server.url + "/upload", body=chunks())
+    _, _, headers, body = recording_server.received[0]
+    assert body == b"part-0;part-1;part-2;"
+    assert headers.get("Transfer-Encoding") == "chunked"
+
+    payload = b"x" * 100_000
+    _send(AsyncRequest("PUT"), recording_server.url + "/upload", body=io.BytesIO(payload))
+    _, _, headers, body = recording_server.received[1]
+    assert body == payload
+    assert headers["Content-Length"] == str(len(payload))
+
+
+def test_async_request_does_not_retry_a_consumed_stream(recording_server):
+    def chunks():
+        yield b"once"
+
+    policy = ResiliencePolicy(retries=3, backoff_factor=0, failure_threshold=None)
+    response = _send(AsyncRequest("PUT", resilience=policy), recording_server.url + "/status/503", body=chunks())
+    assert response.status == 503
+    assert [body for _, _, _, body in recording_server.received] == [b"once"]
+
+    # A bytes body is replayed.
+    _send(AsyncRequest("PUT", resilience=policy), recording_server.url + "/status/503", body=b"again")
+    assert [body for _, _, _, body in recording_server.received[1:]] == [b"again"] * 4
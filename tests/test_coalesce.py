@@ -0,0 +1,162 @@
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ehr_library.coalesce import RequestCoalescer
+from ehr_library.core import Request
+from ehr_library.misc.call import AsyncRequest
+from ehr_library.resilience import ResiliencePolicy
+from ehr_library.session import HTTPSessionManager
+
+WAITERS = 8
+
+
+class _GatedHandler(BaseHTTPRequestHandler):
+    """Counts requests and holds every answer until the test releases it."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.hits += 1
+        self.server.release.wait(5)
+        if self.path == "/drop":
+            self.close_connection = True
+            return
+        body = f"hit {self.server.hits}".encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _GatedHandler)
+    server.lock = threading.Lock()
+    server.hits = 0
+    server.release = threading.Event()
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session():
+    policy = ResiliencePolicy(retries=0, backoff_factor=0, failure_threshold=None)
+    return HTTPSessionManager(retries=0, resilience=policy)
+
+
+def _release_when_coalesced(server, coalescer, count):
+    deadline = time.monotonic() + 5
+    while coalescer.stats()["coalesced"] < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    server.release.set()
+
+
+def _run_threads(server, client, url):
+    results = [None] * WAITERS
+
+    def worker(index):
+        try:
+            results[index] = client.request(url)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(WAITERS)]
+    for thread in threads:
+        thread.start()
+    _release_when_coalesced(server, client.coalescer, WAITERS - 1)
+    for thread in threads:
+        thread.join(10)
+    return results
+
+
+def test_concurrent_identical_gets_share_one_upstream_request(server, session):
+    coalescer = RequestCoalescer()
+    client = Request("GET", session_manager=session, coalesce=coalescer)
+    results = _run_threads(server, client, server.url + "/items")
+
+    assert server.hits == 1
+    assert all(result is results[0] for result in results)
+    assert results[0].status == 200 and results[0].data == b"hit 1"
+    assert coalescer.stats() == {"upstream": 1, "coalesced": WAITERS - 1, "in_flight": 0}
+
+    # Nothing is cached: the next request goes upstream again.
+    assert client.request(server.url + "/items").data == b"hit 2"
+
+
+def test_upstream_error_reaches_every_waiter(server, session):
+    coalescer = RequestCoalescer()
+    client = Request("GET", session_manager=session, coalesce=coalescer)
+    results = _run_threads(server, client, server.url + "/drop")
+
+    assert server.hits == 1
+    assert isinstance(results[0], Exception)
+    assert all(result is results[0] for result in results)
+    assert coalescer.stats()["in_flight"] == 0
+
+
+def test_different_vary_headers_are_not_merged(server, session):
+    coalescer = RequestCoalescer()
+    server.release.set()
+    client = Request("GET", session_manager=session, coalesce=coalescer)
+    client.request(server.url + "/items", headers={"Accept": "text/plain"})
+    client.request(server.url + "/items", headers={"Accept": "application/json"})
+    assert coalescer.key("POST", server.url + "/items") is None
+    assert server.hits == 2
+
+
+def test_async_waiters_share_one_upstream_request(server):
+    coalescer = RequestCoalescer()
+    policy = ResiliencePolicy(retries=0, backoff_factor=0, failure_threshold=None)
+
+    async def main():
+        client = AsyncRequest("GET", coalesce=coalescer, resilience=policy, timeout=10)
+        try:
+            tasks = [asyncio.ensure_future(client.request(server.url + "/items")) for _ in range(WAITERS)]
+            # One waiter is cancelled: the shared request keeps going for the others.
+            await asyncio.sleep(0.2)
+            tasks[0].cancel()
+            await asyncio.get_running_loop().run_in_executor(
+                None, _release_when_coalesced, server, coalescer, WAITERS - 1
+            )
+            return await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            await client.close()
+
+    results = asyncio.run(main())
+    assert server.hits == 1
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert all(result is results[1] for result in results[1:])
+    assert results[1].data == b"hit 1"
+
+
+def test_async_upstream_error_reaches_every_waiter(server):
+    coalescer = RequestCoalescer()
+    policy = ResiliencePolicy(retries=0, backoff_factor=0, failure_threshold=None)
+
+    async def main():
+        client = AsyncRequest("GET", coalesce=coalescer, resilience=policy, timeout=10)
+        try:
+            tasks = [asyncio.ensure_future(client.request(server.url + "/drop")) for _ in range(WAITERS)]
+            await asyncio.get_running_loop().run_in_executor(
+                None, _release_when_coalesced, server, coalescer, WAITERS - 1
+            )
+            return await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            await client.close()
+
+    results = asyncio.run(main())
+    # aiohttp may resend an idempotent request once on disconnect, but the waiters make one call.
+    assert coalescer.stats() == {"upstream": 1, "coalesced": WAITERS - 1, "in_flight": 0}
+    assert isinstance(results[0], Exception)
+    assert all(result is results[0] for result in results)
@@ -0,0 +1,115 @@
+import os
+import gzip
+import zlib
+
+import pytest
+
+from ehr_library.compression import (
+    BrotliCodec,
+    Codec,
+    CodecRegistry,
+    DeflateCodec,
+    GzipCodec,
+    IncrementalDecoder,
+    ZstdCodec,
+    compress_body,
+    get_codec_registry,
+)
+
+BODY = b"".join(b'{"id": %d, "name": "item-%d"}\n' % (index, index) for index in range(2000))
+
+
+def _decode_in_chunks(codec, data, chunk_size=97):
+    registry = CodecRegistry([codec])
+    decoder = IncrementalDecoder(codec.name, registry=registry)
+    output = b"".join(decoder.decompress(data[i:i + chunk_size]) for i in range(0, len(data), chunk_size))
+    return output + decoder.flush()
+
+
+@pytest.mark.parametrize("codec_class", [GzipCodec, DeflateCodec])
+def test_builtin_codecs_round_trip(codec_class):
+    codec = codec_class()
+    compressed = codec.compress(BODY)
+    assert len(compressed) < len(BODY)
+    assert _decode_in_chunks(codec, compressed) == BODY
+
+
+def test_brotli_round_trip():
+    pytest.importorskip("brotli")
+    codec = BrotliCodec()
+    assert codec.available()
+    assert _decode_in_chunks(codec, codec.compress(BODY)) == BODY
+    assert "br" in get_codec_registry().accept_encoding()
+
+
+def test_zstd_round_trip():
+    pytest.importorskip("zstandard")
+    codec = ZstdCodec()
+    assert codec.available()
+    # Two concatenated frames decode as one body.
+    assert _decode_in_chunks(codec, codec.compress(BODY) + codec.compress(BODY)) == BODY * 2
+    assert "zstd" in get_codec_registry().accept_encoding()
+
+
+def test_missing_optional_codecs_are_not_advertised():
+    registry = get_codec_registry()
+    for codec in (BrotliCodec(), ZstdCodec()):
+        if not codec.available():
+            assert registry.get(codec.name) is None
+            assert codec.name not in registry.accept_encoding()
+
+
+def test_stacked_and_raw_deflate_encodings():
+    assert IncrementalDecoder("gzip, deflate").decompress(zlib.compress(gzip.compress(BODY))) == BODY
+    raw = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    data = raw.compress(BODY) + raw.flush()
+    decoder = IncrementalDecoder("deflate")
+    assert decoder.decompress(data) + decoder.flush() == BODY
+    assert IncrementalDecoder("x-unknown").decompress(b"as is") == b"as is"
+
+
+class _RawDeflateCodec(Codec):
+    name = "x-raw-deflate"
+
+    def compress(self, data, level=None):
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompressor(self):
+        return zlib.decompressobj(-zlib.MAX_WBITS)
+
+
+def test_registered_codec_is_advertised_and_used():
+    registry = CodecRegistry([GzipCodec()])
+    assert registry.accept_encoding() == "gzip"
+    registry.register(_RawDeflateCodec())
+    assert registry.accept_encoding() == "gzip, x-raw-deflate"
+    assert registry.get("X-Raw-Deflate ") is not None
+
+    body, headers = compress_body(BODY, {}, "x-raw-deflate", min_size=0, registry=registry)
+    assert headers == {"Content-Encoding": "x-raw-deflate"}
+    decoder = registry.decoder("x-raw-deflate")
+    assert decoder.decompress(body) + decoder.flush() == BODY
+
+
+def test_compress_body_respects_min_size():
+    small = BODY[:100]
+    assert compress_body(small, {}, "gzip", min_size=1024) == (small, {})
+
+    body, headers = compress_body(BODY, {}, "gzip", min_size=1024)
+    assert headers == {"Content-Encoding": "gzip"}
+    assert gzip.decompress(body) == BODY
+
+    body, headers = compress_body(BODY.decode(), {}, "gzip", min_size=len(BODY))
+    assert headers == {"Content-Encoding": "gzip"}
+
+
+def test_compress_body_leaves_other_bodies_alone():
+    headers = {"content-encoding": "br"}
+    assert compress_body(BODY, headers, "gzip", min_size=0) == (BODY, headers)
+    assert compress_body(BODY, {}, "x-unknown", min_size=0) == (BODY, {})
+    # Incompressible data is sent as is.
+    noise = os.urandom(2048)
+    assert compress_body(noise, {}, "gzip", min_size=0)[1] == {}
+    stream = iter([BODY])
+    assert compress_body(stream, {}, "gzip", min_size=0) == (stream, {})
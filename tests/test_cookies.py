@@ -0,0 +1,77 @@
+import time
+
+from ehr_library.cookies import CookieStore, default_path, domain_match, parse_set_cookie, path_match
+
+
+def test_domain_and_path_matching():
+    assert domain_match("api.example.com", "example.com")
+    assert not domain_match("badexample.com", "example.com")
+    assert not domain_match("10.0.0.1", "0.0.1")
+    assert path_match("/docs/page", "/docs")
+    assert path_match("/docs/page", "/docs/")
+    assert not path_match("/documents", "/docs")
+    assert default_path("/docs/page") == "/docs"
+    assert default_path("/page") == "/"
+
+
+def test_header_follows_domain_path_and_secure():
+    store = CookieStore()
+    store.extract("https://www.example.com/app/login", [
+        "session=1; Domain=example.com; Path=/",
+        "pref=dark; Path=/app",
+        "token=x; Secure",
+    ])
+    assert store.header_for("https://www.example.com/app/home") == "pref=dark; token=x; session=1"
+    assert store.header_for("http://www.example.com/app/home") == "pref=dark; session=1"
+    # Host-only cookies stay on their host, Domain cookies reach subdomains.
+    assert store.header_for("https://api.example.com/app/home") == "session=1"
+    assert store.header_for("https://example.org/") == ""
+
+
+def test_public_suffix_cookies_are_rejected():
+    assert parse_set_cookie("a=1; Domain=co.uk", "shop.example.co.uk", "/") is None
+    assert parse_set_cookie("a=1; Domain=com", "example.com", "/") is None
+    assert parse_set_cookie("a=1; Domain=github.io", "me.github.io", "/") is None
+    cookie = parse_set_cookie("a=1; Domain=example.co.uk", "shop.example.co.uk", "/")
+    assert cookie.domain == "example.co.uk" and not cookie.host_only
+    # A host that is a public suffix itself only gets a host-only cookie.
+    cookie = parse_set_cookie("a=1; Domain=localhost", "localhost", "/")
+    assert cookie.domain == "localhost" and cookie.host_only
+
+
+def test_expired_cookies_are_evicted():
+    store = CookieStore()
+    store.extract("https://example.com/", ["short=1; Max-Age=1", "long=2; Max-Age=3600"])
+    assert store.header_for("https://example.com/") == "short=1; long=2"
+    store.extract("https://example.com/", ["long=2; Max-Age=0"])
+    assert store.header_for("https://example.com/") == "short=1"
+
+    now = time.time()
+    store.set_cookie(parse_set_cookie("soon=1; Max-Age=1", "example.com", "/", now - 2))
+    assert "soon" not in store.header_for("https://example.com/")
+    assert [cookie.name for cookie in store] == ["short"]
+
+
+def test_header_cache_survives_identical_refreshes():
+    store = CookieStore()
+    expires = "Expires=Wed, 01 Jan 2070 00:00:00 GMT"
+    store.extract("https://example.com/", [f"session=1; {expires}"])
+    header = store.header_for("https://example.com/")
+    assert store._header_cache
+
+    for _ in range(500):
+        store.extract("https://example.com/", [f"session=1; {expires}"])
+    assert store._header_cache[("example.com", "/", True)] is header
+    assert len(store._expiry_heap) == 1
+
+    store.extract("https://example.com/", [f"session=2; {expires}"])
+    assert not store._header_cache
+    assert store.header_for("https://example.com/") == "session=2"
+
+
+def test_expiry_heap_is_compacted():
+    store = CookieStore()
+    for max_age in range(1000, 2000):
+        store.extract("https://example.com/", [f"session=1; Max-Age={max_age}"])
+    assert len(store) == 1
+    assert len(store._expiry_heap) <= 2 * len(store) + 64
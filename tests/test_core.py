@@ -0,0 +1,72 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ehr_library import jsonlib
+from ehr_library.core import Request
+from ehr_library.jsonlib import StdlibBackend, get_json_backend, set_json_backend
+
+
+class _EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.received.append((dict(self.headers), body))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_PUT = do_POST
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EchoHandler)
+    server.received = []
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def stdlib_json():
+    previous = jsonlib._backend
+    backend = set_json_backend("json")
+    yield backend
+    jsonlib._backend = previous
+
+
+def test_set_json_backend_forces_the_stdlib(stdlib_json):
+    assert isinstance(stdlib_json, StdlibBackend)
+    assert get_json_backend() is stdlib_json
+    assert jsonlib.dumps({"a": [1, "é"]}) == '{"a":[1,"é"]}'.encode("utf-8")
+    with pytest.raises(ValueError):
+        set_json_backend("simplejson")
+
+
+def test_request_json_sends_backend_bytes(server, stdlib_json):
+    payload = {"name": "José", "items": [1, 2.5, None, True]}
+    response = Request("POST").request(server.url + "/items", json=payload)
+    headers, body = server.received[0]
+    assert body == stdlib_json.dumps(payload)
+    assert headers["Content-Type"] == "application/json"
+    assert headers["Content-Length"] == str(len(body))
+    assert json.loads(body) == payload
+    assert response.json() == payload
+
+
+def test_request_json_keeps_an_explicit_content_type(server, stdlib_json):
+    Request("PUT").request(server.url + "/items", json=[1], headers={"Content-Type": "application/merge-patch+json"})
+    headers, body = server.received[0]
+    assert headers["Content-Type"] == "application/merge-patch+json"
+    assert body == b"[1]"
@@ -0,0 +1,140 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from benchmarks.servers import HTTPServer
+from ehr_library.download import MANIFEST_SUFFIX, RangedDownloader
+from ehr_library.resilience import ResiliencePolicy
+from ehr_library.session import HTTPSessionManager
+
+PART = 64 * 1024
+PAYLOAD = bytes(range(256)) * (PART * 6 // 256)
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.send_header("ETag", self.server.head_etag)
+        self.end_headers()
+
+    def do_GET(self):
+        start, end = 0, len(PAYLOAD) - 1
+        status = 200
+        header = self.headers.get("Range")
+        if header and self.headers.get("If-Range", self.server.etag) == self.server.etag:
+            first, last = header.split("=", 1)[1].split("-")
+            start, end = int(first), min(int(last), end)
+            status = 206
+        body = PAYLOAD[start:end + 1]
+        with self.server.lock:
+            self.server.ranges.append((start, end))
+            cut = status == 206 and start in self.server.cut_at
+            self.server.cut_at.discard(start)
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(PAYLOAD)}")
+        self.end_headers()
+        if cut:
+            # Simulate a dropped connection half way through the part.
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+    server.lock = threading.Lock()
+    server.ranges = []
+    server.cut_at = set()
+    server.etag = server.head_etag = '"v1"'
+    server.url = f"http://127.0.0.1:{server.server_port}/file"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session():
+    policy = ResiliencePolicy(retries=0, backoff_factor=0, failure_threshold=None)
+    return HTTPSessionManager(retries=0, resilience=policy)
+
+
+def _read(path):
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def test_ranges_are_fetched_in_parallel(server, session, tmp_path):
+    path = str(tmp_path / "file.bin")
+    downloader = RangedDownloader(session, connections=4, min_part_size=PART)
+    assert downloader.download(server.url, path) == len(PAYLOAD)
+    assert _read(path) == PAYLOAD
+    assert len(server.ranges) == 4
+    assert not os.path.exists(path + MANIFEST_SUFFIX)
+
+
+def test_interrupted_download_resumes_from_the_manifest(server, session, tmp_path):
+    path = str(tmp_path / "file.bin")
+    downloader = RangedDownloader(session, connections=4, min_part_size=PART)
+    part_size = len(PAYLOAD) // 4
+    server.cut_at.add(part_size)
+
+    with pytest.raises(Exception):
+        downloader.download(server.url, path)
+    assert os.path.exists(path + MANIFEST_SUFFIX)
+
+    server.ranges.clear()
+    assert downloader.download(server.url, path) == len(PAYLOAD)
+    assert _read(path) == PAYLOAD
+    assert not os.path.exists(path + MANIFEST_SUFFIX)
+    # Only the unfinished part is asked again, from where it stopped.
+    assert len(server.ranges) == 1
+    start, end = server.ranges[0]
+    assert part_size < start <= part_size + part_size // 2
+    assert end == 2 * part_size - 1
+
+
+def test_file_changed_mid_download_restarts_in_a_single_stream(server, session, tmp_path):
+    path = str(tmp_path / "file.bin")
+    downloader = RangedDownloader(session, connections=4, min_part_size=PART)
+    # HEAD still reports the old ETag, so every If-Range part gets the whole file.
+    server.etag = '"v2"'
+    assert downloader.download(server.url, path) == len(PAYLOAD)
+    assert _read(path) == PAYLOAD
+    assert not os.path.exists(path + MANIFEST_SUFFIX)
+    assert (0, len(PAYLOAD) - 1) in server.ranges
+
+
+def test_server_ignoring_range_falls_back_to_a_single_stream(session, tmp_path):
+    path = str(tmp_path / "large.bin")
+    size = 4 * PART
+    downloader = RangedDownloader(session, connections=4, min_part_size=PART)
+    with HTTPServer() as server:
+        # /large advertises Accept-Ranges but always answers 200 with the whole body.
+        assert downloader.download(f"{server.url}/large?size={size}", path) == size
+        expected = session.request("GET", f"{server.url}/large?size={size}").data
+    assert _read(path) == expected
+    assert not os.path.exists(path + MANIFEST_SUFFIX)
+
+
+def test_server_without_range_support_uses_a_single_stream(session, tmp_path):
+    path = str(tmp_path / "small.bin")
+    downloader = RangedDownloader(session, connections=4, min_part_size=1)
+    with HTTPServer() as server:
+        downloader.download(f"{server.url}/small", path)
+        expected = session.request("GET", f"{server.url}/small").data
+    assert _read(path) == expected
@@ -0,0 +1,73 @@
+import random
+import threading
+
+from ehr_library.events import EventBus
+
+
+def test_inactive_bus_builds_nothing():
+    bus = EventBus()
+    assert not bus.active
+    fields = {"headers": {"Authorization": "secret"}}
+    bus.emit("request.response", **fields)
+    assert fields["headers"] == {"Authorization": "secret"}
+    assert bus._worker is None
+
+    listener = bus.subscribe(lambda event: None)
+    assert bus.active
+    bus.unsubscribe(listener)
+    assert not bus.active
+
+
+def test_events_are_delivered_from_the_queue_thread():
+    bus = EventBus()
+    received = []
+    bus.subscribe(lambda event: received.append((event, threading.current_thread().name)))
+    bus.emit("request.response", status=200, headers={"Authorization": "Bearer x", "Accept": "*/*"})
+    bus.flush()
+    (event, thread_name), = received
+    assert thread_name == "ehr-events"
+    assert event.name == "request.response" and event.fields["status"] == 200
+    assert event.fields["headers"]["Authorization"] != "Bearer x"
+    assert event.fields["headers"]["Accept"] == "*/*"
+
+
+def test_sample_rate_and_name_filters():
+    random.seed(1234)
+    bus = EventBus(asynchronous=False)
+    sampled, never, errors = [], [], []
+    bus.subscribe(sampled.append, sample_rate=0.25)
+    bus.subscribe(never.append, sample_rate=0.0)
+    bus.subscribe(errors.append, events={"request.error", "circuit."})
+    for _ in range(4000):
+        bus.emit("request.response")
+    bus.emit("request.error")
+    bus.emit("circuit.state_changed")
+    assert 800 < len(sampled) < 1200
+    assert never == []
+    assert [event.name for event in errors] == ["request.error", "circuit.state_changed"]
+
+
+def test_full_queue_drops_and_counts():
+    bus = EventBus(queue_size=2)
+    release = threading.Event()
+    bus.subscribe(lambda event: release.wait(5))
+    for _ in range(10):
+        bus.emit("request.response")
+    # One event in the listener, two queued, the rest dropped.
+    assert 7 <= bus.stats()["dropped"] <= 8
+    release.set()
+    bus.flush()
+    assert bus.stats() == {"listeners": 1, "queued": 0, "dropped": bus.dropped}
+
+
+def test_broken_listener_does_not_break_emit():
+    bus = EventBus(asynchronous=False)
+    received = []
+
+    def broken(event):
+        raise RuntimeError("boom")
+
+    bus.subscribe(broken)
+    bus.subscribe(received.append)
+    bus.emit("request.response")
+    assert len(received) == 1
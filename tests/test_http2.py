@@ -0,0 +1,207 @@
+import time
+import socket
+import asyncio
+import hashlib
+import threading
+
+import pytest
+
+pytest.importorskip("h2")
+
+from benchmarks.servers import HTTP2Server, HTTPServer, SMALL_BODY, _large_body
+from ehr_library.http2 import AsyncHTTP2Pool, HTTP2Pool, HTTP2TimeoutError
+from ehr_library.pool import PoolRegistry
+from ehr_library.resilience import ResiliencePolicy
+from ehr_library.session import HTTPSessionManager
+
+
+@pytest.fixture
+def h2c_server():
+    with HTTP2Server() as server:
+        yield server
+
+
+def _start_tls(server):
+    try:
+        return server.start()
+    except RuntimeError as e:
+        pytest.skip(str(e))
+
+
+def test_h2c_request(h2c_server):
+    pool = HTTP2Pool(hosts=["127.0.0.1"])
+    try:
+        response = pool.urlopen("GET", h2c_server.url + "/small")
+        assert response.status == 200
+        assert response.version == 20
+        assert response.read() == SMALL_BODY
+    finally:
+        pool.clear()
+
+
+def test_concurrent_requests_share_one_connection(h2c_server):
+    pool = HTTP2Pool(hosts=["127.0.0.1"])
+    statuses = []
+
+    def fetch():
+        response = pool.urlopen("GET", h2c_server.url + "/slow?ms=300")
+        response.read()
+        statuses.append(response.status)
+
+    threads = [threading.Thread(target=fetch) for _ in range(8)]
+    started = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        pool.clear()
+
+    assert statuses == [200] * 8
+    assert len(h2c_server.connections) == 1
+    assert h2c_server.connections[0].max_concurrent_streams > 1
+    # Eight 300 ms answers one after the other would take 2.4 s.
+    assert elapsed < 1.5
+
+
+def test_large_bodies_go_through_flow_control(h2c_server):
+    # Both directions exceed the 64 KiB initial window many times over.
+    size = 3 * 1024 * 1024
+    pool = HTTP2Pool(hosts=["127.0.0.1"])
+    try:
+        response = pool.urlopen("GET", f"{h2c_server.url}/large?size={size}")
+        assert response.read() == _large_body(size)
+
+        payload = bytes(range(256)) * (size // 256)
+        response = pool.urlopen("POST", h2c_server.url + "/upload", body=payload)
+        assert response.json() == {"length": size, "sha256": hashlib.sha256(payload).hexdigest()}
+
+        chunks = (payload[i:i + 100_000] for i in range(0, size, 100_000))
+        response = pool.urlopen("POST", h2c_server.url + "/upload", body=chunks)
+        assert response.json()["length"] == size
+    finally:
+        pool.clear()
+
+
+def test_async_requests_are_multiplexed(h2c_server):
+    async def main():
+        pool = AsyncHTTP2Pool(hosts=["127.0.0.1"])
+        try:
+            started = time.perf_counter()
+            results = await asyncio.gather(*(
+                pool.request("GET", h2c_server.url + "/slow?ms=300") for _ in range(8)
+            ))
+            return results, time.perf_counter() - started
+        finally:
+            await pool.close()
+
+    results, elapsed = asyncio.run(main())
+    assert [status for status, _, _ in results] == [200] * 8
+    assert all(body == SMALL_BODY for _, _, body in results)
+    assert len(h2c_server.connections) == 1
+    assert elapsed < 1.5
+
+
+def test_h2_over_tls():
+    server = _start_tls(HTTP2Server(tls=True))
+    pool = HTTP2Pool(hosts=True, ca_certs=server.cert_path)
+    try:
+        response = pool.urlopen("GET", server.url + "/small")
+        assert response.status == 200
+        assert response.read() == SMALL_BODY
+    finally:
+        pool.clear()
+        server.stop()
+
+
+def test_falls_back_to_http1_when_alpn_refuses_h2():
+    server = _start_tls(HTTPServer(tls=True))
+    session = HTTPSessionManager(http2=True, ca_certs=server.cert_path)
+    try:
+        url = server.url + "/small"
+        assert session.http2.urlopen("GET", url) is None
+        assert not session.http2.handles(url)
+
+        response = session.request("GET", url)
+        assert response.status == 200
+        assert response.content == SMALL_BODY
+    finally:
+        session.http2.clear()
+        server.stop()
+
+
+def test_sessions_share_the_registry_pool(h2c_server):
+    registry = PoolRegistry()
+    first = HTTPSessionManager(http2=["127.0.0.1"], registry=registry)
+    second = HTTPSessionManager(http2=["127.0.0.1"], registry=registry)
+    try:
+        assert first.http2 is second.http2
+        assert first.with_pool_size(50).http2 is first.http2
+        assert first.request("GET", h2c_server.url + "/small").content == SMALL_BODY
+        assert second.request("GET", h2c_server.url + "/small").content == SMALL_BODY
+        assert len(h2c_server.connections) == 1
+        connection, = first.http2._connections.values()
+    finally:
+        registry.clear()
+    assert connection.closed
+
+
+def test_cleared_pool_lets_streams_in_flight_finish(h2c_server):
+    pool = HTTP2Pool(hosts=["127.0.0.1"])
+    response = pool.urlopen("GET", h2c_server.url + "/slow?ms=200")
+    pool.clear()
+    assert response.read() == SMALL_BODY
+    assert response._fp._connection.closed
+
+
+def test_slow_connect_does_not_block_other_origins(h2c_server):
+    stalled = socket.create_server(("127.0.0.1", 0))
+    pool = HTTP2Pool(hosts=["127.0.0.1"], timeout=1)
+    errors = []
+
+    def connect_stalled():
+        # The TLS handshake never gets an answer.
+        try:
+            pool.urlopen("GET", f"https://127.0.0.1:{stalled.getsockname()[1]}/")
+        except OSError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=connect_stalled)
+    try:
+        thread.start()
+        time.sleep(0.1)
+        started = time.perf_counter()
+        assert pool.urlopen("GET", h2c_server.url + "/small").status == 200
+        assert time.perf_counter() - started < 0.5
+        thread.join()
+    finally:
+        pool.clear()
+        stalled.close()
+    assert len(errors) == 1
+
+
+def test_read_timeout(h2c_server):
+    pool = HTTP2Pool(hosts=["127.0.0.1"], read_timeout=0.2)
+    try:
+        with pytest.raises(HTTP2TimeoutError):
+            pool.urlopen("GET", h2c_server.url + "/slow?ms=1000")
+    finally:
+        pool.clear()
+
+
+def test_session_retries_http2_through_the_resilience_policy(h2c_server):
+    policy = ResiliencePolicy(retries=2, backoff_factor=0, failure_threshold=5)
+    registry = PoolRegistry()
+    session = HTTPSessionManager(http2=["127.0.0.1"], registry=registry, resilience=policy)
+    try:
+        assert session.request("GET", h2c_server.url + "/status?code=503").status == 503
+        assert h2c_server.connections[0].streams == 3
+        # A generator cannot be replayed: one attempt only.
+        response = session.request("POST", h2c_server.url + "/status", body=iter([b"x"]),
+                                   headers={"Idempotency-Key": "1"})
+        assert response.status == 200
+    finally:
+        registry.clear()
+    assert policy.breaker_for("127.0.0.1").failures == 0
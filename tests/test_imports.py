@@ -0,0 +1,49 @@
+import os
+import sys
+import subprocess
+from importlib import import_module
+
+import pytest
+
+import ehr_library
+
+HEAVY = ("asyncio", "aiohttp", "h2", "websockets")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _loaded_after(code):
+    completed = subprocess.run(
+        [sys.executable, "-c", f"import sys\n{code}\nprint('\\n'.join(sorted(sys.modules)))"],
+        capture_output=True, text=True, check=True, cwd=ROOT,
+    )
+    return {name.split(".")[0] for name in completed.stdout.split()}
+
+
+@pytest.mark.parametrize("code", [
+    "import ehr_library",
+    "import ehr_library.core",
+    "import ehr_library.session",
+    "from ehr_library import HTTPSessionManager, HTTPRequestException",
+])
+def test_sync_imports_stay_light(code):
+    loaded = _loaded_after(code)
+    assert not loaded & set(HEAVY), sorted(loaded & set(HEAVY))
+
+
+def test_websocket_manager_is_loaded_on_access():
+    assert "websockets" in _loaded_after("import ehr_library\nehr_library.WebSocketManager")
+
+
+@pytest.mark.parametrize("name", ehr_library.__all__)
+def test_exported_names_resolve(name):
+    assert name in dir(ehr_library)
+    value = getattr(ehr_library, name)
+    assert value.__name__ == name
+    # Resolved once, then cached in the module namespace.
+    assert vars(ehr_library)[name] is value
+
+
+def test_unknown_attribute_raises():
+    with pytest.raises(AttributeError):
+        ehr_library.NotAThing
+    assert import_module("ehr_library.session").HTTPSessionManager is ehr_library.HTTPSessionManager
@@ -0,0 +1,102 @@
+import time
+import asyncio
+
+import pytest
+
+from ehr_library.misc.keys import APIKeyManager
+
+
+KEYS = {name: {"value": f"value-{name}", "limit": 2} for name in ("a", "b", "c")}
+
+
+def test_random_policy_respects_each_key_budget():
+    manager = APIKeyManager(KEYS, policy="random")
+    values = [manager.get_next_key(wait=False) for _ in range(6)]
+    assert sorted(values) == sorted(f"value-{name}" for name in KEYS for _ in range(2))
+    with pytest.raises(RuntimeError):
+        manager.get_next_key(wait=False)
+
+
+def test_get_next_key_random_is_a_deprecated_alias():
+    manager = APIKeyManager(KEYS, policy="random")
+    with pytest.deprecated_call():
+        values = [manager.get_next_key_random() for _ in range(6)]
+    assert manager.usage_count == {"a": 2, "b": 2, "c": 2}
+    assert len(values) == 6
+    with pytest.deprecated_call(), pytest.raises(RuntimeError):
+        manager.get_next_key_random()
+
+
+def _manager(policy="round_robin", limit=2, weights=None, **kwargs):
+    keys = {
+        name: {"value": name, "limit": limit, "weight": (weights or {}).get(name, 1)}
+        for name in ("a", "b", "c")
+    }
+    return APIKeyManager(keys, policy=policy, **kwargs)
+
+
+def test_round_robin_cycles_through_the_ring():
+    manager = _manager()
+    assert [manager.get_next_key(wait=False) for _ in range(6)] == ["a", "b", "c"] * 2
+    with pytest.raises(RuntimeError):
+        manager.get_next_key(wait=False)
+
+
+def test_least_loaded_picks_the_fullest_bucket():
+    manager = _manager("least_loaded", limit=4)
+    picks = [manager.get_next_key(wait=False) for _ in range(6)]
+    # Every key is used once before any is used twice.
+    assert sorted(picks[:3]) == ["a", "b", "c"]
+    assert sorted(picks[3:]) == ["a", "b", "c"]
+
+
+def test_weighted_policy_follows_the_strides():
+    manager = _manager("weighted", limit=100, weights={"a": 3, "b": 1, "c": 1})
+    picks = [manager.get_next_key(wait=False) for _ in range(10)]
+    assert picks.count("a") == 6
+    assert picks.count("b") == picks.count("c") == 2
+
+
+def test_timeout_expires_without_refill():
+    manager = _manager(limit=1)
+    for _ in range(3):
+        manager.get_next_key()
+    started = time.monotonic()
+    with pytest.raises(RuntimeError):
+        manager.get_next_key(timeout=0.1)
+    assert time.monotonic() - started >= 0.1
+
+
+def test_waits_for_the_bucket_to_refill():
+    manager = _manager(limit=1, rotation_interval=0.2)
+    for _ in range(3):
+        manager.get_next_key(wait=False)
+    started = time.monotonic()
+    assert manager.get_next_key(timeout=1) in ("a", "b", "c")
+    assert 0.05 < time.monotonic() - started < 0.5
+
+
+def test_get_next_key_async():
+    manager = _manager(limit=1, rotation_interval=0.2)
+
+    async def main():
+        keys = [await manager.get_next_key_async() for _ in range(3)]
+        # Refilled while the loop keeps running.
+        keys.append(await manager.get_next_key_async(timeout=1))
+        with pytest.raises(RuntimeError):
+            await _manager(limit=0).get_next_key_async(timeout=0.05)
+        return keys
+
+    keys = asyncio.run(main())
+    assert keys[:3] == ["a", "b", "c"]
+    assert keys[3] in ("a", "b", "c")
+
+
+def test_rotate_keys_periodically_sets_the_refill_rate():
+    manager = _manager(limit=1)
+    for _ in range(3):
+        manager.get_next_key(wait=False)
+    with pytest.deprecated_call():
+        manager.rotate_keys_periodically(0.1)
+    assert manager.rotation_interval == 0.1
+    assert manager.get_next_key(timeout=1) in ("a", "b", "c")
@@ -0,0 +1,55 @@
+import re
+
+import pytest
+
+from benchmarks.servers import HTTPServer
+from ehr_library.core import Request
+from ehr_library.metrics import DEFAULT_BUCKETS, InMemoryMetrics, PrometheusExporter
+from ehr_library.session import HTTPSessionManager
+
+
+@pytest.fixture
+def tls_server():
+    server = HTTPServer(tls=True)
+    try:
+        server.start()
+    except RuntimeError as e:
+        pytest.skip(str(e))
+    yield server
+    server.stop()
+
+
+def test_phases_histograms_and_exposition(tls_server):
+    metrics = InMemoryMetrics()
+    session = HTTPSessionManager(metrics=metrics, ca_certs=tls_server.cert_path)
+    client = Request("GET", session_manager=session)
+    for _ in range(2):
+        assert client.request(tls_server.url + "/gzip").status == 200
+
+    host = "127.0.0.1"
+    phases = {phase for (seen_host, phase) in metrics.histograms if seen_host == host}
+    assert {"queue_wait", "connect", "tls", "ttfb", "download", "decompress", "parse", "total"} <= phases
+    # The keep-alive connection was reused: one connect and one handshake.
+    assert metrics.histograms[(host, "connect")].count == 1
+    assert metrics.histograms[(host, "tls")].count == 1
+    assert metrics.counters[host]["requests"] == 2
+    assert metrics.reuse_ratio(host) == 0.5
+    assert metrics.statuses[(host, 200)] == 2
+
+    total = metrics.histograms[(host, "total")]
+    assert total.count == 2 and sum(total.counts) == 2
+    assert len(total.counts) == len(DEFAULT_BUCKETS) + 1
+    assert 0 < total.percentile(0.5) <= total.percentile(0.99) <= DEFAULT_BUCKETS[-1]
+
+    text = PrometheusExporter(metrics).render()
+    assert "# TYPE ehr_request_phase_seconds histogram" in text
+    labels = f'host="{host}",phase="total"'
+    buckets = [
+        int(value) for value in
+        re.findall(rf'ehr_request_phase_seconds_bucket\{{{labels},le="[^"]+"\}} (\d+)', text)
+    ]
+    assert len(buckets) == len(DEFAULT_BUCKETS) + 1
+    assert buckets == sorted(buckets) and buckets[-1] == 2
+    assert f"ehr_request_phase_seconds_count{{{labels}}} 2" in text
+    assert f'ehr_responses_total{{host="{host}",status="200"}} 2' in text
+    assert f'ehr_new_connections_total{{host="{host}"}} 1' in text
@@ -0,0 +1,94 @@
+import pytest
+
+from benchmarks.servers import HTTPServer
+from ehr_library import pool
+from ehr_library.pool import HostAwarePoolManager, HostAwareProxyManager, PoolRegistry
+from ehr_library.session import HTTPSessionManager
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(pool, "time", clock)
+    return clock
+
+
+def test_equal_settings_share_a_manager():
+    registry = PoolRegistry()
+    key = PoolRegistry.make_key(maxsize=5, host_limits={"b": {"maxsize": 2}, "a": {"block": True}})
+    same = PoolRegistry.make_key(maxsize=5, host_limits={"a": {"block": True}, "b": {"maxsize": 2}})
+    assert key == same
+    manager = registry.get(key)
+    assert isinstance(manager, HostAwarePoolManager)
+    assert registry.get(same) is manager
+    assert registry.get(PoolRegistry.make_key(maxsize=6)) is not manager
+    assert isinstance(registry.get(PoolRegistry.make_key(proxy_url="http://proxy:3128")), HostAwareProxyManager)
+    assert len(registry) == 3
+
+
+def test_sessions_with_equal_settings_share_connections():
+    registry = PoolRegistry()
+    first = HTTPSessionManager(maxsize=4, registry=registry)
+    second = HTTPSessionManager(maxsize=4, registry=registry)
+    other = HTTPSessionManager(maxsize=8, registry=registry)
+    assert first.http is second.http
+    assert other.http is not first.http
+    assert first.with_pool_size(8).http is other.http
+
+
+def test_least_recently_used_manager_is_evicted(monkeypatch):
+    cleared = []
+    monkeypatch.setattr(HostAwarePoolManager, "clear", lambda self: cleared.append(self))
+    registry = PoolRegistry(max_managers=2)
+    keys = [PoolRegistry.make_key(maxsize=size) for size in (1, 2, 3)]
+    first = registry.get(keys[0])
+    registry.get(keys[1])
+    # Touching the first key makes the second one the least recently used.
+    registry.get(keys[0])
+    registry.get(keys[2])
+    assert len(registry) == 2
+    assert len(cleared) == 1 and cleared[0] is not first
+    assert registry.get(keys[0]) is first
+
+
+def test_idle_managers_expire(clock, monkeypatch):
+    cleared = []
+    monkeypatch.setattr(HostAwarePoolManager, "clear", lambda self: cleared.append(self))
+    registry = PoolRegistry(idle_timeout=60)
+    idle = registry.get(PoolRegistry.make_key(maxsize=1))
+    clock.now += 30
+    busy = registry.get(PoolRegistry.make_key(maxsize=2))
+    clock.now += 31
+    assert registry.get(PoolRegistry.make_key(maxsize=2)) is busy
+    assert cleared == [idle]
+    assert len(registry) == 1
+    assert registry.get(PoolRegistry.make_key(maxsize=1)) is not idle
+
+
+def test_session_survives_its_manager_being_evicted():
+    registry = PoolRegistry(max_managers=1)
+    session = HTTPSessionManager(maxsize=1, registry=registry)
+    with HTTPServer() as server:
+        assert session.request("GET", server.url + "/small").status == 200
+        evicted = session.http
+        HTTPSessionManager(maxsize=2, registry=registry).http
+        assert len(registry) == 1
+        # The session asks the registry again and gets a fresh manager.
+        assert session.request("GET", server.url + "/small").status == 200
+        assert session.http is not evicted
+
+        # A response streaming while its manager is evicted still reads to the end.
+        with session.request("GET", server.url + "/large?size=300000", stream=True) as response:
+            HTTPSessionManager(maxsize=3, registry=registry).http
+            assert sum(len(chunk) for chunk in response.iter_content()) == 300000
+        assert session.request("GET", server.url + "/small").status == 200
+    registry.clear()
+    assert len(registry) == 0
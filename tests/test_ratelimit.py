@@ -0,0 +1,92 @@
+import time
+import asyncio
+import threading
+
+from ehr_library.ratelimit import HostLimiter, RateLimiter
+
+
+def test_token_bucket_paces_requests():
+    limiter = HostLimiter(rate=20, burst=2)
+    started = time.monotonic()
+    for _ in range(4):
+        with limiter.limit():
+            pass
+    # Two in the burst, then one every 50 ms.
+    assert 0.08 < time.monotonic() - started < 0.3
+
+
+def test_in_flight_cap_across_threads_and_loops():
+    limiter = HostLimiter(max_in_flight=2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def track(delta):
+        with lock:
+            active.append(delta)
+            peak.append(sum(active))
+
+    def work():
+        with limiter.limit():
+            track(1)
+            time.sleep(0.05)
+            track(-1)
+
+    async def work_async():
+        async with limiter.limit_async():
+            track(1)
+            await asyncio.sleep(0.05)
+            track(-1)
+
+    async def many():
+        await asyncio.gather(*(work_async() for _ in range(4)))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    threads.append(threading.Thread(target=asyncio.run, args=(many(),)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+    assert limiter.in_flight == 0
+
+
+def test_adaptive_backoff_and_recovery():
+    limiter = HostLimiter(rate=100)
+    limiter.feedback(429)
+    limiter.feedback(503)
+    assert limiter.current_rate == 25
+    for _ in range(30):
+        limiter.feedback(200)
+    assert limiter.current_rate == 100
+    for _ in range(10):
+        limiter.feedback(429)
+    assert limiter.current_rate == limiter.min_rate == 10
+
+
+def test_retry_after_pauses_the_host():
+    limiter = HostLimiter()
+    limiter.feedback(429, "0.1")
+    started = time.monotonic()
+    with limiter.limit():
+        pass
+    assert time.monotonic() - started >= 0.09
+
+
+def test_throttled_host_without_rule_gets_a_limiter():
+    limiter = RateLimiter(rules={"api.example.com": {"rate": 10}})
+    assert limiter.limiter_for("other.example.com") is None
+    limiter.feedback("other.example.com", 200)
+    assert limiter.limiter_for("other.example.com") is None
+    limiter.feedback("other.example.com", 429, "30")
+    assert limiter.snapshot()["other.example.com"]["blocked_for"] > 29
+
+
+def test_limiters_are_bounded():
+    limiter = RateLimiter(default={"rate": 10}, max_hosts=2)
+    first = limiter.limiter_for("a")
+    limiter.limiter_for("b")
+    assert limiter.limiter_for("a") is first
+    limiter.limiter_for("c")
+    # "b" was the least recently used.
+    assert sorted(limiter.snapshot()) == ["a", "c"]
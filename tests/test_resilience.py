@@ -0,0 +1,180 @@
+import time
+import asyncio
+
+import pytest
+from urllib3.exceptions import MaxRetryError
+
+from benchmarks.servers import HTTPServer
+from ehr_library.exceptions import CircuitOpenException
+from ehr_library.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    ResiliencePolicy,
+    RetryBudget,
+    get_default_resilience_policy,
+)
+
+
+class _Response:
+    def __init__(self, status):
+        self.status = status
+        self.headers = {}
+
+    def get_redirect_location(self):
+        return False
+
+
+class _Pool:
+    host = "api.example.com"
+
+
+def test_breaker_closed_open_half_open_closed():
+    changes = []
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05,
+                             on_state_change=lambda old, new: changes.append((old, new)))
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.allow() > 0
+
+    time.sleep(0.06)
+    assert breaker.allow() == 0
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time.
+    assert breaker.allow() > 0
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow() == 0
+    assert changes == [(CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)]
+
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow() == 0
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def test_breaker_release_frees_probe():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow() == 0
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() == 0
+
+
+def test_breaker_lost_probe_times_out():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05, probe_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow() == 0
+    assert 0 < breaker.allow() <= 0.05
+    time.sleep(0.06)
+    assert breaker.allow() == 0
+
+
+def test_budget_exhaustion():
+    budget = RetryBudget(ratio=0.5, min_per_second=0, window=10)
+    for _ in range(4):
+        budget.record_request()
+    assert budget.try_withdraw()
+    assert budget.try_withdraw()
+    assert not budget.try_withdraw()
+    assert budget.snapshot() == {"requests": 4, "retries": 2, "rejected": 1}
+
+
+def test_policy_stops_retrying_when_budget_is_spent():
+    policy = ResiliencePolicy(retries=5, budget_ratio=0.0, budget_min_per_second=0.1, budget_window=10)
+    policy.before_request("api.example.com")
+    assert policy.should_retry("api.example.com", "GET", None, 0, status=503)
+    assert not policy.should_retry("api.example.com", "GET", None, 1, status=503)
+
+
+def test_policy_never_retries_sent_post():
+    policy = ResiliencePolicy()
+    assert not policy.should_retry("api.example.com", "POST", None, 0, status=503)
+    assert policy.should_retry("api.example.com", "POST", {"Idempotency-Key": "1"}, 0, status=503)
+    assert policy.should_retry("api.example.com", "POST", None, 0, error=OSError(), sent=False)
+
+
+def test_policy_open_breaker_fails_fast():
+    policy = ResiliencePolicy(failure_threshold=1, recovery_timeout=30)
+    policy.before_request("api.example.com")
+    policy.record("api.example.com", status=503)
+    with pytest.raises(CircuitOpenException) as info:
+        policy.before_request("api.example.com", "https://api.example.com/")
+    assert info.value.host == "api.example.com"
+
+
+def test_budgeted_retry_stops_when_budget_is_spent():
+    policy = ResiliencePolicy(retries=5, budget_ratio=0.0, budget_min_per_second=0.1, budget_window=10)
+    retry = policy.urllib3_retry("GET").increment("GET", "/", response=_Response(503), _pool=_Pool())
+    assert len(retry.history) == 1
+    with pytest.raises(MaxRetryError):
+        retry.increment("GET", "/", response=_Response(503), _pool=_Pool())
+    # The refused attempt is left for the caller to record.
+    assert policy.breaker_for(_Pool.host).failures == 1
+
+
+def test_default_policy_is_shared():
+    default = get_default_resilience_policy()
+    other = default.with_retries(1, 0.1)
+    assert default.with_retries(default.retries, default.backoff_factor) is default
+    assert other.retries == 1
+    assert other.breaker_for("shared.example.com") is default.breaker_for("shared.example.com")
+
+
+def test_cancelled_probe_releases_the_breaker():
+    from ehr_library.misc.call import AsyncRequest
+
+    policy = ResiliencePolicy(failure_threshold=1, recovery_timeout=0.05, probe_timeout=30)
+
+    async def main(url):
+        client = AsyncRequest("GET", resilience=policy, timeout=5)
+        try:
+            policy.record("127.0.0.1", status=503)
+            await asyncio.sleep(0.06)
+            probe = asyncio.ensure_future(client.request(url + "/slow?ms=500"))
+            await asyncio.sleep(0.1)
+            assert policy.breaker_for("127.0.0.1").state == HALF_OPEN
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+            response = await client.request(url + "/small")
+            assert response.status == 200
+            assert policy.breaker_for("127.0.0.1").state == CLOSED
+        finally:
+            await client.close()
+
+    with HTTPServer() as server:
+        asyncio.run(main(server.url))
+
+
+def test_budgeted_retry_keys_the_breaker_on_the_request_host():
+    class _ProxyPool:
+        host = "proxy.internal"
+
+    policy = ResiliencePolicy(retries=3)
+    retry = policy.urllib3_retry("GET")
+    retry.increment("GET", "http://api.example.com/items", response=_Response(503), _pool=_ProxyPool())
+    assert policy.breaker_for("api.example.com").failures == 1
+    assert policy.breaker_for("proxy.internal").failures == 0
+
+
+def test_retry_after_is_capped_on_both_paths():
+    policy = ResiliencePolicy(max_retry_after=2)
+    response = _Response(503)
+    response.headers = {"Retry-After": "3600"}
+    assert policy.urllib3_retry("GET").get_retry_after(response) == 2
+    assert policy.backoff(0, "3600") == 2
+    response.headers = {"Retry-After": "1"}
+    assert policy.urllib3_retry("GET").get_retry_after(response) == 1
+    assert ResiliencePolicy(backoff_max=5).max_retry_after == 5
@@ -0,0 +1,146 @@
+import socket
+import time
+
+import pytest
+
+from ehr_library import resolver
+from ehr_library.resolver import DNSCache, happy_eyeballs_connect, interleave_families
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(resolver, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+
+    def getaddrinfo(host, port, family=0, type=0):
+        calls.append(host)
+        if host == "missing.invalid":
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port))]
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    return calls
+
+
+def test_answers_are_cached_until_the_ttl(clock, lookups):
+    cache = DNSCache(ttl=10)
+    first = cache.resolve("example.com", 80)
+    assert cache.resolve("example.com", 80) is first
+    assert lookups == ["example.com"]
+
+    clock.now += 9.9
+    cache.resolve("example.com", 80)
+    assert lookups == ["example.com"]
+    clock.now += 0.2
+    cache.resolve("example.com", 80)
+    assert lookups == ["example.com", "example.com"]
+    assert cache.stats() == {"entries": 1, "hits": 2, "misses": 2}
+
+
+def test_failures_use_the_negative_ttl(clock, lookups):
+    cache = DNSCache(ttl=60, negative_ttl=5)
+    for _ in range(2):
+        with pytest.raises(socket.gaierror):
+            cache.resolve("missing.invalid", 80)
+    assert lookups == ["missing.invalid"]
+    clock.now += 5
+    with pytest.raises(socket.gaierror):
+        cache.resolve("missing.invalid", 80)
+    assert len(lookups) == 2
+
+
+def test_entries_are_bounded_and_invalidated(clock, lookups):
+    cache = DNSCache(max_entries=2)
+    for host in ("a.example", "b.example", "c.example"):
+        cache.resolve(host, 80)
+    assert cache.stats()["entries"] == 2
+    cache.resolve("a.example", 80)
+    assert lookups.count("a.example") == 2
+
+    cache.invalidate("a.example")
+    cache.resolve("a.example", 80)
+    assert lookups.count("a.example") == 3
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+
+
+def test_families_are_interleaved():
+    v6 = [(socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("::1", 80, 0, 0))] * 2
+    v4 = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", 80))] * 2
+    families = [address[0] for address in interleave_families(v6 + v4)]
+    assert families == [socket.AF_INET6, socket.AF_INET, socket.AF_INET6, socket.AF_INET]
+
+
+def _address(port, host="127.0.0.1"):
+    return (socket.AF_INET, socket.SOCK_STREAM, 6, "", (host, port))
+
+
+@pytest.fixture
+def listener():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(8)
+    yield sock
+    sock.close()
+
+
+@pytest.fixture
+def closed_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_refused_address_moves_on_to_the_next(listener, closed_port):
+    port = listener.getsockname()[1]
+    sock = happy_eyeballs_connect([_address(closed_port), _address(port)], timeout=5, delay=10)
+    try:
+        assert sock.getpeername()[1] == port
+        assert sock.getblocking()
+    finally:
+        sock.close()
+
+
+def test_unreachable_address_is_raced_after_the_delay(listener):
+    # 192.0.2.0/24 is reserved for documentation: the attempt either hangs or fails.
+    port = listener.getsockname()[1]
+    started = time.monotonic()
+    sock = happy_eyeballs_connect([_address(port, "192.0.2.1"), _address(port)], timeout=5, delay=0.05)
+    try:
+        assert sock.getpeername() == ("127.0.0.1", port)
+    finally:
+        sock.close()
+    assert time.monotonic() - started < 1
+
+
+def test_all_addresses_failing_raises_the_last_error(closed_port):
+    with pytest.raises(ConnectionRefusedError):
+        happy_eyeballs_connect([_address(closed_port)] * 2, timeout=5)
+
+
+def test_failed_connection_invalidates_the_cache(lookups, closed_port):
+    cache = DNSCache()
+    with pytest.raises(OSError):
+        cache.create_connection(("example.com", closed_port), timeout=5)
+    with pytest.raises(OSError):
+        cache.create_connection(("example.com", closed_port), timeout=5)
+    assert lookups == ["example.com", "example.com"]
@@ -0,0 +1,14 @@
+from ehr_library.response import Response
+
+
+def test_empty_responses_are_truthy():
+    assert Response(204)
+    assert Response(200, body=b"")
+    assert Response(404, body=b"missing")
+
+
+def test_body_is_decoded_lazily():
+    response = Response(200, {"Content-Type": "application/json"}, b'{"id": 1}')
+    assert response.content == b'{"id": 1}'
+    assert response.json() == {"id": 1}
+    assert response.json() is response.json()
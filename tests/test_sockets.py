@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from benchmarks.servers import WebSocketServer
+from ehr_library import sockets
+from ehr_library.sockets import WebSocketManager, WebSocketPool
+
+
+@pytest.fixture
+def echo_server():
+    with WebSocketServer() as server:
+        yield server
+
+
+async def _round_trip(url, messages, **kwargs):
+    manager = WebSocketManager(url, compression=None, **kwargs)
+    await manager.connect()
+    try:
+        await manager.send_many(messages)
+        await manager.flush()
+        return [await manager.receive_message() for _ in messages]
+    finally:
+        await manager.close()
+
+
+def test_installed_websockets_supports_batched_sends(echo_server):
+    async def main():
+        manager = WebSocketManager(echo_server.url, compression=None)
+        await manager.connect()
+        try:
+            return sockets._can_batch(manager.connection)
+        finally:
+            await manager.close()
+
+    # Fails when websockets is upgraded past the series _send_batch was checked against.
+    assert asyncio.run(main())
+
+
+def test_batched_sends_keep_order_and_types(echo_server, monkeypatch):
+    batches = []
+    send_batch = sockets._send_batch
+
+    async def recording(connection, batch):
+        batches.append(len(batch))
+        await send_batch(connection, batch)
+
+    monkeypatch.setattr(sockets, "_send_batch", recording)
+    messages = [f"text-{i}" if i % 3 else f"binary-{i}".encode() for i in range(2000)]
+    assert asyncio.run(_round_trip(echo_server.url, messages, send_batch_size=64)) == messages
+    assert max(batches) > 1
+
+
+def test_falls_back_to_public_send(echo_server, monkeypatch):
+    monkeypatch.setattr(sockets, "BATCHED_SEND_SERIES", "0.")
+    messages = [f"message-{i}" for i in range(200)]
+    assert asyncio.run(_round_trip(echo_server.url, messages)) == messages
+
+
+async def _drain(pool, count):
+    received = {}
+    for _ in range(count):
+        name, message = await asyncio.wait_for(pool.receive(), 5)
+        received.setdefault(name, []).append(message)
+    return received
+
+
+def test_pool_fans_in_messages_from_every_connection(echo_server):
+    async def main():
+        async with WebSocketPool({"a": echo_server.url, "b": echo_server.url}, compression=None) as pool:
+            for i in range(50):
+                await pool.send("a", f"a-{i}")
+                await pool.send("b", f"b-{i}")
+            return await _drain(pool, 100)
+
+    received = asyncio.run(main())
+    assert received == {"a": [f"a-{i}" for i in range(50)], "b": [f"b-{i}" for i in range(50)]}
+
+
+def test_pool_broadcasts_across_shards(echo_server):
+    async def main():
+        uris = {f"c{i}": echo_server.url for i in range(4)}
+        async with WebSocketPool(uris, shards=2, compression=None) as pool:
+            assert sorted(stats["shard"] for stats in pool.stats()["connections"].values()) == [0, 0, 1, 1]
+            await pool.broadcast("hello")
+            await pool.broadcast(b"bytes")
+            return await _drain(pool, 8)
+
+    received = asyncio.run(main())
+    assert received == {f"c{i}": ["hello", b"bytes"] for i in range(4)}
+
+
+def test_pool_replaces_a_connection_that_stops_answering_pings(echo_server):
+    async def main():
+        async with WebSocketPool({"a": echo_server.url}, shards=1, ping_interval=0.05, ping_timeout=0.05,
+                                 compression=None, backoff_base=0.01) as pool:
+            conn = pool._connections["a"]
+            stalled = conn.manager.connection
+
+            async def ping():
+                # A pong that never comes.
+                return asyncio.get_running_loop().create_future()
+
+            stalled.ping = ping
+            for _ in range(100):
+                if conn.manager.connection is not stalled and conn.manager.connected:
+                    break
+                await asyncio.sleep(0.02)
+            await pool.send("a", "after")
+            name, message = await asyncio.wait_for(pool.receive(), 5)
+            return conn, stalled, name, message
+
+    conn, stalled, name, message = asyncio.run(main())
+    assert conn.ping_failures >= 1
+    assert conn.manager.reconnects >= 1
+    assert conn.manager.connection is not stalled
+    assert (name, message) == ("a", "after")
@@ -0,0 +1,26 @@
+import io
+
+import pytest
+from urllib3 import HTTPResponse
+
+from ehr_library.streaming import StreamingResponse
+
+
+def _response(data):
+    return StreamingResponse(HTTPResponse(body=io.BytesIO(data), status=200, preload_content=False))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1024])
+def test_iter_lines_across_chunk_boundaries(chunk_size):
+    data = b'{"a": 1}\r\n{"b": 2}\r\n\r\n{"c": 3}'
+    lines = list(_response(data).iter_lines(chunk_size, delimiter=b"\r\n"))
+    assert lines == [b'{"a": 1}', b'{"b": 2}', b"", b'{"c": 3}']
+
+    lines = list(_response(data).iter_lines(chunk_size, delimiter=b"\r\n", keepends=True))
+    assert b"".join(lines) == data
+
+
+def test_iter_lines_long_line_spanning_many_chunks():
+    line = b"x" * (4 * 1024 * 1024)
+    lines = list(_response(line + b"\nend\n").iter_lines(1024))
+    assert lines == [line, b"end"]
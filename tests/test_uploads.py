@@ -0,0 +1,103 @@
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from urllib3.exceptions import MaxRetryError
+
+from ehr_library.resilience import ResiliencePolicy
+from ehr_library.session import HTTPSessionManager
+from ehr_library.uploads import MultipartEncoder, is_replayable
+
+
+class _RecordingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if not size:
+                    self.rfile.readline()
+                    return bytes(body)
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _handle(self):
+        body = self._read_body()
+        self.server.received.append((self.command, dict(self.headers), body))
+        status = int(self.path.rsplit("/", 1)[-1]) if self.path.startswith("/status/") else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    do_POST = do_PUT = _handle
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RecordingHandler)
+    server.received = []
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session():
+    policy = ResiliencePolicy(retries=2, backoff_factor=0, failure_threshold=None)
+    return HTTPSessionManager(resilience=policy)
+
+
+def test_generator_body_is_sent_chunked(server, session):
+    chunks = [b"first,", "second,", b"third"]
+    response = session.request("POST", server.url + "/upload", body=(chunk for chunk in chunks))
+    assert response.status == 200
+    (_, headers, body), = server.received
+    assert headers["Transfer-Encoding"] == "chunked"
+    assert body == b"first,second,third"
+
+
+def test_multipart_file_upload(server, session, tmp_path):
+    payload = bytes(range(256)) * 1000
+    path = tmp_path / "data.bin"
+    path.write_bytes(payload)
+    with open(path, "rb") as file:
+        encoder = MultipartEncoder({"note": "héllo", "file": ("data.bin", file)}, boundary="b0undary")
+        length = encoder.content_length
+        session.request("POST", server.url + "/upload", body=encoder, chunk_size=4096)
+
+    (_, headers, body), = server.received
+    assert headers["Content-Type"] == "multipart/form-data; boundary=b0undary"
+    assert int(headers["Content-Length"]) == length == len(body)
+    assert body == (
+        b'--b0undary\r\nContent-Disposition: form-data; name="note"\r\n\r\n'
+        + "héllo".encode() + b"\r\n"
+        + b'--b0undary\r\nContent-Disposition: form-data; name="file"; filename="data.bin"\r\n'
+        + b"Content-Type: application/octet-stream\r\n\r\n"
+        + payload + b"\r\n--b0undary--\r\n"
+    )
+
+
+def test_only_replayable_bodies_are_retried(server, session):
+    assert not is_replayable(iter([b"x"]))
+    assert not is_replayable(MultipartEncoder({"a": "b"}))
+    assert is_replayable(io.BytesIO(b"x"))
+    assert is_replayable(b"x")
+
+    assert session.request("PUT", server.url + "/status/503", body=iter([b"once"])).status == 503
+    assert len(server.received) == 1
+
+    server.received.clear()
+    with pytest.raises(MaxRetryError):
+        session.request("PUT", server.url + "/status/503", body=io.BytesIO(b"again"))
+    # The file is rewound before every attempt.
+    assert [body for _, _, body in server.received] == [b"again"] * 3